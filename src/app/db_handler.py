@@ -4,6 +4,8 @@ import logging
 import pandas as pd
 from datetime import datetime, timedelta
 from utils.date_utils import date_to_weekday, is_valid_date_format
+from utils import schema
+from utils.file_lock import bookings_lock
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -27,11 +29,22 @@ class BookingDatabase:
         # Create the bookings file if it doesn't exist
         if not os.path.exists(self.bookings_file):
             self._create_empty_bookings_file()
+        
+        # Read once; until a pending migration finishes, loaded frames are upgraded in memory
+        self.schema_version = schema.read_version(self.bookings_file)
+        if self.schema_version < schema.CURRENT_VERSION:
+            logger.info(f"Bookings schema is v{self.schema_version}, migrating to v{schema.CURRENT_VERSION}")
+            schema.start_migration(self.bookings_file, self._schema_migrated)
+    
+    def _schema_migrated(self, version):
+        self.schema_version = version
     
     def _create_empty_bookings_file(self):
         """Create an empty bookings CSV file with headers"""
         df = pd.DataFrame(columns=['user_name', 'date', 'time', 'booking_date', 'booking_id', 'day'])
         df.to_csv(self.bookings_file, index=False)
+        schema.write_version(self.bookings_file, schema.CURRENT_VERSION)
+        self.schema_version = schema.CURRENT_VERSION
         logger.info(f"Created new empty bookings file at {self.bookings_file}")
     
     def _load_file(self, file_path, default_data=None):
@@ -57,7 +70,10 @@ class BookingDatabase:
             os.makedirs(os.path.dirname(file_path), exist_ok=True)
             
             if file_path.endswith('.csv'):
-                data.to_csv(file_path, index=False)
+                # Write to a temp file and swap it in so readers in any worker never see a partial file
+                temp_file = f"{file_path}.{os.getpid()}.tmp"
+                data.to_csv(temp_file, index=False)
+                os.replace(temp_file, file_path)
             elif file_path.endswith('.json'):
                 with open(file_path, 'w') as f:
                     json.dump(data, f, indent=2)
@@ -68,170 +84,135 @@ class BookingDatabase:
     
     def _load_bookings(self):
         """Load bookings using the common file loader"""
-        return self._load_file(self.bookings_file, [])
+        df = self._load_file(self.bookings_file, [])
+        if self.schema_version < schema.CURRENT_VERSION:
+            df = schema.upgrade_frame(df, self.schema_version)
+        return df
         
     def _save_bookings(self, df):
-        """Save bookings using the common file saver"""
+        """Save bookings using the common file saver; callers hold bookings_lock"""
         return self._save_file(df, self.bookings_file)
     
-    def _migrate_day_to_date(self, df):
-        """Migrate old schema using 'day' to new schema using 'date'"""
-        # Create a copy of the day column as date
-        df['date'] = df['day']
-        
-        # Try to convert day names to actual dates if possible
-        current_date = datetime.now()
-        for index, row in df.iterrows():
-            try:
-                # Map day name to a future date within the next 7 days
-                day_name = row['day'].title()
-                day_mapping = {
-                    'Monday': 0, 'Tuesday': 1, 'Wednesday': 2, 
-                    'Thursday': 3, 'Friday': 4, 'Saturday': 5, 'Sunday': 6
-                }
-                
-                if day_name in day_mapping:
-                    current_weekday = current_date.weekday()
-                    days_until = (day_mapping[day_name] - current_weekday) % 7
-                    if days_until == 0:  # If today, use next week
-                        days_until = 7
-                    
-                    target_date = current_date + timedelta(days=days_until)
-                    df.at[index, 'date'] = target_date.strftime('%Y-%m-%d')
-            except:
-                # If conversion fails, keep the original day name
-                continue
-        
-        # Save the updated dataframe
-        self._save_bookings(df)
-        return df
-    
     def book_slot(self, user_name, date, time):
         """Book a slot"""
         logger.info(f"Attempting to book slot for {user_name} on {date} at {time}")
         
-        # Load current bookings
-        df = self._load_bookings()
-        
-        # Check for column schema
-        date_column = 'date' if 'date' in df.columns else 'day'
+        # Check and write under one lock, so two workers can't both take the slot
+        with bookings_lock(self.bookings_file):
+            # Load current bookings
+            df = self._load_bookings()
         
-        # Check if the slot is already booked
-        try:
-            matching_bookings = df[(df[date_column] == date) & (df['time'] == time)]
-            if not matching_bookings.empty:
-                logger.warning(f"Slot on {date} at {time} is already booked")
-                return {'status': 'failure', 'message': 'Slot already booked'}
+            # Check if the slot is already booked
+            try:
+                matching_bookings = df[(df['date'] == date) & (df['time'] == time)]
+                if not matching_bookings.empty:
+                    logger.warning(f"Slot on {date} at {time} is already booked")
+                    return {'status': 'failure', 'message': 'Slot already booked'}
             
-            # Add new booking
-            booking_id = len(df) + 1
+                # Add new booking
+                booking_id = len(df) + 1
             
-            # Calculate the weekday from the date
-            try:
-                # Convert date string to datetime object to get weekday name
-                date_obj = datetime.strptime(date, "%Y-%m-%d")
-                weekday_name = date_obj.strftime("%A")  # %A gives full weekday name
-                logger.info(f"Calculated weekday for {date}: {weekday_name}")
-            except Exception as e:
-                logger.error(f"Error calculating weekday for {date}: {e}")
-                weekday_name = ""  # Default empty if calculation fails
+                # Calculate the weekday from the date
+                try:
+                    # Convert date string to datetime object to get weekday name
+                    date_obj = datetime.strptime(date, "%Y-%m-%d")
+                    weekday_name = date_obj.strftime("%A")  # %A gives full weekday name
+                    logger.info(f"Calculated weekday for {date}: {weekday_name}")
+                except Exception as e:
+                    logger.error(f"Error calculating weekday for {date}: {e}")
+                    weekday_name = ""  # Default empty if calculation fails
                 
-            new_booking = pd.DataFrame([{
-                'user_name': user_name,
-                'date': date,
-                'day': weekday_name,  # Store weekday name
-                'time': time,
-                'booking_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'booking_id': booking_id
-            }])
+                new_booking = pd.DataFrame([{
+                    'user_name': user_name,
+                    'date': date,
+                    'day': weekday_name,  # Store weekday name
+                    'time': time,
+                    'booking_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    'booking_id': booking_id
+                }])
             
-            df = pd.concat([df, new_booking], ignore_index=True)
+                df = pd.concat([df, new_booking], ignore_index=True)
             
-            # Save updated bookings
-            if self._save_bookings(df):
-                logger.info(f"Successfully booked slot for {user_name} on {date} at {time}")
-                return {'status': 'success', 'message': f'Slot booked for {date} at {time}', 'booking_id': booking_id}
-            else:
-                logger.error("Failed to save bookings after booking")
-                return {'status': 'failure', 'message': 'Error saving booking'}
-        except Exception as e:
-            logger.error(f"Error booking slot: {str(e)}")
-            return {'status': 'failure', 'message': f'Error booking slot: {str(e)}'}
+                # Save updated bookings
+                if self._save_bookings(df):
+                    logger.info(f"Successfully booked slot for {user_name} on {date} at {time}")
+                    return {'status': 'success', 'message': f'Slot booked for {date} at {time}', 'booking_id': booking_id}
+                else:
+                    logger.error("Failed to save bookings after booking")
+                    return {'status': 'failure', 'message': 'Error saving booking'}
+            except Exception as e:
+                logger.error(f"Error booking slot: {str(e)}")
+                return {'status': 'failure', 'message': f'Error booking slot: {str(e)}'}
     
     def cancel_booking(self, user_name, date=None, time=None, booking_id=None):
         """Cancel a booking - can search by date/time or by booking_id for last booking"""
         logger.info(f"Attempting to cancel booking for {user_name}, date:{date}, time:{time}, id:{booking_id}")
         
-        df = self._load_bookings()
-        
-        if df.empty:
-            logger.warning(f"No bookings found in {self.bookings_file}")
-            return {'status': 'failure', 'message': 'No bookings found'}
+        # Other workers' bookings saved meanwhile would be lost without the lock
+        with bookings_lock(self.bookings_file):
+            df = self._load_bookings()
         
-        # Check for column schema
-        date_column = 'date' if 'date' in df.columns else 'day'
-        logger.info(f"Using column '{date_column}' for date information")
+            if df.empty:
+                logger.warning(f"No bookings found in {self.bookings_file}")
+                return {'status': 'failure', 'message': 'No bookings found'}
         
-        # Log the current bookings for debugging
-        logger.info(f"Current bookings in database:\n{df}")
+            # Log the current bookings for debugging
+            logger.info(f"Current bookings in database:\n{df}")
 
-        # If booking_id is provided, use that for exact match
-        if booking_id:
-            mask = (df['user_name'] == user_name) & (df['booking_id'] == booking_id)
-        # If "just now" or similar is detected, find the most recent booking
-        elif date is None and time is None:
-            # Get the most recent booking for this user
-            user_bookings = df[df['user_name'] == user_name]
-            if user_bookings.empty:
-                logger.warning(f"No bookings found for user '{user_name}'")
-                return {'status': 'failure', 'message': f'No bookings found for {user_name}'}
+            # If booking_id is provided, use that for exact match
+            if booking_id:
+                mask = (df['user_name'] == user_name) & (df['booking_id'] == booking_id)
+            # If "just now" or similar is detected, find the most recent booking
+            elif date is None and time is None:
+                # Get the most recent booking for this user
+                user_bookings = df[df['user_name'] == user_name]
+                if user_bookings.empty:
+                    logger.warning(f"No bookings found for user '{user_name}'")
+                    return {'status': 'failure', 'message': f'No bookings found for {user_name}'}
             
-            # Sort by booking date (most recent first) and take the first one
-            most_recent = user_bookings.sort_values('booking_date', ascending=False).iloc[0]
-            mask = df['booking_id'] == most_recent['booking_id']
+                # Sort by booking date (most recent first) and take the first one
+                most_recent = user_bookings.sort_values('booking_date', ascending=False).iloc[0]
+                mask = df['booking_id'] == most_recent['booking_id']
             
-            # Update date and time for response clarity
-            date = most_recent[date_column]
-            time = most_recent['time']
-        else:
-            # Match by date and time
-            mask = (df['user_name'] == user_name) & \
-                   (df[date_column] == date) & \
-                   (df['time'] == time)
+                # Update date and time for response clarity
+                date = most_recent['date']
+                time = most_recent['time']
+            else:
+                # Match by date and time
+                mask = (df['user_name'] == user_name) & \
+                       (df['date'] == date) & \
+                       (df['time'] == time)
                
-        matching_bookings = df[mask]
+            matching_bookings = df[mask]
         
-        if matching_bookings.empty:
-            logger.warning(f"No exact booking found for user '{user_name}' with the specified criteria")
-            return {'status': 'failure', 'message': f'No booking found for {user_name} matching your criteria'}
+            if matching_bookings.empty:
+                logger.warning(f"No exact booking found for user '{user_name}' with the specified criteria")
+                return {'status': 'failure', 'message': f'No booking found for {user_name} matching your criteria'}
             
-        # Remove the booking(s) - should only be one with exact match logic
-        df = df.drop(matching_bookings.index)
+            # Remove the booking(s) - should only be one with exact match logic
+            df = df.drop(matching_bookings.index)
         
-        # Save updated bookings
-        if self._save_bookings(df):
-            num_cancelled = len(matching_bookings) # Should be 1
-            cancelled_booking = matching_bookings.iloc[0].to_dict()
-            logger.info(f"Successfully cancelled booking: {cancelled_booking}")
+            # Save updated bookings
+            if self._save_bookings(df):
+                num_cancelled = len(matching_bookings) # Should be 1
+                cancelled_booking = matching_bookings.iloc[0].to_dict()
+                logger.info(f"Successfully cancelled booking: {cancelled_booking}")
             
-            return {
-                'status': 'success', 
-                'message': f'Booking for {user_name} cancelled on {date} at {time}',
-                'cancelled_date': date,
-                'cancelled_time': time
-            }
-        else:
-            logger.error(f"Failed to save bookings after cancellation")
-            return {'status': 'failure', 'message': 'Error saving updated bookings'}
+                return {
+                    'status': 'success', 
+                    'message': f'Booking for {user_name} cancelled on {date} at {time}',
+                    'cancelled_date': date,
+                    'cancelled_time': time
+                }
+            else:
+                logger.error(f"Failed to save bookings after cancellation")
+                return {'status': 'failure', 'message': 'Error saving updated bookings'}
 
     def get_available_slots(self, start_date=None, end_date=None):
         """Get all available slots for a date range"""
         logger.info(f"Fetching available slots from {start_date} to {end_date}")
         df = self._load_bookings()
         
-        # Check for column schema
-        date_column = 'date' if 'date' in df.columns else 'day'
-        
         # If no date range provided, use the next 7 days
         if not start_date:
             start_date = datetime.now().strftime("%Y-%m-%d")
@@ -257,12 +238,6 @@ class BookingDatabase:
         
         # Find which slots are already booked
         if not df.empty and 'time' in df.columns:
-            # Ensure we're using the 'date' column for comparison
-            # If we have a 'day' column but no 'date' column, migrate the data
-            if date_column == 'day' and 'date' not in df.columns:
-                df = self._migrate_day_to_date(df)
-                
-            # Now we can safely use the 'date' column for merging
             booked_slots = df[['date', 'time']].copy()
             
             # Merge to find available slots
@@ -303,9 +278,11 @@ class BookingDatabase:
     def reset_all_bookings(self):
         """Reset all bookings"""
         logger.info("Resetting all bookings")
-        try:
-            self._create_empty_bookings_file()
-            return True
-        except Exception as e:
-            logger.error(f"Error resetting bookings: {str(e)}")
-            return False
+        # Wait for bookings in flight rather than racing them
+        with bookings_lock(self.bookings_file):
+            try:
+                self._create_empty_bookings_file()
+                return True
+            except Exception as e:
+                logger.error(f"Error resetting bookings: {str(e)}")
+                return False
@@ -1,50 +1,30 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
 from app.db_handler import BookingDatabase  # Fixed: Use relative import
 from app.session_handler import SessionManager  # Fixed: Use relative import
 from llm.groq_handler import GroqHandler  # Fixed: Use relative import
+from llm.resilience import Deadline
 from utils.date_utils import date_to_weekday, weekday_to_date, is_valid_date_format  # Fixed
 from utils.holiday_resolver import holiday_resolver  # Added: Import holiday_resolver
+from utils.date_parser import date_parser
+from utils.concurrency import task_runner, timed
 import pandas as pd
 import uuid
 import json
 import logging
-import re
+import os
 from datetime import datetime, timedelta
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Create a simple date parser class to replace undefined date_parser
-class DateParser:
-    @staticmethod
-    def extract_time(text):
-        """Extract time from text using regex patterns"""
-        # Look for patterns like 2pm, 14:00, etc.
-        time_pattern = re.compile(r'(\d{1,2})(?::(\d{2}))?\s*([ap]\.?m\.?)?', re.IGNORECASE)
-        match = time_pattern.search(text)
-        
-        if match:
-            hour = int(match.group(1))
-            minute = match.group(2)
-            ampm = match.group(3)
-            
-            # Handle AM/PM
-            if ampm and ampm.lower().startswith('p') and hour < 12:
-                hour += 12
-            elif ampm and ampm.lower().startswith('a') and hour == 12:
-                hour = 0
-                
-            # Format as HH:MM
-            return f"{hour:02d}:{minute if minute else '00'}"
-        
-        return None
+# Latency budget for one /booking request, shared by every LLM call it makes
+REQUEST_BUDGET_SECONDS = float(os.environ.get("BOOKING_REQUEST_BUDGET_SECONDS", "20"))
 
 # Create instances
 db = BookingDatabase()
 session_manager = SessionManager()
 groq = GroqHandler()
-date_parser = DateParser()  # Added: Create date_parser instance
 
 # Define Booking class - was missing
 class Booking:
@@ -70,7 +50,22 @@ def format_response(status, message, session_id=None, **additional_data):
     response.update(additional_data)
     return jsonify(response)
 
-def perform_cancellation(user_name, date=None, time=None, booking_id=None, session_id=None):
+def submit_reply(session_id, kind, *args, **kwargs):
+    """Start generating the natural language reply for kind ('booking', 'cancellation' or 'available_slots').
+    
+    Returns a future with the reply text. For /booking/stream the generation is left
+    to the event stream instead, and the future resolves to None.
+    """
+    if g.get('stream_reply'):
+        g.pending_reply = (session_id, kind, args, kwargs)
+        return task_runner.completed(None)
+    return task_runner.submit(getattr(groq, f"generate_{kind}_response"), *args, **kwargs)
+
+def sse_event(event, data):
+    """Format a server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def perform_cancellation(user_name, date=None, time=None, booking_id=None, session_id=None, deadline=None):
     """Common cancellation function used by both direct API and NLP interface"""
     logger.info(f"Cancellation request: {user_name}, {date}, {time}, {booking_id}")
     
@@ -93,19 +88,23 @@ def perform_cancellation(user_name, date=None, time=None, booking_id=None, sessi
     result = db.cancel_booking(user_name, date, time, booking_id)
     logger.info(f"Cancellation result: {result}")
     
-    # Generate response
-    nlp_response = groq.generate_cancellation_response(result)
+    # Generate response while the session is updated
+    reply = submit_reply(session_id, 'cancellation', result, deadline=deadline)
+    
+    # If successful, mark the session as completed
+    if session_id and result['status'] == 'success':
+        session_manager.update_session(session_id, {'status': 'completed'})
+    
+    nlp_response = reply.result()
     result['nlp_response'] = nlp_response
     
     # Add message to session if session_id is provided
-    if session_id:
+    if session_id and nlp_response is not None:
         session_manager.add_message(session_id, 'system', nlp_response)
-        # If successful, mark the session as completed
-        if result['status'] == 'success':
-            session_manager.update_session(session_id, {'status': 'completed'})
     
     return result
 
+@timed("Booking request")
 def process_booking_request():
     """Process a natural language booking or cancellation request"""
     if request.method == 'POST':
@@ -124,6 +123,9 @@ def process_booking_request():
         # Log the incoming request
         logger.info(f"Received request from {user_name}: '{user_input}'")
         
+        # Every LLM call for this request shares one latency budget
+        deadline = Deadline(REQUEST_BUDGET_SECONDS)
+        
         # Get or create session
         active_session = None
         if session_id:
@@ -135,8 +137,9 @@ def process_booking_request():
             active_session = session_manager.get_session(session_id)
             logger.info(f"Created new session {session_id} for {user_name}")
         
-        # Add the user message to the session
-        session_manager.add_message(session_id, 'user', user_input)
+        # Add the user message to the session in the background; it is joined
+        # before the next session write so message order is preserved
+        user_message_saved = task_runner.submit(session_manager.add_message, session_id, 'user', user_input)
         
         # Check if we're waiting for clarification
         context = active_session['context']
@@ -147,7 +150,8 @@ def process_booking_request():
             if clarification_type == 'ambiguous_time':
                 # Parse the clarification response
                 ambiguity_info = context.get('ambiguous_time', {})
-                clarified_time = groq.parse_clarification_response(user_input, ambiguity_info)
+                clarified_time = groq.parse_clarification_response(user_input, ambiguity_info, deadline=deadline)
+                user_message_saved.result()
                 
                 if clarified_time == 'unknown':
                     # Still couldn't understand the time
@@ -200,7 +204,6 @@ def process_booking_request():
                         'ambiguous_time': None
                     }
                 }
-                session_manager.update_session(session_id, updates)
                 
                 # Now proceed with booking using the clarified time
                 date = context.get('date')
@@ -208,19 +211,24 @@ def process_booking_request():
                 # Create a booking object
                 booking = Booking(user_name=user_name, date=date, time=clarified_time)
                 
-                # Try to book the slot
-                result = book_slot(booking)
+                # Try to book the slot while the session context is saved
+                _, result = task_runner.run_all(
+                    (session_manager.update_session, session_id, updates),
+                    (book_slot, booking)
+                )
                 
                 # Generate a natural language response
-                nlp_response = groq.generate_booking_response(result)
-                
-                # Add the response to the session
-                session_manager.add_message(session_id, 'system', nlp_response)
+                reply = submit_reply(session_id, 'booking', result, deadline=deadline)
                 
                 # If booking was successful, mark the session as complete
                 if result['status'] == 'success':
                     session_manager.update_session(session_id, {'status': 'completed'})
                 
+                # Add the response to the session
+                nlp_response = reply.result()
+                if nlp_response is not None:
+                    session_manager.add_message(session_id, 'system', nlp_response)
+                
                 # Add the NLP response to the result
                 result['nlp_response'] = nlp_response
                 result['session_id'] = session_id
@@ -238,9 +246,13 @@ def process_booking_request():
                     # User agreed to suggested time
                     time = suggested_time
                 else:
-                    # User wants a different time - try to extract an hourly time
-                    parsed_time = groq.parse_booking_request(user_input)
-                    new_time = parsed_time.get('time', 'unknown')
+                    # User wants a different time - try to extract an hourly time,
+                    # locally when it's a clear time ("8 pm", "half past 7 in the evening")
+                    new_time = date_parser.extract_time(user_input)
+                    if not new_time:
+                        parsed_time = groq.parse_booking_request(user_input, deadline=deadline)
+                        new_time = parsed_time.get('time', 'unknown')
+                    user_message_saved.result()
                     
                     if new_time != 'unknown' and ':' in new_time:
                         # Check if it's an hourly time
@@ -310,24 +322,29 @@ def process_booking_request():
                         'clarification_type': None
                     }
                 }
-                session_manager.update_session(session_id, updates)
+                user_message_saved.result()
                 
                 # Create a booking object
                 booking = Booking(user_name=user_name, date=date, time=time)
                 
-                # Try to book the slot
-                result = book_slot(booking)
+                # Try to book the slot while the session context is saved
+                _, result = task_runner.run_all(
+                    (session_manager.update_session, session_id, updates),
+                    (book_slot, booking)
+                )
                 
                 # Generate a natural language response
-                nlp_response = groq.generate_booking_response(result)
-                
-                # Add the response to the session
-                session_manager.add_message(session_id, 'system', nlp_response)
+                reply = submit_reply(session_id, 'booking', result, deadline=deadline)
                 
                 # If booking was successful, mark the session as complete
                 if result['status'] == 'success':
                     session_manager.update_session(session_id, {'status': 'completed'})
                 
+                # Add the response to the session
+                nlp_response = reply.result()
+                if nlp_response is not None:
+                    session_manager.add_message(session_id, 'system', nlp_response)
+                
                 # Add the NLP response to the result
                 result['nlp_response'] = nlp_response
                 result['session_id'] = session_id
@@ -360,11 +377,12 @@ def process_booking_request():
                 logger.info(f"Detected follow-up question. Previous context: {previous_context}")
         
         # First determine what the user wants to do
-        intent_info = groq.parse_user_intent(user_input, active_session['context'] if active_session else None)
+        intent_info = groq.parse_user_intent(user_input, active_session['context'] if active_session else None, deadline=deadline)
         intent = intent_info.get('intent')
+        user_message_saved.result()
         
         # For follow-up questions related to time changes, force booking intent
-        if is_follow_up and re.search(r'\b\d+\s*(?:am|pm|a\.m|p\.m|o\'clock)\b', user_input.lower(), re.IGNORECASE):
+        if is_follow_up and date_parser.mentions_time(user_input):
             intent = 'booking'
             logger.info(f"Forcing booking intent due to detected time in follow-up")
         
@@ -380,8 +398,11 @@ def process_booking_request():
         session_manager.update_session(session_id, {'context': {'intent': intent}})
         
         if intent == 'booking':
-            # First try our direct parsing approach for common date references
-            parsed_request = groq.parse_booking_request(user_input, active_session['context'] if active_session else None)
+            # Reuse the extraction parse_user_intent already did, unless the intent was overridden above
+            if intent_info.get('extraction') == 'booking':
+                parsed_request = intent_info
+            else:
+                parsed_request = groq.parse_booking_request(user_input, active_session['context'] if active_session else None, deadline=deadline)
             
             # Log the full parsed request for debugging
             logger.info(f"Parsed booking request: {parsed_request}")
@@ -401,13 +422,9 @@ def process_booking_request():
             
             # Special handling for common holiday references
             if not date or date == "unknown":
-                # Try direct parsing for common holiday references like "Christmas Eve"
-                date_ref = None
-                for holiday in ["christmas eve", "christmas", "new year", "diwali", "holi"]:
-                    if holiday in user_input.lower():
-                        date_ref = holiday
-                        break
-                        
+                # Try direct parsing for holiday references like "Christmas Eve"
+                date_ref = holiday_resolver.find_festival(user_input)
+                
                 if date_ref:
                     # Try to get the date from our holiday resolver
                     holiday_date = holiday_resolver.get_festival_date(date_ref)
@@ -507,11 +524,8 @@ def process_booking_request():
             # Try to book the slot
             result = book_slot(booking)
             
-            # Generate a natural language response
-            nlp_response = groq.generate_booking_response(result, festival_referenced)
-            
-            # Add the response to the session
-            session_manager.add_message(session_id, 'system', nlp_response)
+            # Generate a natural language response while the booking info is persisted
+            reply = submit_reply(session_id, 'booking', result, festival_referenced, deadline=deadline)
             
             # If booking was successful, mark the session as complete and store booking info
             if result['status'] == 'success':
@@ -524,6 +538,11 @@ def process_booking_request():
                 session_manager.update_last_booking(session_id, last_booking)
                 session_manager.update_session(session_id, {'status': 'completed'})
             
+            # Add the response to the session
+            nlp_response = reply.result()
+            if nlp_response is not None:
+                session_manager.add_message(session_id, 'system', nlp_response)
+            
             # Add the NLP response and session_id to the result
             result['nlp_response'] = nlp_response
             result['session_id'] = session_id
@@ -542,7 +561,7 @@ def process_booking_request():
             # If user is referring to their most recent booking
             if is_recent_reference:
                 # Try to cancel the most recent booking
-                result = perform_cancellation(user_name, session_id=session_id)
+                result = perform_cancellation(user_name, session_id=session_id, deadline=deadline)
                 return jsonify(result)
             
             # Handle missing information
@@ -561,12 +580,15 @@ def process_booking_request():
                 )
             
             # Now we have all the information to proceed with cancellation
-            result = perform_cancellation(user_name, date, time, None, session_id)
+            result = perform_cancellation(user_name, date, time, None, session_id, deadline)
             return jsonify(result)
             
         elif intent == 'availability':
-            # Handle availability check request
-            date_info = groq.parse_booking_request(user_input)
+            # Handle availability check request; the date may already be extracted speculatively
+            if intent_info.get('extraction') == 'booking':
+                date_info = intent_info
+            else:
+                date_info = groq.parse_booking_request(user_input, deadline=deadline)
             date = date_info.get('date')
             
             if not date:
@@ -582,8 +604,9 @@ def process_booking_request():
             available_slots = all_slots.to_dict(orient='records')
             
             # Generate a response with the available times
-            nlp_response = groq.generate_available_slots_response(available_slots, date)
-            session_manager.add_message(session_id, 'system', nlp_response)
+            nlp_response = submit_reply(session_id, 'available_slots', available_slots, date, deadline=deadline).result()
+            if nlp_response is not None:
+                session_manager.add_message(session_id, 'system', nlp_response)
             
             # Return the response
             return jsonify({
@@ -605,6 +628,41 @@ def process_booking_request():
     
     return render_template('booking.html')
 
+def process_booking_stream():
+    """Streaming variant of /booking.
+    
+    Sends the status and booking data as soon as they are known, then streams the
+    natural language reply token by token as server-sent events.
+    """
+    g.stream_reply = True
+    response = process_booking_request()
+    payload = response.get_json()
+    pending_reply = g.pop('pending_reply', None)
+    
+    def events():
+        yield sse_event('status', payload)
+        
+        # Clarification questions and errors have no generated reply to stream
+        if pending_reply is None:
+            yield sse_event('done', {'nlp_response': payload.get('nlp_response') or payload.get('message')})
+            return
+        
+        session_id, kind, args, kwargs = pending_reply
+        parts = []
+        for token in getattr(groq, f"stream_{kind}_response")(*args, **kwargs):
+            parts.append(token)
+            yield sse_event('token', {'text': token})
+        
+        nlp_response = ''.join(parts)
+        session_manager.add_message(session_id, 'system', nlp_response)
+        yield sse_event('done', {'nlp_response': nlp_response})
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 def get_available_slots_route():
     """Get all available slots"""
     logger.info("'/slots' endpoint called")
@@ -661,6 +719,14 @@ def reset_bookings():
         'All bookings have been reset' if result else 'Failed to reset bookings'
     )
 
+def get_llm_metrics():
+    """Per-method LLM call counts, token usage and latency, plus rate limiter state"""
+    return jsonify({
+        'status': 'success',
+        'metrics': groq.metrics.snapshot(),
+        'rate_limiter': groq.rate_limiter.snapshot()
+    })
+
 def register_routes(app):
     @app.route('/')
     def index():
@@ -670,6 +736,10 @@ def register_routes(app):
     def booking():
         return process_booking_request()
     
+    @app.route('/booking/stream', methods=['POST'])
+    def booking_stream():
+        return process_booking_stream()
+    
     @app.route('/slots', methods=['GET'])
     def slots_route():
         return get_available_slots_route()
@@ -685,4 +755,8 @@ def register_routes(app):
     @app.route('/reset-bookings', methods=['POST'])
     def reset_bookings_route():
         return reset_bookings()
+    
+    @app.route('/llm-metrics', methods=['GET'])
+    def llm_metrics_route():
+        return get_llm_metrics()
 
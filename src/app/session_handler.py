@@ -2,6 +2,14 @@ import uuid
 from datetime import datetime, timedelta
 import json
 import os
+import zlib
+import threading
+from contextlib import contextmanager
+
+from utils.file_lock import file_lock
+
+# Locks shared by all sessions; two sessions on one stripe just wait for each other
+SESSION_LOCK_STRIPES = 64
 
 class SessionManager:
     """Manages conversation sessions for bookings"""
@@ -16,6 +24,21 @@ class SessionManager:
             
         # Ensure the session directory exists
         os.makedirs(self.session_dir, exist_ok=True)
+        
+        # Striped locks so concurrent read-modify-write cycles don't drop updates;
+        # a fixed set, so they don't pile up as sessions come and go. Each stripe
+        # has a lock file too, which covers the other worker processes
+        self._locks = [threading.Lock() for _ in range(SESSION_LOCK_STRIPES)]
+        self.lock_dir = os.path.join(self.session_dir, '.locks')
+        os.makedirs(self.lock_dir, exist_ok=True)
+    
+    @contextmanager
+    def _session_lock(self, session_id):
+        """Hold the lock guarding a session file, across threads and worker processes"""
+        # crc32 rather than hash(), which differs between processes
+        stripe = zlib.crc32(session_id.encode('utf-8')) % SESSION_LOCK_STRIPES
+        with self._locks[stripe], file_lock(os.path.join(self.lock_dir, f"{stripe}.lock")):
+            yield
     
     def create_session(self, user_name):
         """Create a new conversation session"""
@@ -59,38 +82,40 @@ class SessionManager:
     
     def update_session(self, session_id, updates):
         """Update a session with new data"""
-        session = self.get_session(session_id)
-        if not session:
-            return False
-            
-        # Update the session data
-        for key, value in updates.items():
-            if key == 'context':
-                # For context, update individual fields rather than replacing entire object
-                for context_key, context_value in value.items():
-                    session['context'][context_key] = context_value
-            else:
-                session[key] = value
+        with self._session_lock(session_id):
+            session = self.get_session(session_id)
+            if not session:
+                return False
                 
-        session['last_updated'] = datetime.now().isoformat()
-        
-        return self._save_session(session_id, session)
+            # Update the session data
+            for key, value in updates.items():
+                if key == 'context':
+                    # For context, update individual fields rather than replacing entire object
+                    for context_key, context_value in value.items():
+                        session['context'][context_key] = context_value
+                else:
+                    session[key] = value
+                    
+            session['last_updated'] = datetime.now().isoformat()
+            
+            return self._save_session(session_id, session)
     
     def add_message(self, session_id, role, content):
         """Add a message to the session history"""
-        session = self.get_session(session_id)
-        if not session:
-            return False
+        with self._session_lock(session_id):
+            session = self.get_session(session_id)
+            if not session:
+                return False
+                
+            session['messages'].append({
+                'role': role,
+                'content': content,
+                'timestamp': datetime.now().isoformat()
+            })
             
-        session['messages'].append({
-            'role': role,
-            'content': content,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        session['last_updated'] = datetime.now().isoformat()
-        
-        return self._save_session(session_id, session)
+            session['last_updated'] = datetime.now().isoformat()
+            
+            return self._save_session(session_id, session)
     
     def update_last_booking(self, session_id, booking_info):
         """Update the session with information about the last booking"""
@@ -112,11 +137,18 @@ class SessionManager:
     def _save_session(self, session_id, session_data):
         """Save a session to disk"""
         session_file = os.path.join(self.session_dir, f"{session_id}.json")
+        temp_file = f"{session_file}.{threading.get_ident()}.tmp"
         try:
-            with open(session_file, 'w') as f:
+            # Write to a temp file and swap it in so readers never see a partial file
+            with open(temp_file, 'w') as f:
                 json.dump(session_data, f, indent=2)
+            os.replace(temp_file, session_file)
             return True
         except Exception:
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
             return False
     
     def cleanup_old_sessions(self, max_age_hours=24):
@@ -0,0 +1 @@
+# Benchmark scripts for the booking system, run from src/ with python -m benchmarks.<name>
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Compare the unified date/time parser with the three classes it replaced
+
+The legacy functions below are copies of the routes.py DateParser (one regex
+that takes the first number in the text) and of the utils/app DateParser
+(which were identical apart from the festival table). Each is scored on
+date_time_corpus.jsonl and timed per call, as is the memoized resolver the
+request path uses (after the first pass every call is a dict lookup).
+
+Cases may also say whether the text mentions a time at all ("mentions"),
+which only the unified parser is scored on.
+
+Corpus dates are written relative to today: "+1" is tomorrow,
+"weekday:friday" the next Friday (never today), "12-25" the next 25 December,
+"year:12-24" that day in the current year (how holidays are resolved), or an
+ISO date.
+"""
+
+import os
+import re
+import json
+import time
+import argparse
+from datetime import date, datetime, timedelta
+
+from utils.date_parser import date_parser, date_resolver, mentions_time
+from utils.date_utils import weekday_to_date
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "date_time_corpus.jsonl")
+
+LEGACY_FIXED_HOLIDAYS = {
+    "christmas eve": "12-24", "christmas": "12-25", "new year's eve": "12-31", "new years eve": "12-31",
+    "new year's day": "01-01", "valentine's day": "02-14", "halloween": "10-31",
+    "independence day": "08-15", "republic day": "01-26", "gandhi jayanti": "10-02"
+}
+
+def legacy_routes_extract_time(text):
+    """routes.py DateParser.extract_time"""
+    time_pattern = re.compile(r'(\d{1,2})(?::(\d{2}))?\s*([ap]\.?m\.?)?', re.IGNORECASE)
+    match = time_pattern.search(text)
+    if match:
+        hour = int(match.group(1))
+        minute = match.group(2)
+        ampm = match.group(3)
+        if ampm and ampm.lower().startswith('p') and hour < 12:
+            hour += 12
+        elif ampm and ampm.lower().startswith('a') and hour == 12:
+            hour = 0
+        return f"{hour:02d}:{minute if minute else '00'}"
+    return None
+
+def legacy_extract_time(text):
+    """utils/app DateParser.extract_time: eight substrings per hour"""
+    text = text.lower()
+    for hour in range(1, 13):
+        patterns = [
+            f"{hour}pm", f"{hour} pm", f"{hour}p.m.", f"{hour} p.m.",
+            f"{hour}am", f"{hour} am", f"{hour}a.m.", f"{hour} a.m."
+        ]
+        for pattern in patterns:
+            if pattern in text:
+                if "p" in pattern:
+                    return f"{(hour % 12) + 12:02d}:00"
+                return f"{hour % 12:02d}:00"
+    return None
+
+def legacy_parse_date_reference(text):
+    """utils/app DateParser.parse_date_reference: holiday loop, tomorrow, today, next <weekday>"""
+    text = text.lower()
+    current_year = datetime.now().year
+    for holiday, month_day in LEGACY_FIXED_HOLIDAYS.items():
+        if holiday in text:
+            return f"{current_year}-{month_day}"
+    if "tomorrow" in text:
+        return (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    if "today" in text:
+        return datetime.now().strftime("%Y-%m-%d")
+    if "next" in text:
+        for i, day in enumerate(["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]):
+            if day in text:
+                days_ahead = i - datetime.now().weekday()
+                if days_ahead <= 0:
+                    days_ahead += 7
+                return (datetime.now() + timedelta(days=days_ahead)).strftime("%Y-%m-%d")
+    return None
+
+def expected_date(spec, today):
+    """Turn a corpus date spec into an ISO date"""
+    if spec is None:
+        return None
+    if spec.startswith("+"):
+        return (today + timedelta(days=int(spec[1:]))).isoformat()
+    if spec.startswith("weekday:"):
+        return weekday_to_date(spec.split(":", 1)[1], datetime.combine(today, datetime.min.time()))
+    if spec.startswith("year:"):
+        return f"{today.year}-{spec.split(':', 1)[1]}"
+    if len(spec) == 5:
+        candidate = date.fromisoformat(f"{today.year}-{spec}")
+        return (candidate if candidate >= today else date.fromisoformat(f"{today.year + 1}-{spec}")).isoformat()
+    return spec
+
+def load_corpus(path):
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def time_per_call(fn, texts, repeat):
+    """Mean microseconds per call of fn over texts"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) * 1e6 / (repeat * len(texts))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the unified date/time parser against the legacy classes")
+    parser.add_argument("--corpus", type=str, default=DEFAULT_CORPUS, help="Date/time corpus (JSON lines)")
+    parser.add_argument("--repeat", type=int, default=500, help="Passes over the corpus for timing (default: 500)")
+    parser.add_argument("--show-errors", action="store_true", help="Print every case a parser gets wrong")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    texts = [case["text"] for case in corpus]
+    today = date.today()
+
+    candidates = [
+        ("time", "routes DateParser", legacy_routes_extract_time),
+        ("time", "utils/app DateParser", legacy_extract_time),
+        ("time", "unified parser", date_parser.extract_time),
+        ("date", "utils/app DateParser", legacy_parse_date_reference),
+        ("date", "unified parser", date_parser.parse_date_reference),
+        ("date", "memoized resolver", date_resolver.resolve),
+        ("mentions", "unified parser", mentions_time),
+    ]
+    print(f"{'field':<8} {'parser':<22} {'accuracy':>9} {'us/call':>8}")
+    for field, label, fn in candidates:
+        cases = [case for case in corpus if field in case]
+        wrong = []
+        for case in cases:
+            expected = expected_date(case["date"], today) if field == "date" else case[field]
+            actual = fn(case["text"])
+            if actual != expected:
+                wrong.append((case["text"], expected, actual))
+        accuracy = 100.0 * (len(cases) - len(wrong)) / len(cases)
+        print(f"{field:<8} {label:<22} {accuracy:>8.1f}% {time_per_call(fn, texts, args.repeat):>8.2f}")
+        if args.show_errors:
+            for text, expected, actual in wrong:
+                print(f"    {text!r}: expected {expected}, got {actual}")
+
+if __name__ == "__main__":
+    main()
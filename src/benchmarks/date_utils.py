@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Compare the column-wise date utilities with the row loops they replaced
+
+Builds a synthetic bookings file (1M rows by default) where a share of rows
+is missing either its day or its date, like files written before and after
+the date migration. The legacy functions below are copies of the iterrows
+loops fix_bookings_file, migrate_database and _migrate_day_to_date used to
+run; they are timed on a sample and scaled up, since a full pass takes
+minutes. The vectorized versions are timed on every row, then the
+maintenance commands are run end to end on the file.
+"""
+
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+import pandas as pd
+
+from utils.date_utils import WEEKDAY_NAMES, date_to_weekday, weekday_to_date, dates_to_weekdays, weekdays_to_dates
+from utils import db_maintenance
+
+def make_bookings(rows, missing=0.2, seed=1):
+    """Bookings frame with rows missing their day or their date"""
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    dates, days = [], []
+    for _ in range(rows):
+        booking_date = start + timedelta(days=rng.randrange(365))
+        roll = rng.random()
+        dates.append(None if roll < missing / 2 else booking_date.isoformat())
+        days.append(None if missing / 2 <= roll < missing else WEEKDAY_NAMES[booking_date.weekday()])
+    return pd.DataFrame({
+        "user_name": [f"user{i % 5000}" for i in range(rows)],
+        "day": days,
+        "time": [f"{17 + i % 6}:00" for i in range(rows)],
+        "booking_date": "2025-01-01 12:00:00",
+        "booking_id": range(1, rows + 1),
+        "date": dates
+    })
+
+def legacy_fill_days(df):
+    """fix_bookings_file: date_to_weekday row by row"""
+    for i, row in df.iterrows():
+        if pd.isna(row['day']) and not pd.isna(row['date']):
+            weekday = date_to_weekday(row['date'])
+            if weekday:
+                df.at[i, 'day'] = weekday
+
+def legacy_fill_dates(df):
+    """migrate_database: weekday_to_date row by row"""
+    for i, row in df.iterrows():
+        if not pd.isna(row['day']) and pd.isna(row['date']):
+            next_date = weekday_to_date(row['day'])
+            if next_date:
+                df.at[i, 'date'] = next_date
+
+def vectorized_fill_days(df):
+    missing = df['day'].isna() & df['date'].notna()
+    weekdays = dates_to_weekdays(df.loc[missing, 'date']).dropna()
+    df.loc[weekdays.index, 'day'] = weekdays
+
+def vectorized_fill_dates(df):
+    missing = df['day'].notna() & df['date'].isna()
+    next_dates = weekdays_to_dates(df.loc[missing, 'day']).dropna()
+    df.loc[next_dates.index, 'date'] = next_dates
+
+def timed(fn, df):
+    """Seconds fn takes on a copy of df"""
+    df = df.copy()
+    start = time.perf_counter()
+    fn(df)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark column-wise date utilities against row loops")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows in the synthetic bookings file (default: 1000000)")
+    parser.add_argument("--loop-rows", type=int, default=20_000, help="Rows the legacy loops are timed on (default: 20000)")
+    parser.add_argument("--keep", type=str, help="Write the synthetic file here instead of a temp directory")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = make_bookings(args.rows)
+    print(f"Built {len(df)} bookings in {time.perf_counter() - start:.1f} s")
+
+    sample = df.head(args.loop_rows)
+    scale = len(df) / len(sample)
+    print(f"{'conversion':<22} {'row loop (est.)':>16} {'vectorized':>11} {'speedup':>8}")
+    for label, legacy, vectorized in [
+        ("date -> day", legacy_fill_days, vectorized_fill_days),
+        ("day -> date", legacy_fill_dates, vectorized_fill_dates),
+    ]:
+        loop_seconds = timed(legacy, sample) * scale
+        vector_seconds = timed(vectorized, df)
+        print(f"{label:<22} {loop_seconds:>15.2f}s {vector_seconds:>10.3f}s {loop_seconds / vector_seconds:>7.0f}x")
+
+    # End to end, including reading and writing the CSV
+    work_dir = tempfile.mkdtemp(prefix="bookings-bench-")
+    try:
+        bookings_file = args.keep or os.path.join(work_dir, "bookings.csv")
+        df.to_csv(bookings_file, index=False)
+        print(f"\n{'command':<22} {'seconds':>8}  ({os.path.getsize(bookings_file) / 1e6:.0f} MB file)")
+        for label, command in [("fix_bookings_file", db_maintenance.fix_bookings_file),
+                               ("migrate_database", db_maintenance.migrate_database)]:
+            start = time.perf_counter()
+            command(bookings_file)
+            print(f"{label:<22} {time.perf_counter() - start:>8.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Compare the compiled holiday matcher with the substring loops it replaced
+
+The legacy functions below are copies of the scans the booking route,
+DateParser and the local parser used to run. Each is timed on the replay
+corpus, next to a plain loop over every cache name (what scanning the full
+cache without a matcher would take). The fuzzy index is timed on common
+misspellings against difflib, the stdlib way to find close matches.
+"""
+
+import time
+import difflib
+import argparse
+
+from utils.holiday_resolver import holiday_resolver, COMMON_ALIASES
+from utils.date_parser import DateParser
+from benchmarks.model_routing import DEFAULT_CORPUS, load_corpus
+
+date_parser = DateParser()
+
+def legacy_route_scan(user_input):
+    """Hard-coded list in the booking route"""
+    for holiday in ["christmas eve", "christmas", "new year", "diwali", "holi"]:
+        if holiday in user_input.lower():
+            return holiday
+    return None
+
+def legacy_date_parser_scan(text):
+    """DateParser.parse_date_reference: festivals first, then fixed holidays"""
+    text = text.lower()
+    for festival in ["diwali", "holi", "navratri"]:
+        if festival in text:
+            return festival
+    for holiday in date_parser.fixed_holidays:
+        if holiday in text:
+            return holiday
+    return None
+
+def legacy_local_parser_scan(user_input):
+    """local_parser.find_festival: longest built-in name first"""
+    text = (user_input or "").lower()
+    names = list(date_parser.fixed_holidays) + ["diwali", "holi", "navratri"]
+    for name in sorted(names, key=len, reverse=True):
+        if name in text:
+            return name
+    return None
+
+def cache_names():
+    names = set(COMMON_ALIASES)
+    for holidays in holiday_resolver.holiday_cache.values():
+        names.update(holidays)
+    return sorted(names, key=len, reverse=True)
+
+def make_full_cache_scan(names):
+    def full_cache_scan(user_input):
+        """Longest-first loop over every name in the cache"""
+        text = user_input.lower()
+        for name in names:
+            if name in text:
+                return name
+        return None
+    return full_cache_scan
+
+MISSPELLINGS = ["deewali", "diwaali", "chrismas eve", "dussera", "janmastami", "ganesh chaturti",
+                "independance day", "mothers day", "new years", "pizza"]
+
+def time_per_call(fn, texts, repeat):
+    """Mean microseconds per call of fn over texts"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) * 1e6 / (repeat * len(texts))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compiled holiday matcher against substring loops")
+    parser.add_argument("--corpus", type=str, default=DEFAULT_CORPUS, help="Replay corpus (JSON lines)")
+    parser.add_argument("--repeat", type=int, default=2000, help="Passes over the corpus (default: 2000)")
+    args = parser.parse_args()
+
+    texts = [case["text"] for case in load_corpus(args.corpus)]
+    texts += ["I want a holiday table for 4", "Book for Holi at 7", "christmas evening dinner please"]
+    names = cache_names()
+
+    start = time.perf_counter()
+    matcher = holiday_resolver.matcher
+    print(f"Matcher over {len(matcher)} names built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    candidates = [
+        ("route list (5 names)", legacy_route_scan),
+        ("DateParser loops", legacy_date_parser_scan),
+        ("local_parser sorted scan", legacy_local_parser_scan),
+        (f"loop over cache ({len(names)} names)", make_full_cache_scan(names)),
+        ("compiled matcher", matcher.find),
+    ]
+    print(f"{'scan':<34} {'us/call':>8}")
+    for label, fn in candidates:
+        print(f"{label:<34} {time_per_call(fn, texts, args.repeat):>8.2f}")
+
+    # Where the answers differ, e.g. "holi" found inside "holiday"
+    full_cache_scan = make_full_cache_scan(names)
+    for text in texts:
+        old, new = full_cache_scan(text), matcher.find(text)
+        if old != new:
+            print(f"  {text!r}: loop={old!r} matcher={new!r}")
+
+    fuzzy_index = holiday_resolver.fuzzy_index
+    print(f"\n{'fuzzy lookup':<34} {'us/call':>8}")
+    fuzzy_candidates = [
+        ("difflib.get_close_matches", lambda text: difflib.get_close_matches(text, fuzzy_index.names, n=5, cutoff=0.6)),
+        ("trigram index", fuzzy_index.search),
+    ]
+    for label, fn in fuzzy_candidates:
+        print(f"{label:<34} {time_per_call(fn, MISSPELLINGS, max(1, args.repeat // 10)):>8.2f}")
+    for text in MISSPELLINGS:
+        best = fuzzy_index.search(text, limit=1)
+        print(f"  {text!r}: {best[0][0] + f' ({best[0][1]:.2f})' if best else '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Measure how throughput scales with server worker processes and threads
+
+Each configuration starts serve.py in a subprocess (so the production server
+and settings are what's measured), loads it with concurrent keep-alive
+clients for a fixed time and stops it with SIGTERM. The default path,
+/slots, reads the bookings file and builds the free-slot table with pandas,
+so it's CPU-bound and shows how extra processes use extra cores; threads
+mostly help I/O-bound requests such as /booking waiting on the LLM.
+
+The clients run in this process, so on a small machine they compete with
+the server for CPU; leave a core free for them when you can.
+
+Run from src/: python -m benchmarks.load_test --workers 1 2 4 --threads 4
+"""
+
+import os
+import sys
+import time
+import socket
+import signal
+import argparse
+import subprocess
+import http.client
+import threading
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    index = max(0, int(round(pct / 100.0 * len(ordered))) - 1)
+    return ordered[index]
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(server, workers, threads, port):
+    env = dict(os.environ, WEB_SERVER=server, WEB_WORKERS=str(workers), WEB_THREADS=str(threads),
+               HOST="127.0.0.1", PORT=str(port))
+    process = subprocess.Popen([sys.executable, "serve.py"], cwd=SRC_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"serve.py exited with status {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("serve.py did not start listening within 60s")
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+def run_load(port, path, concurrency, duration):
+    """Hammer path from `concurrency` keep-alive clients; returns (latencies in ms, errors)"""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        mine = []
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    raise http.client.HTTPException(f"status {response.status}")
+                mine.append((time.perf_counter() - start) * 1000)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        connection.close()
+        with lock:
+            latencies.extend(mine)
+
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return latencies, errors[0]
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test serve.py across worker/thread configurations")
+    parser.add_argument("--server", choices=["gunicorn", "waitress"], default="gunicorn", help="Server to test (default: gunicorn)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker process counts to try (default: 1 2 4)")
+    parser.add_argument("--threads", type=int, nargs="+", default=[4], help="Threads per worker to try (default: 4)")
+    parser.add_argument("--path", type=str, default="/slots", help="GET path to load (default: /slots)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients (default: 16)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per configuration (default: 10)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of unmeasured load first (default: 2)")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.concurrency} clients, GET {args.path}, {args.duration:.0f}s per run")
+    print(f"{'workers':>7} {'threads':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+    baseline = None
+    for workers in args.workers:
+        for threads in args.threads:
+            port = free_port()
+            process = start_server(args.server, workers, threads, port)
+            try:
+                run_load(port, args.path, args.concurrency, args.warmup)
+                latencies, errors = run_load(port, args.path, args.concurrency, args.duration)
+            finally:
+                stop_server(process)
+            throughput = len(latencies) / args.duration
+            baseline = baseline or throughput
+            p50 = percentile(latencies, 50) if latencies else float("nan")
+            p95 = percentile(latencies, 95) if latencies else float("nan")
+            print(f"{workers:>7} {threads:>7} {throughput:>8.1f} {p50:>8.1f} {p95:>8.1f} {errors:>6}"
+                  f"   ({throughput / baseline:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Compare latency and accuracy of the routed LLM methods per model on a replay corpus
+
+Each corpus line is a real user message from the session logs with the expected
+intent and, for bookings and cancellations, the expected time, festival and
+recent-booking flag. Every routed method is run once per message and model.
+"""
+
+import os
+import re
+import json
+import time
+import argparse
+
+from llm.groq_handler import GroqHandler, SMALL_MODEL_METHODS
+from llm.stub_server import StubConfig, start_in_thread
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "replay_corpus.jsonl")
+DEFAULT_MODELS = ["llama-3.1-8b-instant", "llama3-70b-8192"]
+
+def load_corpus(path):
+    """Read the replay corpus, one JSON object per line"""
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    index = max(0, int(round(pct / 100.0 * len(ordered))) - 1)
+    return ordered[index]
+
+def normalize(name):
+    return re.sub(r"[^a-z0-9]", "", (name or "").lower())
+
+def same_festival(expected, actual):
+    """Festival names match loosely, so "Janmashtami" counts for a misspelt "Janmashtmi" """
+    expected, actual = normalize(expected), normalize(actual)
+    if not expected or not actual:
+        return expected == actual
+    return expected in actual or actual in expected or expected[:5] == actual[:5]
+
+def extraction_correct(case, parsed):
+    """Whether an extraction result agrees with every expected field of the case"""
+    if "time" in case and parsed.get("time") != case["time"]:
+        return False
+    if not same_festival(case.get("festival"), parsed.get("festival_referenced")):
+        return False
+    if "is_recent_reference" in case and bool(parsed.get("is_recent_reference")) != case["is_recent_reference"]:
+        return False
+    return True
+
+def run_case(handler, method, case):
+    """Run one routed method on one corpus entry; returns (latency ms, correct) or None if not applicable"""
+    if method == "classify_intent":
+        start = time.perf_counter()
+        intent = handler.classify_intent(case["text"])
+        return (time.perf_counter() - start) * 1000, intent == case["intent"]
+
+    builders = {
+        "extract_booking_details": ("booking", handler._booking_extraction_request),
+        "extract_cancellation_details": ("cancellation", handler._cancellation_extraction_request),
+    }
+    if method not in builders or builders[method][0] != case["intent"]:
+        return None
+
+    # Time the bare extraction call; festival resolution isn't part of the route
+    data = builders[method][1](case["text"])
+    start = time.perf_counter()
+    content = handler._chat_completion(data, None, method)
+    latency_ms = (time.perf_counter() - start) * 1000
+    try:
+        return latency_ms, extraction_correct(case, json.loads(content))
+    except json.JSONDecodeError:
+        return latency_ms, False
+
+def evaluate(handler, model, corpus, methods):
+    """Route the methods to model and score them on the corpus"""
+    handler.model_routes = {method: model for method in SMALL_MODEL_METHODS}
+    results = []
+    for method in methods:
+        latencies, correct, errors = [], 0, 0
+        for case in corpus:
+            try:
+                outcome = run_case(handler, method, case)
+            except Exception as e:
+                errors += 1
+                print(f"  {method} on {case['text']!r} failed: {e}")
+                continue
+            if outcome is None:
+                continue
+            latencies.append(outcome[0])
+            correct += outcome[1]
+        results.append((method, model, latencies, correct, errors))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and accuracy of LLM routes per model")
+    parser.add_argument("--corpus", type=str, default=DEFAULT_CORPUS, help="Replay corpus (JSON lines)")
+    parser.add_argument("--models", type=str, nargs="+", default=DEFAULT_MODELS, help="Models to compare")
+    parser.add_argument("--methods", type=str, nargs="+",
+                        default=["classify_intent", "extract_booking_details", "extract_cancellation_details"],
+                        help="Routed methods to evaluate")
+    parser.add_argument("--stub", action="store_true", help="Answer from the local stand-in server instead of Groq")
+    args = parser.parse_args()
+
+    handler = GroqHandler()
+    # Measure the model, not the client-side limits or the breaker
+    handler.rate_limiter.buckets = {}
+    handler.circuit_breaker.failure_threshold = float("inf")
+    if args.stub:
+        # The stand-in's answers don't depend on the model, so only latency differs there
+        stub_config = StubConfig(latency="lognormal", latency_ms=400, seed=1,
+                                 model_latency_ms={args.models[0]: 150})
+        stub_server, handler.base_url = start_in_thread(stub_config)
+        handler.api_available = True
+
+    corpus = load_corpus(args.corpus)
+    print(f"{'route':<30} {'model':<24} {'n':>4} {'accuracy':>9} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+    for model in args.models:
+        for method, model_name, latencies, correct, errors in evaluate(handler, model, corpus, args.methods):
+            n = len(latencies)
+            if not n:
+                print(f"{method:<30} {model_name:<24} {0:>4} {'-':>9} {'-':>8} {'-':>8} {errors:>6}")
+                continue
+            print(f"{method:<30} {model_name:<24} {n:>4} {100.0 * correct / n:>8.1f}% "
+                  f"{percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f} {errors:>6}")
+
+if __name__ == "__main__":
+    main()
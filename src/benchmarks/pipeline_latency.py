@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Compare /booking latency with the request pipeline running sequentially and in parallel
+
+With --stub the Groq calls go to the local stand-in server (llm/stub_server.py),
+so the benchmark runs offline with a controlled LLM latency.
+"""
+
+import os
+import time
+import uuid
+import argparse
+import tempfile
+import statistics
+
+from app.db_handler import BookingDatabase
+from app.session_handler import SessionManager
+import app.routes as routes
+from llm.stub_server import StubConfig, start_in_thread
+from main import app
+
+DEFAULT_REQUESTS = [
+    "Book a table for tomorrow at 7 PM",
+    "Reserve a table for next Friday at 8 PM",
+    "What slots do you have available tomorrow?",
+    "Cancel my reservation",
+]
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    index = max(0, int(round(pct / 100.0 * len(ordered))) - 1)
+    return ordered[index]
+
+def run_requests(client, count):
+    """Send count booking requests and return their latencies in milliseconds"""
+    latencies = []
+    for i in range(count):
+        payload = {
+            'user_name': f"bench-{uuid.uuid4().hex[:8]}",
+            'booking_request': DEFAULT_REQUESTS[i % len(DEFAULT_REQUESTS)]
+        }
+        start = time.perf_counter()
+        client.post('/booking', json=payload)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def report(label, latencies):
+    """Print a one-line latency summary"""
+    print(f"{label:<12} n={len(latencies):<4} mean={statistics.mean(latencies):8.1f} ms  "
+          f"p50={percentile(latencies, 50):8.1f} ms  p95={percentile(latencies, 95):8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /booking latency before and after pipeline fan-out")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per mode (default: 20)")
+    parser.add_argument("--stub", action="store_true", help="Answer Groq calls from the local stand-in server")
+    parser.add_argument("--stub-latency-ms", type=float, default=300.0, help="Median stand-in latency in ms (default: 300)")
+    args = parser.parse_args()
+
+    if args.stub:
+        stub_server, base_url = start_in_thread(StubConfig(latency="lognormal", latency_ms=args.stub_latency_ms, seed=1))
+        routes.groq.base_url = base_url
+        routes.groq.api_available = True
+
+    # Keep benchmark bookings and sessions out of the real data directory
+    work_dir = tempfile.mkdtemp(prefix="pipeline-bench-")
+    routes.db = BookingDatabase(os.path.join(work_dir, 'bookings.csv'))
+    routes.session_manager = SessionManager(os.path.join(work_dir, 'sessions'))
+
+    client = app.test_client()
+    results = {}
+    for label, enabled in (("sequential", False), ("parallel", True)):
+        routes.task_runner.enabled = enabled
+        routes.db.reset_all_bookings()
+        results[label] = run_requests(client, args.requests)
+
+    for label, latencies in results.items():
+        report(label, latencies)
+
+    speedup = statistics.mean(results["sequential"]) / statistics.mean(results["parallel"])
+    print(f"Mean speedup: {speedup:.2f}x (data in {work_dir})")
+
+if __name__ == "__main__":
+    main()
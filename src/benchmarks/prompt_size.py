@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Compare system prompt sizes before and after prompt compaction, per LLM method
+"""
+
+import json
+import argparse
+from datetime import datetime, timedelta
+
+from llm import prompts
+from llm.groq_handler import GroqHandler
+
+SESSION_CONTEXT = {'last_booking_date': '2025-06-15', 'last_booking_time': '19:00'}
+BOOKING_RESULT = {
+    'status': 'success',
+    'message': 'Booking confirmed for 2025-06-15 at 19:00',
+    'date': '2025-06-15',
+    'time': '19:00',
+    'user_name': 'bench'
+}
+
+class LegacyPrompts:
+    """System prompts exactly as GroqHandler built them before compaction"""
+
+    @staticmethod
+    def parse_user_intent(session_context=None):
+        context_str = ""
+        if session_context:
+            last_booking_date = session_context.get('last_booking_date')
+            last_booking_time = session_context.get('last_booking_time')
+            if last_booking_date and last_booking_time:
+                context_str = f"The user's most recent booking was on {last_booking_date} at {last_booking_time}."
+        
+        system_message = f"""
+        You are a reservation assistant for Paradise Grill restaurant.
+        
+        {context_str}
+        
+        Analyze the user request and classify their intent.
+        
+        If the user wants to cancel a booking, respond with: {{"intent": "cancellation"}}
+        If the user wants to make a new booking, respond with: {{"intent": "booking"}}
+        If the user wants to check available slots, respond with: {{"intent": "availability"}}
+        If you cannot determine the intent, respond with: {{"intent": "unknown"}}
+
+        Examples of booking requests:
+        - "Book a table for June 15th at 7 PM" → {{"intent": "booking"}}
+        - "Reserve for tomorrow at 9" → {{"intent": "booking"}}
+        - "Book a table at 9PM on Christmas Eve" → {{"intent": "booking"}}
+        - "I'd like to dine next Friday evening at 6" → {{"intent": "booking"}}
+        - "Cancel my reservation" → {{"intent": "cancellation"}}
+        - "What slots do you have available next Tuesday?" → {{"intent": "availability"}}
+        
+        ONLY return the JSON object with the intent. No other explanatory text.
+        """
+        return system_message
+
+    @staticmethod
+    def extract_booking_details(session_context=None):
+        today_date = datetime.now().strftime("%Y-%m-%d")
+        current_year = datetime.now().year
+        
+        reference_context = ""
+        if session_context:
+            last_booking_date = session_context.get('last_booking_date')
+            last_booking_time = session_context.get('last_booking_time')
+            if last_booking_date and last_booking_time:
+                reference_context = f"The user's most recent booking was on {last_booking_date} at {last_booking_time}."
+        
+        system_message = f"""
+        You are an assistant for Paradise Grill restaurant helping to understand booking requests.
+        Today's date is {today_date}. The current year is {current_year}.
+        {reference_context}
+        
+        Your task:
+        1. Extract the date if explicitly mentioned (e.g., "June 15th", "tomorrow", "next Friday").
+        2. Extract the time mentioned.
+        3. Extract the name of any festival or holiday mentioned (e.g., "Diwali", "Christmas Eve").
+        4. Convert extracted date references (like "tomorrow", "next Friday") to YYYY-MM-DD format.
+        5. Convert extracted time references to 24-hour HH:MM format.
+        
+        Return ONLY a JSON object with this format:
+        {{
+            "date": "YYYY-MM-DD or null if only festival mentioned", 
+            "time": "HH:MM or null",
+            "festival_referenced": "Name of festival/holiday or null"
+        }}
+        
+        Examples:
+        - "Book a table for June 15th at 7 PM" -> {{"date": "{current_year}-06-15", "time": "19:00", "festival_referenced": null}}
+        - "Reserve for tomorrow at 9" -> {{"date": "{(datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')}", "time": "09:00", "festival_referenced": null}}
+        - "Book a table at 9PM on Diwali" -> {{"date": null, "time": "21:00", "festival_referenced": "Diwali"}}
+        - "I'd like to dine next Friday evening at 6" -> {{"date": "YYYY-MM-DD", "time": "18:00", "festival_referenced": null}}
+        - "Reserve for Christmas Eve 8pm" -> {{"date": null, "time": "20:00", "festival_referenced": "Christmas Eve"}}
+        
+        If a festival/holiday is mentioned, return its name in 'festival_referenced' and set 'date' to null unless a specific date was ALSO mentioned.
+        Do NOT try to calculate the date for the festival yourself. Just extract the name.
+        """
+        return system_message
+
+    @staticmethod
+    def extract_cancellation_details(session_context=None):
+        today_date = datetime.now().strftime("%Y-%m-%d")
+        current_year = datetime.now().year
+        
+        reference_context = ""
+        if session_context:
+            last_booking_date = session_context.get('last_booking_date')
+            last_booking_time = session_context.get('last_booking_time')
+            if last_booking_date and last_booking_time:
+                reference_context = f"The user's most recent booking was on {last_booking_date} at {last_booking_time}."
+        
+        system_message = f"""
+        You are an assistant for Paradise Grill restaurant helping to understand cancellation requests.
+        Today's date is {today_date}. The current year is {current_year}.
+        {reference_context}
+        
+        Your task:
+        1. Extract the date if explicitly mentioned (e.g., "Cancel my booking for June 15th").
+        2. Extract the time if mentioned (e.g., "Cancel my 7PM reservation").
+        3. Extract the name of any festival or holiday mentioned (e.g., "Cancel my Diwali booking").
+        4. Detect if the user is referring to their most recent booking (e.g., "Cancel my reservation").
+        5. Convert extracted date references to YYYY-MM-DD format.
+        6. Convert extracted time references to 24-hour HH:MM format.
+        
+        Return ONLY a JSON object with this format:
+        {{
+            "date": "YYYY-MM-DD or null if not specified", 
+            "time": "HH:MM or null if not specified",
+            "festival_referenced": "Name of festival/holiday or null",
+            "is_recent_reference": true/false (true if user seems to be referring to their most recent booking)
+        }}
+        
+        Examples:
+        - "Cancel my reservation for June 15th at 7 PM" -> {{"date": "{current_year}-06-15", "time": "19:00", "festival_referenced": null, "is_recent_reference": false}}
+        - "Cancel my booking" -> {{"date": null, "time": null, "festival_referenced": null, "is_recent_reference": true}}
+        - "Cancel my Diwali reservation" -> {{"date": null, "time": null, "festival_referenced": "Diwali", "is_recent_reference": false}}
+        """
+        return system_message
+
+    @staticmethod
+    def booking_response(result, festival_referenced=None):
+        status = result.get('status', 'unknown')
+        date = result.get('date', '')
+        time = result.get('time', '')
+        
+        date_str = date
+        try:
+            date_obj = datetime.strptime(date, "%Y-%m-%d")
+            date_str = date_obj.strftime("%A, %B %d")
+        except:
+            pass
+        
+        festival_context = ""
+        if festival_referenced:
+            festival_context = f" for {festival_referenced}"
+        
+        system_message = f"""
+        Generate a friendly response for a Paradise Grill booking result:
+        
+        Result: {json.dumps(result)}
+        
+        Information:
+        - This is for Paradise Grill restaurant
+        - Reservation{festival_context} on {date_str} at {time}
+        - Status: {status}
+        
+        If the booking was successful, sound excited and welcoming.
+        If it failed, offer apologies and suggest alternatives.
+        Keep your response concise (2-3 sentences).
+        """
+        return system_message
+
+def current_prompts(handler, session_context):
+    """System prompts as GroqHandler builds them now"""
+    now = datetime.now()
+    return {
+        "parse_user_intent": prompts.intent_prompt(session_context),
+        "extract_booking_details": prompts.booking_extraction_prompt(now, session_context),
+        "extract_cancellation_details": prompts.cancellation_extraction_prompt(now, session_context),
+        "booking_response": handler._booking_response_request(BOOKING_RESULT, "Diwali")["messages"][0]["content"],
+    }
+
+def legacy_prompts(session_context):
+    return {
+        "parse_user_intent": LegacyPrompts.parse_user_intent(session_context),
+        "extract_booking_details": LegacyPrompts.extract_booking_details(session_context),
+        "extract_cancellation_details": LegacyPrompts.extract_cancellation_details(session_context),
+        "booking_response": LegacyPrompts.booking_response(BOOKING_RESULT, "Diwali"),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Report prompt size savings per LLM method")
+    parser.add_argument("--no-context", action="store_true", help="Build prompts without a previous booking in the session")
+    args = parser.parse_args()
+
+    session_context = None if args.no_context else SESSION_CONTEXT
+    legacy = legacy_prompts(session_context)
+    current = current_prompts(GroqHandler(api_key="benchmark"), session_context)
+
+    print(f"{'method':<30} {'legacy chars':>12} {'new chars':>10} {'legacy tok':>10} {'new tok':>8} {'saved':>7}")
+    total_legacy = total_new = 0
+    for method, old_prompt in legacy.items():
+        new_prompt = current[method]
+        total_legacy += len(old_prompt)
+        total_new += len(new_prompt)
+        saved = 100.0 * (len(old_prompt) - len(new_prompt)) / len(old_prompt)
+        print(f"{method:<30} {len(old_prompt):>12} {len(new_prompt):>10} "
+              f"{prompts.estimate_tokens(old_prompt):>10} {prompts.estimate_tokens(new_prompt):>8} {saved:>6.1f}%")
+
+    saved = 100.0 * (total_legacy - total_new) / total_legacy
+    print(f"{'total':<30} {total_legacy:>12} {total_new:>10} "
+          f"{total_legacy // 4:>10} {total_new // 4:>8} {saved:>6.1f}%")
+
+if __name__ == "__main__":
+    main()
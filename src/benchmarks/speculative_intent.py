@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Compare parse_user_intent latency with and without speculative extraction
+
+Runs the booking, cancellation and availability messages of the replay corpus
+against the local stand-in server with a fixed per-call latency, so the result
+can be read in round trips: sequential classification plus extraction takes
+about two, speculation should bring a correctly guessed turn close to one.
+Festival messages are left out because resolving the festival date adds
+calls of its own.
+"""
+
+import time
+import argparse
+import statistics
+
+from llm.groq_handler import GroqHandler
+from llm.stub_server import StubConfig, start_in_thread
+from benchmarks.model_routing import DEFAULT_CORPUS, load_corpus, percentile
+
+def run(handler, cases, speculative):
+    """Time parse_user_intent on every case; returns latencies in milliseconds"""
+    handler.speculative_extraction = speculative
+    latencies = []
+    for case in cases:
+        start = time.perf_counter()
+        handler.parse_user_intent(case["text"])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark speculative extraction in parse_user_intent")
+    parser.add_argument("--corpus", type=str, default=DEFAULT_CORPUS, help="Replay corpus (JSON lines)")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Stand-in latency per call in ms (default: 200)")
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over the corpus per mode (default: 3)")
+    args = parser.parse_args()
+
+    handler = GroqHandler(api_key="benchmark")
+    handler.rate_limiter.buckets = {}
+    stub_server, handler.base_url = start_in_thread(StubConfig(latency_ms=args.latency_ms))
+
+    cases = [case for case in load_corpus(args.corpus)
+             if case["intent"] in ("booking", "cancellation", "availability") and not case.get("festival")]
+    cases = cases * args.rounds
+
+    results = {}
+    for label, speculative in (("sequential", False), ("speculative", True)):
+        results[label] = run(handler, cases, speculative)
+
+    for label, latencies in results.items():
+        mean = statistics.mean(latencies)
+        print(f"{label:<12} n={len(latencies):<4} mean={mean:8.1f} ms  p50={percentile(latencies, 50):8.1f} ms  "
+              f"p95={percentile(latencies, 95):8.1f} ms  ({mean / args.latency_ms:.2f} round trips)")
+
+    snapshot = handler.metrics.snapshot()
+    hits = sum(entry.get("speculative_hits", 0) for entry in snapshot.values())
+    wasted = sum(entry.get("speculative_wasted", 0) for entry in snapshot.values())
+    print(f"Speculative extractions: {hits} used, {wasted} dropped")
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,95 @@
 import os
 import json
+import asyncio
 import requests
 import pandas as pd
 from dotenv import load_dotenv
 import logging
 import re
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from datetime import datetime
 
 # Fix the import path to use relative import
 from utils.holiday_resolver import holiday_resolver
+from utils.date_parser import find_time_expression, match_clarification, session_day
+from utils.date_utils import date_to_weekday
+from llm.single_flight import SingleFlight
+from llm.resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, LLMUnavailableError
+from llm import local_parser, prompts
+from llm.metrics import LLMMetrics
+from llm.rate_limiter import HIGH, LOW, RateLimiter, RateLimitedError
+from utils.concurrency import task_runner
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Cosmetic reply generation; everything else (intent, extraction, clarification)
+# decides what the app does and is served first when the rate limit is tight
+LOW_PRIORITY_METHODS = {"generate_response", "booking_response", "cancellation_response", "available_slots_response"}
+
+# Short structured jobs that a small, fast model handles as well as the large one;
+# anything not listed (free-text replies) goes to the handler's model_name
+SMALL_MODEL_METHODS = (
+    "classify_intent", "extract_booking_details", "extract_cancellation_details",
+    "holiday_date", "parse_clarification_response", "extract_raw_time_expression"
+)
+
+# Extraction each intent needs; availability only needs the date, which the booking
+# extraction provides, so it is used when it was already started speculatively
+INTENT_EXTRACTIONS = {"booking": "booking", "cancellation": "cancellation", "availability": "booking"}
+
+def parse_model_routes(spec):
+    """Parse "method=model,method=model" into a dict"""
+    routes = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            method, model = item.split("=", 1)
+            routes[method.strip()] = model.strip()
+    return routes
+
+class SpeculativeExtraction:
+    """An extraction call started before the intent is known"""
+    
+    def __init__(self, kind, future):
+        self.kind = kind
+        self.future = future
+        self.claimed = False
+    
+    def claim(self, kind):
+        """Hand over the call if it is the extraction that turned out to be needed"""
+        if kind != self.kind:
+            return None
+        self.claimed = True
+        return self.future
+    
+    def drop(self):
+        """Give up on an unclaimed call; one already on the wire finishes and is ignored"""
+        if not self.claimed:
+            self.future.cancel()
+        return not self.claimed
+
+class GroqAPIError(Exception):
+    """Raised when the Groq API answers with a non-200 status"""
+    
+    def __init__(self, status_code, text):
+        super().__init__(f"{status_code} - {text}")
+        self.status_code = status_code
+        self.text = text
+
 class GroqHandler:
     def __init__(self, model_name="llama3-70b-8192", api_key=None):
         # Load environment variables from .env file
         load_dotenv()
         
         self.model_name = model_name
+        
+        # Per-method model routing: GROQ_SMALL_MODEL for the structured jobs, model_name
+        # for the rest, with GROQ_MODEL_ROUTES ("method=model,...") overriding either
+        small_model = os.environ.get("GROQ_SMALL_MODEL", "llama-3.1-8b-instant")
+        self.model_routes = {method: small_model for method in SMALL_MODEL_METHODS}
+        self.model_routes.update(parse_model_routes(os.environ.get("GROQ_MODEL_ROUTES")))
         # Priority: 1. Passed API key, 2. .env file (loaded via dotenv), 3. Environment variable
         self.api_key = api_key or os.environ.get("GROQ_API_KEY")
         
@@ -30,371 +100,487 @@ class GroqHandler:
         else:
             self.api_available = True
             
-        self.base_url = "https://api.groq.com/openai/v1"
+        # GROQ_BASE_URL points the handler at another compatible server, e.g. llm/stub_server.py
+        self.base_url = os.environ.get("GROQ_BASE_URL", "https://api.groq.com/openai/v1").rstrip("/")
         self.headers = {
             "Authorization": f"Bearer {self.api_key}" if self.api_key else "",
             "Content-Type": "application/json"
         }
         
+        # Identical requests that are in flight at the same time share one upstream call
+        self.single_flight = SingleFlight()
+        
+        # Upper bound for a single HTTP call; a request deadline can shorten it further
+        self.request_timeout = float(os.environ.get("GROQ_TIMEOUT_SECONDS", "10"))
+        
+        # Stop calling Groq after repeated failures or slow calls and degrade to local parsing
+        self.circuit_breaker = CircuitBreaker(
+            "groq",
+            failure_threshold=int(os.environ.get("GROQ_BREAKER_FAILURES", "5")),
+            slow_call_seconds=float(os.environ.get("GROQ_BREAKER_SLOW_SECONDS", "8")),
+            reset_timeout=float(os.environ.get("GROQ_BREAKER_RESET_SECONDS", "30"))
+        )
+        
+        # Per-method call counts, token usage and latency
+        self.metrics = LLMMetrics()
+        
+        # Start the likely extraction together with intent classification
+        self.speculative_extraction = os.environ.get("GROQ_SPECULATIVE_EXTRACTION", "1") != "0"
+        
+        # Stay under the account's requests/tokens per minute instead of running into 429s
+        self.rate_limiter = RateLimiter(
+            requests_per_minute=int(os.environ.get("GROQ_RPM", "30")),
+            tokens_per_minute=int(os.environ.get("GROQ_TPM", "6000")),
+            low_priority_reserve=float(os.environ.get("GROQ_LOW_PRIORITY_RESERVE", "0.2")),
+            low_priority_max_wait=float(os.environ.get("GROQ_LOW_PRIORITY_MAX_WAIT_SECONDS", "0.5"))
+        )
+        
+    def model_for(self, method):
+        """Model that serves the given method"""
+        return self.model_routes.get(method, self.model_name)
+    
     def _check_api_available(self):
         """Check if API is available before making calls"""
         if not self.api_available:
             return False, "Groq API key not available. Please configure your API key."
         return True, ""
     
-    def generate_response(self, prompt):
+    def _call_timeout(self, deadline=None):
+        """Timeout for the next HTTP call; raises DeadlineExceeded when the budget is spent"""
+        if deadline is None:
+            return self.request_timeout
+        return deadline.timeout(self.request_timeout)
+    
+    def _request_tokens(self, data):
+        """Tokens a request may use: the estimated prompt plus the completion limit"""
+        return prompts.prompt_chars(data["messages"]) // 4 + data.get("max_tokens", 0)
+    
+    def _usage_tokens(self, usage):
+        """Total tokens a call actually used, from the API's usage field"""
+        usage = usage or {}
+        return usage.get("total_tokens") or usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+    
+    def _acquire_rate_limit(self, data, method, timeout):
+        """Wait for the rate limiter; returns the token estimate and the timeout left for the call"""
+        priority = LOW if method in LOW_PRIORITY_METHODS else HIGH
+        tokens = self._request_tokens(data)
+        try:
+            waited = self.rate_limiter.acquire(tokens, priority, timeout)
+        except RateLimitedError:
+            self.metrics.record_rate_limited(method)
+            raise
+        return tokens, timeout - waited
+    
+    def _admit(self, data, method, timeout):
+        """Check the circuit breaker, then wait for the rate limiter.
+
+        The breaker goes first so calls it would reject don't spend rate-limit
+        tokens; a call it let through that the rate limiter then refuses hands
+        its slot back. Returns the token estimate and the timeout left.
+        """
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpenError("Groq circuit breaker is open")
+        try:
+            return self._acquire_rate_limit(data, method, timeout)
+        except Exception:
+            self.circuit_breaker.cancel()
+            raise
+    
+    def _handle_rate_limit_response(self, response):
+        """Pause the rate limiter for as long as a 429 response asks"""
+        try:
+            retry_after = float(response.headers.get("retry-after", 2))
+        except (TypeError, ValueError):
+            retry_after = 2.0
+        self.rate_limiter.backoff(retry_after)
+    
+    def _post_chat_completion(self, data, timeout, method="generate_response"):
+        """Send a chat completion request and return the message content.
+        
+        Runs once per coalesced call, so only real upstream calls count against
+        the rate limiter and the circuit breaker.
+        """
+        url = f"{self.base_url}/chat/completions"
+        estimated_tokens, timeout = self._admit(data, method, timeout)
+        
+        start = time.monotonic()
+        try:
+            response = requests.post(url, headers=self.headers, json=data, timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            self.circuit_breaker.record_failure(str(e))
+            self.metrics.record_error(method)
+            raise
+        
+        # Rate limiting and server errors mean the dependency is unhealthy; other
+        # client errors are our own fault and don't count against it
+        if response.status_code == 429 or response.status_code >= 500:
+            self.circuit_breaker.record_failure(f"HTTP {response.status_code}")
+        else:
+            self.circuit_breaker.record_success(time.monotonic() - start)
+        if response.status_code == 429:
+            self._handle_rate_limit_response(response)
+        
+        if response.status_code != 200:
+            self.metrics.record_error(method)
+            raise GroqAPIError(response.status_code, response.text)
+        
+        response_json = response.json()
+        usage = response_json.get("usage") or {}
+        self.rate_limiter.reconcile(estimated_tokens, self._usage_tokens(usage))
+        self.metrics.record(method, (time.monotonic() - start) * 1000, usage,
+                            prompts.prompt_chars(data["messages"]), data.get("model"))
+        return response_json["choices"][0]["message"]["content"]
+    
+    def _completion_key(self, data):
+        """Key identifying identical completion requests"""
+        return json.dumps(data, sort_keys=True)
+    
+    def _chat_completion(self, data, deadline=None, method="generate_response"):
+        """Get a chat completion, sharing the upstream call with identical in-flight requests.
+        
+        Raises CircuitOpenError while the breaker is open, RateLimitedError when the
+        rate limiter can't fit the call in, and DeadlineExceeded when the request's
+        budget runs out before an answer arrives.
+        """
+        timeout = self._call_timeout(deadline)
+        try:
+            return self.single_flight.do(self._completion_key(data), self._post_chat_completion,
+                                         data, timeout, method, timeout=timeout)
+        except FuturesTimeoutError:
+            raise DeadlineExceeded("Timed out waiting for an identical in-flight Groq call")
+    
+    async def chat_completion_async(self, data, deadline=None, method="generate_response"):
+        """Async variant of _chat_completion; coalesces with both threads and other tasks"""
+        timeout = self._call_timeout(deadline)
+        try:
+            return await self.single_flight.do_async(self._completion_key(data), self._post_chat_completion,
+                                                     data, timeout, method, timeout=timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("Timed out waiting for an identical in-flight Groq call")
+    
+    def generate_response(self, prompt, deadline=None):
         """Generate a response from the Groq API"""
         api_available, error_msg = self._check_api_available()
         if not api_available:
             return error_msg
             
-        url = f"{self.base_url}/chat/completions"
         data = {
-            "model": self.model_name,
+            "model": self.model_for("generate_response"),
             "messages": [{"role": "user", "content": prompt}],
             "temperature": 0.7,
             "max_tokens": 1000
         }
         
         try:
-            response = requests.post(url, headers=self.headers, json=data)
-            if response.status_code == 200:
-                return response.json()["choices"][0]["message"]["content"]
-            else:
-                return f"Error: {response.status_code} - {response.text}"
+            return self._chat_completion(data, deadline, "generate_response")
+        except GroqAPIError as e:
+            return f"Error: {e}"
         except Exception as e:
             return f"Error connecting to Groq API: {str(e)}"
     
-    def parse_user_intent(self, user_input, session_context=None):
-        """Determine what the user wants to do (book, cancel, etc.)"""
-        api_available, error_msg = self._check_api_available()
-        if not api_available:
-            return {"intent": "unknown", "date": None, "time": None}
-        
-        url = f"{self.base_url}/chat/completions"
-        
-        # Include context from the session if available
-        context_str = ""
-        if session_context:
-            last_booking_date = session_context.get('last_booking_date')
-            last_booking_time = session_context.get('last_booking_time')
-            if last_booking_date and last_booking_time:
-                context_str = f"The user's most recent booking was on {last_booking_date} at {last_booking_time}."
-        
-        system_message = f"""
-        You are a reservation assistant for Paradise Grill restaurant.
-        
-        {context_str}
-        
-        Analyze the user request and classify their intent.
-        
-        If the user wants to cancel a booking, respond with: {{"intent": "cancellation"}}
-        If the user wants to make a new booking, respond with: {{"intent": "booking"}}
-        If the user wants to check available slots, respond with: {{"intent": "availability"}}
-        If you cannot determine the intent, respond with: {{"intent": "unknown"}}
-
-        Examples of booking requests:
-        - "Book a table for June 15th at 7 PM" → {{"intent": "booking"}}
-        - "Reserve for tomorrow at 9" → {{"intent": "booking"}}
-        - "Book a table at 9PM on Christmas Eve" → {{"intent": "booking"}}
-        - "I'd like to dine next Friday evening at 6" → {{"intent": "booking"}}
-        - "Cancel my reservation" → {{"intent": "cancellation"}}
-        - "What slots do you have available next Tuesday?" → {{"intent": "availability"}}
-        
-        ONLY return the JSON object with the intent. No other explanatory text.
-        """
+    def _intent_request(self, user_input, session_context=None):
+        """Build the completion payload for intent classification"""
+        # Static instructions plus the session context, compacted
+        system_message = prompts.intent_prompt(session_context)
         
         messages = [
             {"role": "system", "content": system_message},
             {"role": "user", "content": user_input}
         ]
         
-        data = {
-            "model": self.model_name,
+        return {
+            "model": self.model_for("classify_intent"),
             "messages": messages,
             "temperature": 0.3,
             "max_tokens": 100
         }
+    
+    def classify_intent(self, user_input, session_context=None, deadline=None):
+        """Classify the intent of a request with the LLM and return the intent name.
         
+        Errors from the call are raised so callers can choose their own fallback.
+        """
+        data = self._intent_request(user_input, session_context)
+        content = self._chat_completion(data, deadline, "classify_intent")
         try:
-            response = requests.post(url, headers=self.headers, json=data)
-            if response.status_code == 200:
-                content = response.json()["choices"][0]["message"]["content"]
-                try:
-                    parsed_intent = json.loads(content)
-                    intent = parsed_intent.get("intent", "unknown")
-                    # Now extract the details based on intent
-                    if intent == "cancellation":
-                        return self._extract_cancellation_details(user_input, session_context)
-                    elif intent == "booking":
-                        return self._extract_booking_details(user_input, session_context)
-                    elif intent == "availability":
-                        return {"intent": intent, "date": None, "time": None}
-                    else:
-                        return {"intent": intent, "date": None, "time": None}
-                except json.JSONDecodeError:
-                    return {"intent": "unknown", "date": None, "time": None}
+            return json.loads(content).get("intent", "unknown")
+        except json.JSONDecodeError:
+            return "unknown"
+    
+    def _predict_extraction(self, user_input, session_context=None):
+        """Cheap guess at the extraction a request will need, from keywords or the session"""
+        hint = local_parser.classify_intent(user_input)
+        if hint == "unknown" and session_context:
+            hint = session_context.get("intent") or "unknown"
+        return INTENT_EXTRACTIONS.get(hint)
+    
+    def _start_speculative_extraction(self, user_input, session_context=None, deadline=None):
+        """Fire the predicted extraction call in the background, or return None.
+        
+        Skipped when the pipeline runs inline, when the breaker isn't closed and
+        when the rate limiter is low, since a wrong guess costs a full call.
+        """
+        if not (self.speculative_extraction and task_runner.enabled):
+            return None
+        if self.circuit_breaker.state != CircuitBreaker.CLOSED:
+            return None
+        if self.rate_limiter.headroom() <= self.rate_limiter.low_priority_reserve:
+            return None
+        
+        kind = self._predict_extraction(user_input, session_context)
+        if kind == "booking":
+            data = self._booking_extraction_request(user_input, session_context)
+        elif kind == "cancellation":
+            data = self._cancellation_extraction_request(user_input, session_context)
+        else:
+            return None
+        method = f"extract_{kind}_details"
+        return SpeculativeExtraction(kind, task_runner.submit(self._chat_completion, data, deadline, method))
+    
+    def parse_user_intent(self, user_input, session_context=None, deadline=None):
+        """Determine what the user wants to do (book, cancel, etc.)
+        
+        The extraction the intent needs runs right after classification, or at the
+        same time when it was started speculatively. Results that include the
+        extracted details are tagged with "extraction" ("booking" or "cancellation")
+        so callers can reuse them instead of extracting again.
+        """
+        api_available, error_msg = self._check_api_available()
+        if not api_available:
+            return {"intent": "unknown", "date": None, "time": None}
+        
+        speculation = self._start_speculative_extraction(user_input, session_context, deadline)
+        try:
+            intent = self.classify_intent(user_input, session_context, deadline)
+            kind = INTENT_EXTRACTIONS.get(intent)
+            pending = speculation.claim(kind) if speculation else None
+            if speculation:
+                self.metrics.record_speculation(f"extract_{speculation.kind}_details", pending is not None)
+            
+            # Now extract the details based on intent
+            if intent == "cancellation":
+                details = self._extract_cancellation_details(user_input, session_context, deadline, pending)
+            elif intent == "booking":
+                details = self._extract_booking_details(user_input, session_context, deadline, pending)
+            elif intent == "availability" and pending is not None:
+                details = dict(self._extract_booking_details(user_input, session_context, deadline, pending), intent=intent)
             else:
-                return {"intent": "unknown", "date": None, "time": None}
+                return {"intent": intent, "date": None, "time": None}
+            details["extraction"] = kind
+            return details
+        except GroqAPIError:
+            return {"intent": "unknown", "date": None, "time": None}
+        except (LLMUnavailableError, requests.exceptions.RequestException) as e:
+            logger.warning(f"Groq unavailable ({e}), falling back to local intent parsing")
+            return local_parser.parse_intent(user_input, session_context)
         except Exception as e:
             print(f"Error in parse_user_intent: {str(e)}")
             return {"intent": "unknown", "date": None, "time": None}
+        finally:
+            if speculation and speculation.drop():
+                logger.info(f"Dropped speculative {speculation.kind} extraction")
     
-    def parse_booking_request(self, user_input, session_context=None):
+    def parse_booking_request(self, user_input, session_context=None, deadline=None):
         """Parse a natural language booking request using the LLM"""
-        return self._extract_booking_details(user_input, session_context)
+        return self._extract_booking_details(user_input, session_context, deadline)
     
-    def _extract_booking_details(self, user_input, session_context=None):
-        """Extract date, time, and festival name from a booking request, then resolve festival date."""
-        api_available, error_msg = self._check_api_available()
-        if not api_available:
-            return {"intent": "booking", "date": None, "time": None, "festival_referenced": None}
-        
-        url = f"{self.base_url}/chat/completions"
-        
-        today_date = datetime.now().strftime("%Y-%m-%d")
-        current_year = datetime.now().year
-        
-        reference_context = ""
-        if session_context:
-            last_booking_date = session_context.get('last_booking_date')
-            last_booking_time = session_context.get('last_booking_time')
-            if last_booking_date and last_booking_time:
-                reference_context = f"The user's most recent booking was on {last_booking_date} at {last_booking_time}."
-        
-        system_message = f"""
-        You are an assistant for Paradise Grill restaurant helping to understand booking requests.
-        Today's date is {today_date}. The current year is {current_year}.
-        {reference_context}
-        
-        Your task:
-        1. Extract the date if explicitly mentioned (e.g., "June 15th", "tomorrow", "next Friday").
-        2. Extract the time mentioned.
-        3. Extract the name of any festival or holiday mentioned (e.g., "Diwali", "Christmas Eve").
-        4. Convert extracted date references (like "tomorrow", "next Friday") to YYYY-MM-DD format.
-        5. Convert extracted time references to 24-hour HH:MM format.
-        
-        Return ONLY a JSON object with this format:
-        {{
-            "date": "YYYY-MM-DD or null if only festival mentioned", 
-            "time": "HH:MM or null",
-            "festival_referenced": "Name of festival/holiday or null"
-        }}
-        
-        Examples:
-        - "Book a table for June 15th at 7 PM" -> {{"date": "{current_year}-06-15", "time": "19:00", "festival_referenced": null}}
-        - "Reserve for tomorrow at 9" -> {{"date": "{(datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')}", "time": "09:00", "festival_referenced": null}}
-        - "Book a table at 9PM on Diwali" -> {{"date": null, "time": "21:00", "festival_referenced": "Diwali"}}
-        - "I'd like to dine next Friday evening at 6" -> {{"date": "YYYY-MM-DD", "time": "18:00", "festival_referenced": null}}
-        - "Reserve for Christmas Eve 8pm" -> {{"date": null, "time": "20:00", "festival_referenced": "Christmas Eve"}}
-        
-        If a festival/holiday is mentioned, return its name in 'festival_referenced' and set 'date' to null unless a specific date was ALSO mentioned.
-        Do NOT try to calculate the date for the festival yourself. Just extract the name.
-        """
+    def _booking_extraction_request(self, user_input, session_context=None):
+        """Build the completion payload for booking detail extraction"""
+        system_message = prompts.booking_extraction_prompt(session_day(session_context), session_context)
         
         messages = [
             {"role": "system", "content": system_message},
             {"role": "user", "content": user_input}
         ]
         
-        data = {
-            "model": self.model_name,
+        return {
+            "model": self.model_for("extract_booking_details"),
             "messages": messages,
             "temperature": 0.1,
             "max_tokens": 150
         }
+    
+    def _extract_booking_details(self, user_input, session_context=None, deadline=None, pending=None):
+        """Extract date, time, and festival name from a booking request, then resolve festival date.
+        
+        pending is a Future for an extraction call that is already running.
+        """
+        api_available, error_msg = self._check_api_available()
+        if not api_available:
+            return {"intent": "booking", "date": None, "time": None, "festival_referenced": None}
+        
+        current_year = session_day(session_context).year
+        data = self._booking_extraction_request(user_input, session_context)
         
         try:
-            response = requests.post(url, headers=self.headers, json=data)
-            if response.status_code == 200:
-                content = response.json()["choices"][0]["message"]["content"]
-                try:
-                    parsed = json.loads(content)
-                    extracted_date = parsed.get("date")
-                    extracted_time = parsed.get("time")
-                    festival_referenced = parsed.get("festival_referenced")
-                    
-                    logger.info(f"LLM extracted: Date={extracted_date}, Time={extracted_time}, Festival={festival_referenced}")
+            if pending is not None:
+                content = pending.result()
+            else:
+                content = self._chat_completion(data, deadline, "extract_booking_details")
+            try:
+                parsed = json.loads(content)
+                extracted_date = parsed.get("date")
+                extracted_time = parsed.get("time")
+                festival_referenced = parsed.get("festival_referenced")
+                
+                logger.info(f"LLM extracted: Date={extracted_date}, Time={extracted_time}, Festival={festival_referenced}")
 
-                    # Resolve date based on festival reference
-                    final_date = extracted_date
-                    weekday = None
+                # Resolve date based on festival reference
+                final_date = extracted_date
+                weekday = None
+                
+                # PRIORITY CHANGED: First try holiday_resolver for festival dates, then fall back to LLM
+                if festival_referenced:
+                    festival_name = festival_referenced.lower()
                     
-                    # PRIORITY CHANGED: First try holiday_resolver for festival dates, then fall back to LLM
-                    if festival_referenced:
-                        festival_name = festival_referenced.lower()
-                        
-                        # First priority: Use holiday_resolver with Calendarific data
-                        resolved_date = holiday_resolver.get_festival_date(festival_name)
-                        if resolved_date:
-                            final_date = resolved_date
-                            logger.info(f"Resolved festival '{festival_name}' to date: {final_date} using holiday_resolver (Calendarific)")
+                    # First priority: Use holiday_resolver with Calendarific data
+                    resolved_date = holiday_resolver.get_festival_date(festival_name)
+                    if resolved_date:
+                        final_date = resolved_date
+                        logger.info(f"Resolved festival '{festival_name}' to date: {final_date} using holiday_resolver (Calendarific)")
+                    else:
+                        # Second priority: Fall back to LLM for any holidays not in Calendarific
+                        llm_date = self._get_holiday_date_from_llm(festival_name, current_year, deadline)
+                        if llm_date:
+                            final_date = llm_date
+                            logger.info(f"Resolved festival '{festival_name}' to date: {final_date} using LLM fallback")
                         else:
-                            # Second priority: Fall back to LLM for any holidays not in Calendarific
-                            llm_date = self._get_holiday_date_from_llm(festival_name, current_year)
-                            if llm_date:
-                                final_date = llm_date
-                                logger.info(f"Resolved festival '{festival_name}' to date: {final_date} using LLM fallback")
-                            else:
-                                logger.warning(f"Could not resolve date for festival: {festival_name}")
-                    
-                    # Get weekday for the final date
-                    if final_date:
-                        try:
-                            date_obj = datetime.strptime(final_date, "%Y-%m-%d")
-                            weekday = date_obj.strftime("%A")  # Full weekday name
-                            logger.info(f"Resolved date {final_date} is on a {weekday}")
-                        except Exception as e:
-                            logger.error(f"Error calculating weekday for {final_date}: {e}")
+                            logger.warning(f"Could not resolve date for festival: {festival_name}")
+                
+                # Get weekday for the final date
+                if final_date:
+                    try:
+                        weekday = date_to_weekday(final_date)
+                        logger.info(f"Resolved date {final_date} is on a {weekday}")
+                    except Exception as e:
+                        logger.error(f"Error calculating weekday for {final_date}: {e}")
 
-                    return {
-                        "intent": "booking",
-                        "date": final_date,
-                        "time": extracted_time,
-                        "festival_referenced": festival_referenced,
-                        "weekday": weekday
-                    }
-                except json.JSONDecodeError:
-                    logger.error(f"Failed to parse LLM response: {content}")
-                    return {"intent": "booking", "date": None, "time": None, "festival_referenced": None, "weekday": None}
-            else:
-                logger.error(f"Groq API error: {response.status_code} - {response.text}")
+                return {
+                    "intent": "booking",
+                    "date": final_date,
+                    "time": extracted_time,
+                    "festival_referenced": festival_referenced,
+                    "weekday": weekday
+                }
+            except json.JSONDecodeError:
+                logger.error(f"Failed to parse LLM response: {content}")
                 return {"intent": "booking", "date": None, "time": None, "festival_referenced": None, "weekday": None}
+        except GroqAPIError as e:
+            logger.error(f"Groq API error: {e}")
+            return {"intent": "booking", "date": None, "time": None, "festival_referenced": None, "weekday": None}
+        except (LLMUnavailableError, requests.exceptions.RequestException) as e:
+            logger.warning(f"Groq unavailable ({e}), falling back to local booking parsing")
+            return local_parser.extract_details(user_input, "booking", session_context)
         except Exception as e:
             logger.error(f"Error in _extract_booking_details: {str(e)}")
             return {"intent": "booking", "date": None, "time": None, "festival_referenced": None, "weekday": None}
     
-    def _extract_cancellation_details(self, user_input, session_context=None):
-        """Extract date, time, and festival information for a cancellation request."""
-        api_available, error_msg = self._check_api_available()
-        if not api_available:
-            return {"intent": "cancellation", "date": None, "time": None, "festival_referenced": None}
-        
-        url = f"{self.base_url}/chat/completions"
-        
-        today_date = datetime.now().strftime("%Y-%m-%d")
-        current_year = datetime.now().year
-        
-        reference_context = ""
-        if session_context:
-            last_booking_date = session_context.get('last_booking_date')
-            last_booking_time = session_context.get('last_booking_time')
-            if last_booking_date and last_booking_time:
-                reference_context = f"The user's most recent booking was on {last_booking_date} at {last_booking_time}."
-        
-        system_message = f"""
-        You are an assistant for Paradise Grill restaurant helping to understand cancellation requests.
-        Today's date is {today_date}. The current year is {current_year}.
-        {reference_context}
-        
-        Your task:
-        1. Extract the date if explicitly mentioned (e.g., "Cancel my booking for June 15th").
-        2. Extract the time if mentioned (e.g., "Cancel my 7PM reservation").
-        3. Extract the name of any festival or holiday mentioned (e.g., "Cancel my Diwali booking").
-        4. Detect if the user is referring to their most recent booking (e.g., "Cancel my reservation").
-        5. Convert extracted date references to YYYY-MM-DD format.
-        6. Convert extracted time references to 24-hour HH:MM format.
-        
-        Return ONLY a JSON object with this format:
-        {{
-            "date": "YYYY-MM-DD or null if not specified", 
-            "time": "HH:MM or null if not specified",
-            "festival_referenced": "Name of festival/holiday or null",
-            "is_recent_reference": true/false (true if user seems to be referring to their most recent booking)
-        }}
-        
-        Examples:
-        - "Cancel my reservation for June 15th at 7 PM" -> {{"date": "{current_year}-06-15", "time": "19:00", "festival_referenced": null, "is_recent_reference": false}}
-        - "Cancel my booking" -> {{"date": null, "time": null, "festival_referenced": null, "is_recent_reference": true}}
-        - "Cancel my Diwali reservation" -> {{"date": null, "time": null, "festival_referenced": "Diwali", "is_recent_reference": false}}
-        """
+    def _cancellation_extraction_request(self, user_input, session_context=None):
+        """Build the completion payload for cancellation detail extraction"""
+        system_message = prompts.cancellation_extraction_prompt(session_day(session_context), session_context)
         
         messages = [
             {"role": "system", "content": system_message},
             {"role": "user", "content": user_input}
         ]
         
-        data = {
-            "model": self.model_name,
+        return {
+            "model": self.model_for("extract_cancellation_details"),
             "messages": messages,
             "temperature": 0.1,
             "max_tokens": 150
         }
+    
+    def _extract_cancellation_details(self, user_input, session_context=None, deadline=None, pending=None):
+        """Extract date, time, and festival information for a cancellation request.
+        
+        pending is a Future for an extraction call that is already running.
+        """
+        api_available, error_msg = self._check_api_available()
+        if not api_available:
+            return {"intent": "cancellation", "date": None, "time": None, "festival_referenced": None}
+        
+        current_year = session_day(session_context).year
+        data = self._cancellation_extraction_request(user_input, session_context)
         
         try:
-            response = requests.post(url, headers=self.headers, json=data)
-            if response.status_code == 200:
-                content = response.json()["choices"][0]["message"]["content"]
-                try:
-                    parsed = json.loads(content)
-                    extracted_date = parsed.get("date")
-                    extracted_time = parsed.get("time")
-                    festival_referenced = parsed.get("festival_referenced")
-                    is_recent_reference = parsed.get("is_recent_reference", False)
-                    
-                    logger.info(f"LLM extracted (cancellation): Date={extracted_date}, Time={extracted_time}, Festival={festival_referenced}, Recent={is_recent_reference}")
+            if pending is not None:
+                content = pending.result()
+            else:
+                content = self._chat_completion(data, deadline, "extract_cancellation_details")
+            try:
+                parsed = json.loads(content)
+                extracted_date = parsed.get("date")
+                extracted_time = parsed.get("time")
+                festival_referenced = parsed.get("festival_referenced")
+                is_recent_reference = parsed.get("is_recent_reference", False)
+                
+                logger.info(f"LLM extracted (cancellation): Date={extracted_date}, Time={extracted_time}, Festival={festival_referenced}, Recent={is_recent_reference}")
 
-                    # Resolve festival date if mentioned
-                    final_date = extracted_date
-                    weekday = None
+                # Resolve festival date if mentioned
+                final_date = extracted_date
+                weekday = None
+                
+                if festival_referenced:
+                    festival_name = festival_referenced.lower()
                     
-                    if festival_referenced:
-                        festival_name = festival_referenced.lower()
-                        
-                        # First priority: Use holiday_resolver
-                        resolved_date = holiday_resolver.get_festival_date(festival_name)
-                        if resolved_date:
-                            final_date = resolved_date
-                            logger.info(f"Resolved festival '{festival_name}' to date: {final_date} using holiday_resolver")
+                    # First priority: Use holiday_resolver
+                    resolved_date = holiday_resolver.get_festival_date(festival_name)
+                    if resolved_date:
+                        final_date = resolved_date
+                        logger.info(f"Resolved festival '{festival_name}' to date: {final_date} using holiday_resolver")
+                    else:
+                        # Second priority: Fall back to LLM for any holidays not in Calendarific
+                        llm_date = self._get_holiday_date_from_llm(festival_name, current_year, deadline)
+                        if llm_date:
+                            final_date = llm_date
+                            logger.info(f"Resolved festival '{festival_name}' to date: {final_date} using LLM fallback")
                         else:
-                            # Second priority: Fall back to LLM for any holidays not in Calendarific
-                            llm_date = self._get_holiday_date_from_llm(festival_name, current_year)
-                            if llm_date:
-                                final_date = llm_date
-                                logger.info(f"Resolved festival '{festival_name}' to date: {final_date} using LLM fallback")
-                            else:
-                                logger.warning(f"Could not resolve date for festival: {festival_name}")
-                    
-                    # Get weekday for the final date
-                    if final_date:
-                        try:
-                            date_obj = datetime.strptime(final_date, "%Y-%m-%d")
-                            weekday = date_obj.strftime("%A")  # Full weekday name
-                            logger.info(f"Resolved date {final_date} is on a {weekday}")
-                        except Exception as e:
-                            logger.error(f"Error calculating weekday for {final_date}: {e}")
+                            logger.warning(f"Could not resolve date for festival: {festival_name}")
+                
+                # Get weekday for the final date
+                if final_date:
+                    try:
+                        weekday = date_to_weekday(final_date)
+                        logger.info(f"Resolved date {final_date} is on a {weekday}")
+                    except Exception as e:
+                        logger.error(f"Error calculating weekday for {final_date}: {e}")
 
-                    return {
-                        "intent": "cancellation",
-                        "date": final_date,
-                        "time": extracted_time,
-                        "festival_referenced": festival_referenced,
-                        "is_recent_reference": is_recent_reference,
-                        "weekday": weekday
-                    }
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse LLM response: {content} - Error: {e}")
-                    return {"intent": "cancellation", "date": None, "time": None, "festival_referenced": None}
-            else:
-                logger.error(f"Groq API error: {response.status_code} - {response.text}")
+                return {
+                    "intent": "cancellation",
+                    "date": final_date,
+                    "time": extracted_time,
+                    "festival_referenced": festival_referenced,
+                    "is_recent_reference": is_recent_reference,
+                    "weekday": weekday
+                }
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to parse LLM response: {content} - Error: {e}")
                 return {"intent": "cancellation", "date": None, "time": None, "festival_referenced": None}
+        except GroqAPIError as e:
+            logger.error(f"Groq API error: {e}")
+            return {"intent": "cancellation", "date": None, "time": None, "festival_referenced": None}
+        except (LLMUnavailableError, requests.exceptions.RequestException) as e:
+            logger.warning(f"Groq unavailable ({e}), falling back to local cancellation parsing")
+            return local_parser.extract_details(user_input, "cancellation", session_context)
         except Exception as e:
             logger.error(f"Error in _extract_cancellation_details: {str(e)}")
             return {"intent": "cancellation", "date": None, "time": None, "festival_referenced": None}
     
-    def _get_holiday_date_from_llm(self, holiday_name, year):
+    def _get_holiday_date_from_llm(self, holiday_name, year, deadline=None):
         """Ask the LLM for the date of a specific holiday"""
         api_available, error_msg = self._check_api_available()
         if not api_available:
             return None
+        if holiday_resolver.recent_miss(holiday_name, year):
+            logger.info(f"Not asking the LLM for '{holiday_name}' in {year} again; it couldn't date it recently")
+            return None
         
-        url = f"{self.base_url}/chat/completions"
-        
-        system_message = f"""
+        system_message = prompts.compact(f"""
         You are an AI assistant that knows the dates of holidays and festivals around the world.
         For the given holiday/festival name, return ONLY the date in YYYY-MM-DD format for the year {year}.
         Only respond with the date in YYYY-MM-DD format. No other text.
-        """
+        """)
         
         messages = [
             {"role": "system", "content": system_message},
@@ -402,41 +588,47 @@ class GroqHandler:
         ]
         
         data = {
-            "model": self.model_name,
+            "model": self.model_for("holiday_date"),
             "messages": messages,
             "temperature": 0.1,
             "max_tokens": 20
         }
         
         try:
-            response = requests.post(url, headers=self.headers, json=data)
-            if response.status_code == 200:
-                content = response.json()["choices"][0]["message"]["content"].strip()
-                # Basic validation of date format
-                if len(content) == 10 and content[4] == '-' and content[7] == '-':
-                    return content
+            content = self._chat_completion(data, deadline, "holiday_date").strip()
+            # Basic validation of date format
+            if len(content) == 10 and content[4] == '-' and content[7] == '-':
+                holiday_resolver.remember_festival_date(holiday_name, content, year)
+                return content
+            holiday_resolver.remember_festival_date(holiday_name, None, year)
             return None
         except Exception as e:
             logger.error(f"Error getting holiday date from LLM: {str(e)}")
             return None
     
-    def parse_clarification_response(self, user_response, ambiguity_info):
+    def parse_clarification_response(self, user_response, ambiguity_info, deadline=None):
         """Parse the user's response to a clarification question"""
+        possibilities = ambiguity_info.get("possibilities", [])
+        
+        # Most answers ("7 PM", "the first one", "evening") pick an option without the LLM
+        local_time = match_clarification(user_response, possibilities)
+        if local_time:
+            logger.info(f"Matched clarification '{user_response}' to {local_time} locally")
+            return local_time
+        
         api_available, error_msg = self._check_api_available()
         if not api_available:
             return "unknown"
         
-        url = f"{self.base_url}/chat/completions"
-        possibilities = ambiguity_info.get("possibilities", [])
         possibilities_str = ", ".join(possibilities)
         
-        system_message = f"""
+        system_message = prompts.compact(f"""
         The user was asked to clarify which time they meant for their Paradise Grill reservation.
         The possible options were: {possibilities_str}
         Based on the user's response, identify which time they've chosen.
         Return ONLY the time in HH:MM format with no other text.
         If you can't determine the time, respond with "unknown".
-        """
+        """)
         
         messages = [
             {"role": "system", "content": system_message},
@@ -444,34 +636,35 @@ class GroqHandler:
         ]
         
         data = {
-            "model": self.model_name,
+            "model": self.model_for("parse_clarification_response"),
             "messages": messages,
             "temperature": 0.1,
             "max_tokens": 100
         }
         
         try:
-            response = requests.post(url, headers=self.headers, json=data)
-            if response.status_code == 200:
-                content = response.json()["choices"][0]["message"]["content"].strip()
-                if ":" in content and len(content) == 5:
-                    return content
-                return "unknown"
-            else:
-                return "unknown"
+            content = self._chat_completion(data, deadline, "parse_clarification_response").strip()
+            if ":" in content and len(content) == 5:
+                return content
+            return "unknown"
+        except GroqAPIError:
+            return "unknown"
         except Exception as e:
             print(f"Error in parse_clarification_response: {str(e)}")
             return "unknown"
     
-    def extract_raw_time_expression(self, user_input):
+    def extract_raw_time_expression(self, user_input, deadline=None):
         """Extract the raw time expression from user input"""
+        # Clock and spoken times ("7 PM", "half past 9", "quarter to 6") are found locally
+        found = find_time_expression(user_input)
+        if found:
+            return found["expression"]
+        
         api_available, error_msg = self._check_api_available()
         if not api_available:
             return None
         
-        url = f"{self.base_url}/chat/completions"
-        
-        system_message = """
+        system_message = prompts.compact("""
         Extract ONLY the raw time expression from this Paradise Grill reservation request.
         Return just the expression itself with no other text or formatting.
         Examples:
@@ -479,7 +672,7 @@ class GroqHandler:
         - "Reserve for Tuesday at half past 9" → "half past 9"
         - "Cancel my booking for Friday at quarter to 6" → "quarter to 6"
         If you can't find a time expression, return "unknown".
-        """
+        """)
         
         messages = [
             {"role": "system", "content": system_message},
@@ -487,33 +680,25 @@ class GroqHandler:
         ]
         
         data = {
-            "model": self.model_name,
+            "model": self.model_for("extract_raw_time_expression"),
             "messages": messages,
             "temperature": 0.3,
             "max_tokens": 100
         }
         
         try:
-            response = requests.post(url, headers=self.headers, json=data)
-            if response.status_code == 200:
-                content = response.json()["choices"][0]["message"]["content"].strip()
-                if content.lower() == "unknown":
-                    return None
-                return content
-            else:
+            content = self._chat_completion(data, deadline, "extract_raw_time_expression").strip()
+            if content.lower() == "unknown":
                 return None
+            return content
+        except GroqAPIError:
+            return None
         except Exception as e:
             print(f"Error in extract_raw_time_expression: {str(e)}")
             return None
     
-    def generate_booking_response(self, result, festival_referenced=None):
-        """Generate a response for a booking action"""
-        api_available, error_msg = self._check_api_available()
-        if not api_available:
-            return f"Booking status: {result.get('status', 'unknown')}. {result.get('message', '')}"
-        
-        url = f"{self.base_url}/chat/completions"
-        
+    def _booking_response_request(self, result, festival_referenced=None):
+        """Build the completion payload for a booking reply"""
         status = result.get('status', 'unknown')
         date = result.get('date', '')
         time = result.get('time', '')
@@ -529,7 +714,7 @@ class GroqHandler:
         if festival_referenced:
             festival_context = f" for {festival_referenced}"
         
-        system_message = f"""
+        system_message = prompts.compact(f"""
         Generate a friendly response for a Paradise Grill booking result:
         
         Result: {json.dumps(result)}
@@ -542,39 +727,53 @@ class GroqHandler:
         If the booking was successful, sound excited and welcoming.
         If it failed, offer apologies and suggest alternatives.
         Keep your response concise (2-3 sentences).
-        """
+        """)
         
         messages = [
             {"role": "system", "content": system_message}
         ]
         
-        data = {
-            "model": self.model_name,
+        return {
+            "model": self.model_for("booking_response"),
             "messages": messages,
             "temperature": 0.7,
             "max_tokens": 150
         }
+    
+    def generate_booking_response(self, result, festival_referenced=None, deadline=None):
+        """Generate a response for a booking action"""
+        api_available, error_msg = self._check_api_available()
+        if not api_available:
+            return f"Booking status: {result.get('status', 'unknown')}. {result.get('message', '')}"
+        
+        status = result.get('status', 'unknown')
+        data = self._booking_response_request(result, festival_referenced)
         
         try:
-            response = requests.post(url, headers=self.headers, json=data)
-            if response.status_code == 200:
-                content = response.json()["choices"][0]["message"]["content"]
-                content = content.strip('"')
-                return content
-            else:
-                return f"Booking {status}. {result.get('message', '')}"
+            content = self._chat_completion(data, deadline, "booking_response")
+            content = content.strip('"')
+            return content
+        except GroqAPIError:
+            return f"Booking {status}. {result.get('message', '')}"
+        except LLMUnavailableError as e:
+            logger.info(f"Answering booking from template ({e})")
+            return f"Booking {status}. {result.get('message', '')}"
         except Exception as e:
             logger.error(f"Error generating booking response: {str(e)}")
             return f"Booking {status}. {result.get('message', '')}"
     
-    def generate_cancellation_response(self, result):
-        """Generate a response for a cancellation action"""
+    def stream_booking_response(self, result, festival_referenced=None, deadline=None):
+        """Stream the response for a booking action token by token"""
         api_available, error_msg = self._check_api_available()
         if not api_available:
-            return f"Cancellation status: {result.get('status', 'unknown')}. {result.get('message', '')}"
-        
-        url = f"{self.base_url}/chat/completions"
+            yield f"Booking status: {result.get('status', 'unknown')}. {result.get('message', '')}"
+            return
         
+        fallback = f"Booking {result.get('status', 'unknown')}. {result.get('message', '')}"
+        yield from self._stream_completion(self._booking_response_request(result, festival_referenced), fallback, deadline, "booking_response")
+    
+    def _cancellation_response_request(self, result):
+        """Build the completion payload for a cancellation reply"""
         status = result.get('status', 'unknown')
         date = result.get('cancelled_date', result.get('date', ''))
         time = result.get('cancelled_time', result.get('time', ''))
@@ -590,7 +789,7 @@ class GroqHandler:
         if result.get('festival_referenced'):
             festival_context = f" for {result.get('festival_referenced')}"
         
-        system_message = f"""
+        system_message = prompts.compact(f"""
         Generate a friendly response for a Paradise Grill reservation cancellation:
         
         Result: {json.dumps(result)}
@@ -603,39 +802,56 @@ class GroqHandler:
         If the cancellation was successful, confirm it politely.
         If it failed, explain why and offer assistance.
         Keep your response concise (2-3 sentences).
-        """
+        """)
         
         messages = [
             {"role": "system", "content": system_message}
         ]
         
-        data = {
-            "model": self.model_name,
+        return {
+            "model": self.model_for("cancellation_response"),
             "messages": messages,
             "temperature": 0.7,
             "max_tokens": 150
         }
+    
+    def generate_cancellation_response(self, result, deadline=None):
+        """Generate a response for a cancellation action"""
+        api_available, error_msg = self._check_api_available()
+        if not api_available:
+            return f"Cancellation status: {result.get('status', 'unknown')}. {result.get('message', '')}"
+        
+        status = result.get('status', 'unknown')
+        data = self._cancellation_response_request(result)
         
         try:
-            response = requests.post(url, headers=self.headers, json=data)
-            if response.status_code == 200:
-                content = response.json()["choices"][0]["message"]["content"]
-                content = content.strip('"')
-                return content
-            else:
-                return f"Cancellation {status}. {result.get('message', '')}"
+            content = self._chat_completion(data, deadline, "cancellation_response")
+            content = content.strip('"')
+            return content
+        except GroqAPIError:
+            return f"Cancellation {status}. {result.get('message', '')}"
+        except LLMUnavailableError as e:
+            logger.info(f"Answering cancellation from template ({e})")
+            return f"Cancellation {status}. {result.get('message', '')}"
         except Exception as e:
             logger.error(f"Error generating cancellation response: {str(e)}")
             return f"Cancellation {status}. {result.get('message', '')}"
-
-    def generate_available_slots_response(self, available_slots, date):
-        """Generate a response showing available slots for a specific date"""
+    
+    def stream_cancellation_response(self, result, deadline=None):
+        """Stream the response for a cancellation action token by token"""
         api_available, error_msg = self._check_api_available()
         if not api_available:
-            return f"Available slots for {date}: {len(available_slots)} slots found."
+            yield f"Cancellation status: {result.get('status', 'unknown')}. {result.get('message', '')}"
+            return
         
-        url = f"{self.base_url}/chat/completions"
+        fallback = f"Cancellation {result.get('status', 'unknown')}. {result.get('message', '')}"
+        yield from self._stream_completion(self._cancellation_response_request(result), fallback, deadline, "cancellation_response")
+
+    def _available_slots_request(self, available_slots, date):
+        """Build the completion payload for an available slots reply.
         
+        Returns the payload and the plain-text listing used as a fallback.
+        """
         # Format the date for display
         date_str = date
         try:
@@ -653,7 +869,7 @@ class GroqHandler:
         time_slots.sort()  # Sort chronologically
         slots_str = ", ".join(time_slots)
         
-        system_message = f"""
+        system_message = prompts.compact(f"""
         Generate a friendly response showing available reservation slots at Paradise Grill:
         
         Information:
@@ -664,27 +880,126 @@ class GroqHandler:
         If there are available slots, list them in a friendly way.
         If there are no available slots, apologize and suggest checking another date.
         Keep your response concise (2-3 sentences).
-        """
+        """)
         
         messages = [
             {"role": "system", "content": system_message}
         ]
         
         data = {
-            "model": self.model_name,
+            "model": self.model_for("available_slots_response"),
             "messages": messages,
             "temperature": 0.7,
             "max_tokens": 200
         }
+        return data, f"Available slots for {date_str}: {slots_str}"
+
+    def generate_available_slots_response(self, available_slots, date, deadline=None):
+        """Generate a response showing available slots for a specific date"""
+        api_available, error_msg = self._check_api_available()
+        if not api_available:
+            return f"Available slots for {date}: {len(available_slots)} slots found."
+        
+        data, fallback = self._available_slots_request(available_slots, date)
         
         try:
-            response = requests.post(url, headers=self.headers, json=data)
-            if response.status_code == 200:
-                content = response.json()["choices"][0]["message"]["content"]
-                content = content.strip('"')
-                return content
-            else:
-                return f"Available slots for {date_str}: {slots_str}"
+            content = self._chat_completion(data, deadline, "available_slots_response")
+            content = content.strip('"')
+            return content
+        except GroqAPIError:
+            return fallback
+        except LLMUnavailableError as e:
+            logger.info(f"Answering available slots from template ({e})")
+            return fallback
         except Exception as e:
             logger.error(f"Error generating available slots response: {str(e)}")
-            return f"Available slots for {date_str}: {slots_str}"
+            return fallback
+
+    def stream_available_slots_response(self, available_slots, date, deadline=None):
+        """Stream the available slots response token by token"""
+        api_available, error_msg = self._check_api_available()
+        if not api_available:
+            yield f"Available slots for {date}: {len(available_slots)} slots found."
+            return
+        
+        data, fallback = self._available_slots_request(available_slots, date)
+        yield from self._stream_completion(data, fallback, deadline, "available_slots_response")
+
+    def _stream_completion(self, data, fallback, deadline=None, method="generate_response"):
+        """Yield content deltas from a streamed chat completion.
+        
+        Surrounding quotes are dropped like in the non-streaming responses. If the
+        request fails before any text arrived, the fallback text is yielded instead.
+        Token usage is taken from the final chunk (`usage`, or `x_groq.usage` on Groq).
+        """
+        url = f"{self.base_url}/chat/completions"
+        data = dict(data, stream=True)
+        
+        started = False
+        held_quote = ""
+        try:
+            estimated_tokens, timeout = self._admit(data, method, self._call_timeout(deadline))
+            
+            start = time.monotonic()
+            try:
+                response = requests.post(url, headers=self.headers, json=data, stream=True, timeout=timeout)
+            except requests.exceptions.RequestException as e:
+                self.circuit_breaker.record_failure(str(e))
+                self.metrics.record_error(method)
+                raise
+            
+            with response:
+                # Time to the response headers is what the breaker judges as slow
+                if response.status_code == 429 or response.status_code >= 500:
+                    self.circuit_breaker.record_failure(f"HTTP {response.status_code}")
+                else:
+                    self.circuit_breaker.record_success(time.monotonic() - start)
+                if response.status_code == 429:
+                    self._handle_rate_limit_response(response)
+                
+                if response.status_code != 200:
+                    logger.error(f"Groq API error while streaming: {response.status_code} - {response.text}")
+                    self.metrics.record_error(method)
+                    yield fallback
+                    return
+                
+                usage = None
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if payload == "[DONE]":
+                        break
+                    
+                    chunk = json.loads(payload)
+                    usage = chunk.get("usage") or chunk.get("x_groq", {}).get("usage") or usage
+                    if not chunk.get("choices"):
+                        continue
+                    delta = chunk["choices"][0].get("delta", {}).get("content")
+                    if not delta:
+                        continue
+                    if not started:
+                        delta = delta.lstrip('"')
+                        if not delta:
+                            continue
+                    
+                    # Hold back a trailing quote until we know it isn't the closing one
+                    text = held_quote + delta
+                    held_quote = ""
+                    if text.endswith('"'):
+                        text, held_quote = text[:-1], '"'
+                    if text:
+                        started = True
+                        yield text
+                
+                self.rate_limiter.reconcile(estimated_tokens, self._usage_tokens(usage))
+                self.metrics.record(method, (time.monotonic() - start) * 1000, usage,
+                                    prompts.prompt_chars(data["messages"]), data.get("model"))
+        except LLMUnavailableError as e:
+            logger.info(f"Streaming reply from template ({e})")
+            if not started:
+                yield fallback
+        except Exception as e:
+            logger.error(f"Error streaming response from Groq API: {str(e)}")
+            if not started:
+                yield fallback
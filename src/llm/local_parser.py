@@ -0,0 +1,59 @@
+import re
+import logging
+
+from utils.date_parser import date_parser, date_resolver
+from utils.date_utils import date_to_weekday
+from utils.holiday_resolver import holiday_resolver
+
+logger = logging.getLogger(__name__)
+
+# Keyword rules used when the LLM can't be reached, checked in this order
+INTENT_PATTERNS = [
+    ("cancellation", re.compile(r"\b(cancel\w*|call off|drop my)\b", re.IGNORECASE)),
+    ("availability", re.compile(r"\b(available|availability|free|open slots?|what (?:times|slots))\b", re.IGNORECASE)),
+    ("booking", re.compile(r"\b(book\w*|reserv\w*|table|dine|dinner|lunch)\b", re.IGNORECASE)),
+]
+
+def classify_intent(user_input):
+    """Classify the intent of a request using keyword rules"""
+    for intent, pattern in INTENT_PATTERNS:
+        if pattern.search(user_input or ""):
+            return intent
+    return "unknown"
+
+def find_festival(user_input):
+    """Return the name of a known holiday mentioned in the text, if any"""
+    # Holidays from the cache first, then the parser's built-in names
+    return holiday_resolver.find_festival(user_input) or date_parser.holiday_matcher.find(user_input)
+
+def extract_details(user_input, intent, session_context=None):
+    """Extract date, time and festival locally, in the same shape as the LLM extraction"""
+    # Relative dates count from the day the conversation started, not the day this message arrived
+    date = date_resolver.resolve(user_input, (session_context or {}).get('reference_date'))
+    time = date_parser.extract_time(user_input)
+    festival_referenced = find_festival(user_input)
+
+    weekday = None
+    if date:
+        weekday = date_to_weekday(date)
+
+    details = {
+        "intent": intent,
+        "date": date,
+        "time": time,
+        "festival_referenced": festival_referenced,
+        "weekday": weekday
+    }
+    if intent == "cancellation":
+        # Without a date or time the user most likely means their latest booking
+        details["is_recent_reference"] = not date and not time
+
+    logger.info(f"Local parser extracted: {details}")
+    return details
+
+def parse_intent(user_input, session_context=None):
+    """Local replacement for GroqHandler.parse_user_intent"""
+    intent = classify_intent(user_input)
+    if intent in ("booking", "cancellation"):
+        return extract_details(user_input, intent, session_context)
+    return {"intent": intent, "date": None, "time": None}
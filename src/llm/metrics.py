@@ -0,0 +1,66 @@
+import threading
+
+class LLMMetrics:
+    """Thread-safe per-method counters for LLM calls.
+
+    Token counts come from the API's `usage` field, latency is measured around the
+    upstream HTTP call, and prompt_chars is the size of the messages we sent. Each
+    method also reports the model its last call was routed to.
+    """
+
+    FIELDS = ("calls", "errors", "rate_limited", "speculative_hits", "speculative_wasted",
+              "prompt_tokens", "completion_tokens", "prompt_chars", "latency_ms")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._methods = {}
+
+    def _entry(self, method):
+        if method not in self._methods:
+            self._methods[method] = dict.fromkeys(self.FIELDS, 0)
+        return self._methods[method]
+
+    def record(self, method, latency_ms, usage=None, prompt_chars=0, model=None):
+        """Record a completed call"""
+        usage = usage or {}
+        with self._lock:
+            entry = self._entry(method)
+            if model:
+                entry["model"] = model
+            entry["calls"] += 1
+            entry["latency_ms"] += latency_ms
+            entry["prompt_tokens"] += usage.get("prompt_tokens", 0) or 0
+            entry["completion_tokens"] += usage.get("completion_tokens", 0) or 0
+            entry["prompt_chars"] += prompt_chars
+
+    def record_error(self, method):
+        """Record a call that failed before returning usage"""
+        with self._lock:
+            self._entry(method)["errors"] += 1
+
+    def record_rate_limited(self, method):
+        """Record a call the client-side rate limiter shed"""
+        with self._lock:
+            self._entry(method)["rate_limited"] += 1
+
+    def record_speculation(self, method, hit):
+        """Record whether a call started speculatively turned out to be needed"""
+        with self._lock:
+            self._entry(method)["speculative_hits" if hit else "speculative_wasted"] += 1
+
+    def snapshot(self):
+        """Totals and per-call averages for every method"""
+        with self._lock:
+            methods = {method: dict(entry) for method, entry in self._methods.items()}
+
+        for entry in methods.values():
+            calls = entry["calls"] or 1
+            entry["avg_latency_ms"] = round(entry["latency_ms"] / calls, 1)
+            entry["avg_prompt_tokens"] = round(entry["prompt_tokens"] / calls, 1)
+            entry["avg_completion_tokens"] = round(entry["completion_tokens"] / calls, 1)
+            entry["latency_ms"] = round(entry["latency_ms"], 1)
+        return methods
+
+    def reset(self):
+        with self._lock:
+            self._methods = {}
@@ -0,0 +1,103 @@
+"""
+Prompt building for GroqHandler.
+
+Each system prompt is split into a static prefix, built and compacted once at
+import time, and a short dynamic tail (today's date, session context) appended
+after it. Keeping the prefix byte-identical between calls lets the provider
+reuse it, and compaction drops the indentation and blank lines the prompts used
+to carry when they were written inline as indented f-strings.
+"""
+
+from datetime import timedelta
+
+def compact(text):
+    """Strip indentation, trailing spaces and blank lines from a prompt"""
+    lines = (line.strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+def with_tail(prefix, *parts):
+    """Append the non-empty dynamic parts to a static prefix"""
+    tail = [part.strip() for part in parts if part and part.strip()]
+    return "\n".join([prefix] + tail)
+
+RESTAURANT_PREFIX = "You are an assistant for Paradise Grill restaurant."
+
+INTENT_PREFIX = compact(f"""
+    {RESTAURANT_PREFIX}
+    Classify the intent of the user's request.
+    Cancel a booking: {{"intent": "cancellation"}}
+    Make a new booking: {{"intent": "booking"}}
+    Check available slots: {{"intent": "availability"}}
+    Cannot tell: {{"intent": "unknown"}}
+    Examples:
+    - "Book a table for June 15th at 7 PM" → {{"intent": "booking"}}
+    - "Reserve for tomorrow at 9" → {{"intent": "booking"}}
+    - "Book a table at 9PM on Christmas Eve" → {{"intent": "booking"}}
+    - "I'd like to dine next Friday evening at 6" → {{"intent": "booking"}}
+    - "Cancel my reservation" → {{"intent": "cancellation"}}
+    - "What slots do you have available next Tuesday?" → {{"intent": "availability"}}
+    ONLY return the JSON object with the intent. No other text.
+""")
+
+BOOKING_EXTRACTION_PREFIX = compact(f"""
+    {RESTAURANT_PREFIX}
+    Extract the details of a booking request:
+    1. The date if explicitly mentioned (e.g., "June 15th", "tomorrow", "next Friday"), as YYYY-MM-DD.
+    2. The time mentioned, as 24-hour HH:MM.
+    3. The name of any festival or holiday mentioned (e.g., "Diwali", "Christmas Eve").
+    Return ONLY a JSON object: {{"date": "YYYY-MM-DD or null", "time": "HH:MM or null", "festival_referenced": "name or null"}}
+    Examples (CURRENT_YEAR and TOMORROW are given below):
+    - "Book a table for June 15th at 7 PM" -> {{"date": "CURRENT_YEAR-06-15", "time": "19:00", "festival_referenced": null}}
+    - "Reserve for tomorrow at 9" -> {{"date": "TOMORROW", "time": "09:00", "festival_referenced": null}}
+    - "Book a table at 9PM on Diwali" -> {{"date": null, "time": "21:00", "festival_referenced": "Diwali"}}
+    - "Reserve for Christmas Eve 8pm" -> {{"date": null, "time": "20:00", "festival_referenced": "Christmas Eve"}}
+    If a festival/holiday is mentioned, set "date" to null unless a specific date was ALSO mentioned.
+    Do NOT calculate the festival date yourself. Just extract the name.
+""")
+
+CANCELLATION_EXTRACTION_PREFIX = compact(f"""
+    {RESTAURANT_PREFIX}
+    Extract the details of a cancellation request:
+    1. The date if explicitly mentioned (e.g., "Cancel my booking for June 15th"), as YYYY-MM-DD.
+    2. The time if mentioned (e.g., "Cancel my 7PM reservation"), as 24-hour HH:MM.
+    3. The name of any festival or holiday mentioned (e.g., "Cancel my Diwali booking").
+    4. Whether the user refers to their most recent booking (e.g., "Cancel my reservation").
+    Return ONLY a JSON object: {{"date": "YYYY-MM-DD or null", "time": "HH:MM or null", "festival_referenced": "name or null", "is_recent_reference": true/false}}
+    Examples (CURRENT_YEAR is given below):
+    - "Cancel my reservation for June 15th at 7 PM" -> {{"date": "CURRENT_YEAR-06-15", "time": "19:00", "festival_referenced": null, "is_recent_reference": false}}
+    - "Cancel my booking" -> {{"date": null, "time": null, "festival_referenced": null, "is_recent_reference": true}}
+    - "Cancel my Diwali reservation" -> {{"date": null, "time": null, "festival_referenced": "Diwali", "is_recent_reference": false}}
+""")
+
+def last_booking_context(session_context):
+    """Describe the user's most recent booking, if the session has one"""
+    if not session_context:
+        return ""
+    last_booking_date = session_context.get('last_booking_date')
+    last_booking_time = session_context.get('last_booking_time')
+    if last_booking_date and last_booking_time:
+        return f"The user's most recent booking was on {last_booking_date} at {last_booking_time}."
+    return ""
+
+def intent_prompt(session_context=None):
+    """System prompt for intent classification"""
+    return with_tail(INTENT_PREFIX, last_booking_context(session_context))
+
+def booking_extraction_prompt(today, session_context=None):
+    """System prompt for booking detail extraction; today is a datetime"""
+    tomorrow = (today + timedelta(days=1)).strftime("%Y-%m-%d")
+    dates = f"Today is {today.strftime('%Y-%m-%d')}. CURRENT_YEAR is {today.year}. TOMORROW is {tomorrow}."
+    return with_tail(BOOKING_EXTRACTION_PREFIX, dates, last_booking_context(session_context))
+
+def cancellation_extraction_prompt(today, session_context=None):
+    """System prompt for cancellation detail extraction; today is a datetime"""
+    dates = f"Today is {today.strftime('%Y-%m-%d')}. CURRENT_YEAR is {today.year}."
+    return with_tail(CANCELLATION_EXTRACTION_PREFIX, dates, last_booking_context(session_context))
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) for offline comparisons"""
+    return max(1, len(text) // 4)
+
+def prompt_chars(messages):
+    """Total characters across a message list"""
+    return sum(len(message.get("content", "")) for message in messages)
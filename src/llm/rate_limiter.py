@@ -0,0 +1,168 @@
+import time
+import heapq
+import logging
+import itertools
+import threading
+
+from llm.resilience import LLMUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# Priority classes; lower values are served first
+HIGH = 0
+LOW = 1
+
+class RateLimitedError(LLMUnavailableError):
+    """Raised when the client-side rate limiter can't grant a call in time"""
+
+class TokenBucket:
+    """Token bucket refilled continuously up to its capacity; not thread-safe on its own"""
+
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.level = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def refill(self, now=None):
+        now = now or time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def wait_time(self, amount, reserve=0.0):
+        """Seconds until amount can be taken while leaving reserve in the bucket"""
+        self.refill()
+        needed = min(amount, self.capacity) + reserve - self.level
+        if needed <= 0:
+            return 0.0
+        return needed / self.refill_per_second
+
+    def take(self, amount):
+        self.refill()
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, delta):
+        """Give back (positive) or charge (negative) tokens; the level may go below zero"""
+        self.refill()
+        self.level = min(self.capacity, self.level + delta)
+
+    def drain(self, seconds):
+        """Empty the bucket so it only has tokens again after the given number of seconds"""
+        self.refill()
+        self.level = min(self.level, -seconds * self.refill_per_second)
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limiter with priority queueing.
+
+    Callers wait in a single queue ordered by priority, then arrival; only the
+    head of the queue may take from the buckets, so a burst of low-priority
+    calls can't starve intent and extraction calls. Low-priority calls must also
+    leave low_priority_reserve of each bucket untouched and give up after
+    low_priority_max_wait, so the caller can shed them or answer from a template.
+    A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute=30, tokens_per_minute=6000,
+                 low_priority_reserve=0.2, low_priority_max_wait=0.5):
+        self.buckets = {}
+        if requests_per_minute:
+            self.buckets["requests"] = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        if tokens_per_minute:
+            self.buckets["tokens"] = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.low_priority_reserve = low_priority_reserve
+        self.low_priority_max_wait = low_priority_max_wait
+
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self.rejected = {HIGH: 0, LOW: 0}
+
+    @property
+    def enabled(self):
+        return bool(self.buckets)
+
+    def _wait_time(self, tokens, priority):
+        amounts = {"requests": 1, "tokens": tokens}
+        wait = 0.0
+        for name, bucket in self.buckets.items():
+            reserve = bucket.capacity * self.low_priority_reserve if priority == LOW else 0.0
+            wait = max(wait, bucket.wait_time(amounts[name], reserve))
+        return wait
+
+    def acquire(self, tokens, priority=HIGH, timeout=None):
+        """Block until a call of about `tokens` tokens may be made.
+
+        Returns the seconds spent waiting. Raises RateLimitedError when the call
+        can't be granted within timeout (capped at low_priority_max_wait for LOW).
+        """
+        if not self.enabled:
+            return 0.0
+        if priority == LOW:
+            timeout = self.low_priority_max_wait if timeout is None else min(timeout, self.low_priority_max_wait)
+
+        start = time.monotonic()
+        ticket = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    # Only the head of the queue may take; everyone else waits their turn
+                    wait = self._wait_time(tokens, priority) if self._waiters[0] == ticket else None
+                    if wait == 0.0:
+                        amounts = {"requests": 1, "tokens": tokens}
+                        for name, bucket in self.buckets.items():
+                            bucket.take(amounts[name])
+                        return time.monotonic() - start
+
+                    waited = time.monotonic() - start
+                    if timeout is not None and (waited >= timeout or (wait is not None and waited + wait > timeout)):
+                        self.rejected[priority] += 1
+                        raise RateLimitedError(f"Rate limit budget exhausted (waited {waited:.2f}s)")
+
+                    # Wake up when our tokens should be there, when the queue moves, or at the timeout
+                    pause = wait if wait is not None else 0.05
+                    if timeout is not None:
+                        pause = min(pause, timeout - waited)
+                    self._cond.wait(max(pause, 0.001))
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def reconcile(self, estimated_tokens, actual_tokens):
+        """Correct the token bucket once the API has reported real usage"""
+        if "tokens" not in self.buckets or not actual_tokens:
+            return
+        with self._cond:
+            self.buckets["tokens"].adjust(estimated_tokens - actual_tokens)
+            self._cond.notify_all()
+
+    def backoff(self, seconds):
+        """Stop granting calls for a while, e.g. after a 429 with Retry-After"""
+        with self._cond:
+            for bucket in self.buckets.values():
+                bucket.drain(seconds)
+        logger.warning(f"Rate limited by the API, pausing calls for {seconds:.1f}s")
+
+    def headroom(self):
+        """Fraction of the emptiest bucket that is available right now (1.0 when disabled)"""
+        with self._cond:
+            fractions = []
+            for bucket in self.buckets.values():
+                bucket.refill()
+                fractions.append(bucket.level / bucket.capacity)
+            return min(fractions) if fractions else 1.0
+
+    def snapshot(self):
+        """Current bucket levels and rejection counts"""
+        with self._cond:
+            levels = {}
+            for name, bucket in self.buckets.items():
+                bucket.refill()
+                levels[name] = round(bucket.level, 1)
+            return {
+                "levels": levels,
+                "queued": len(self._waiters),
+                "rejected_high": self.rejected[HIGH],
+                "rejected_low": self.rejected[LOW]
+            }
@@ -0,0 +1,116 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class LLMUnavailableError(Exception):
+    """Raised when an LLM call is skipped because the dependency can't be used right now"""
+
+class DeadlineExceeded(LLMUnavailableError):
+    """Raised when the request's latency budget is spent"""
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised when the circuit breaker is rejecting calls"""
+
+class Deadline:
+    """Latency budget for one request, passed down to every call made on its behalf"""
+
+    def __init__(self, budget_seconds):
+        self.budget_seconds = budget_seconds
+        self.expires_at = time.monotonic() + budget_seconds
+
+    def remaining(self):
+        """Seconds left in the budget (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        """Whether the budget is spent"""
+        return self.remaining() <= 0
+
+    def timeout(self, cap=None):
+        """Time the next call may take: what's left of the budget, optionally capped.
+
+        Raises DeadlineExceeded when nothing is left, so callers never start work
+        they can't finish in time.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Request budget of {self.budget_seconds}s exhausted")
+        return min(remaining, cap) if cap else remaining
+
+class CircuitBreaker:
+    """Stops calling a dependency after repeated failures or slow responses.
+
+    closed: calls go through; consecutive failures (errors or calls slower than
+    slow_call_seconds) are counted.
+    open: calls are rejected until reset_timeout has passed.
+    half_open: a single trial call is let through; success closes the breaker,
+    failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, slow_call_seconds=8.0, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def allow_request(self):
+        """Whether a call may be made now"""
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+                logger.info(f"Circuit '{self.name}' half-open, letting a trial call through")
+
+            if self._state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def cancel(self):
+        """Give back a call allowed by allow_request that was never made"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self, duration):
+        """Record a completed call; calls slower than slow_call_seconds count as failures"""
+        if self.slow_call_seconds and duration > self.slow_call_seconds:
+            self.record_failure(f"slow call ({duration:.1f}s)")
+            return
+
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit '{self.name}' closed again")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self, reason=""):
+        """Record a failed call and open the breaker when the threshold is reached"""
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuit '{self.name}' opened after {self._failures} failures (last: {reason})")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
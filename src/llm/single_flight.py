@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers that arrive
+    while it is in flight wait for the same result or exception. Threads and asyncio
+    tasks share the same in-flight table, so a request served by a worker thread
+    and one awaited on an event loop are coalesced with each other.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.shared_calls = 0
+
+    def _join_or_lead(self, key):
+        """Return the in-flight future for key and whether the caller must run it"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared_calls += 1
+                return future, False
+            future = Future()
+            # Running futures can't be cancelled, so a follower giving up never breaks the leader
+            future.set_running_or_notify_cancel()
+            self._calls[key] = future
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        """Publish the leader's outcome; the key is released first so finished calls are never reused"""
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _run(self, key, future, fn, args, kwargs):
+        """Run fn as the leader and publish its outcome"""
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+        else:
+            self._finish(key, future, result=result)
+
+    def in_flight(self):
+        """Number of keys currently being executed"""
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key, fn, *args, timeout=None, **kwargs):
+        """Call fn(*args, **kwargs) unless an identical call is already in flight.
+
+        Followers wait at most timeout seconds for the leader's result.
+        """
+        future, leader = self._join_or_lead(key)
+        if leader:
+            self._run(key, future, fn, args, kwargs)
+        else:
+            logger.debug(f"Joining in-flight call for key {key[:64]}")
+        return future.result(timeout=timeout)
+
+    async def do_async(self, key, fn, *args, timeout=None, **kwargs):
+        """Async counterpart of do(); fn may be a coroutine function or a blocking callable.
+
+        Blocking callables run in the loop's default executor so the event loop is not
+        held up while the leader waits on the network.
+        """
+        future, leader = self._join_or_lead(key)
+        if leader:
+            if asyncio.iscoroutinefunction(fn):
+                try:
+                    result = await fn(*args, **kwargs)
+                except BaseException as e:
+                    # Includes cancellation of the leader, so followers never hang
+                    self._finish(key, future, error=e)
+                else:
+                    self._finish(key, future, result=result)
+            else:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, lambda: self._run(key, future, fn, args, kwargs))
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
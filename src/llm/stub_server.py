@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Groq chat completions API, for load and latency testing.
+
+Serves POST /openai/v1/chat/completions (streaming and non-streaming) with
+rule-based answers to the prompts GroqHandler sends, a configurable latency
+distribution and injected failures. Point GroqHandler at it with
+GROQ_BASE_URL=http://127.0.0.1:8090/openai/v1 (any GROQ_API_KEY will do).
+
+Run from src/: python -m llm.stub_server --latency lognormal --latency-ms 300 --error-rate 0.02
+"""
+
+import re
+import json
+import time
+import uuid
+import random
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm import local_parser
+from llm.prompts import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+TIME_EXPRESSION = re.compile(
+    r"\b(half past \d{1,2}|quarter (?:past|to) \d{1,2}|\d{1,2}(?::\d{2})?\s*(?:[ap]\.?m\.?)|noon|midnight)",
+    re.IGNORECASE
+)
+
+class StubConfig:
+    """Latency and failure settings for the stand-in server"""
+
+    def __init__(self, latency="fixed", latency_ms=0.0, jitter_ms=0.0, token_delay_ms=0.0,
+                 error_rate=0.0, rate_limit_rate=0.0, timeout_rate=0.0, timeout_seconds=30.0,
+                 malformed_rate=0.0, model_latency_ms=None, seed=None):
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency}")
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_delay_ms = token_delay_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.malformed_rate = malformed_rate
+        # Per-model mean latency overriding latency_ms, e.g. to make the small model faster
+        self.model_latency_ms = model_latency_ms or {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_latency(self, model=None):
+        """Seconds to wait before answering, drawn from the configured distribution"""
+        mean = self.model_latency_ms.get(model, self.latency_ms) / 1000.0
+        jitter = self.jitter_ms / 1000.0
+        with self._lock:
+            if self.latency == "uniform":
+                value = self._random.uniform(mean - jitter, mean + jitter)
+            elif self.latency == "normal":
+                value = self._random.gauss(mean, jitter)
+            elif self.latency == "lognormal":
+                # Parameterised by its median and a spread factor, which gives the long tail real APIs have
+                sigma = jitter / mean if mean and jitter else 0.5
+                value = self._random.lognormvariate(0, sigma) * mean
+            elif self.latency == "exponential":
+                value = self._random.expovariate(1.0 / mean) if mean else 0.0
+            else:
+                value = mean
+        return max(0.0, value)
+
+    def sample_fault(self):
+        """Pick an injected failure for the next request, or None"""
+        with self._lock:
+            roll = self._random.random()
+        for fault, rate in (("rate_limit", self.rate_limit_rate), ("error", self.error_rate),
+                            ("timeout", self.timeout_rate), ("malformed", self.malformed_rate)):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+def prompt_kind(system_message):
+    """Work out which GroqHandler prompt a system message belongs to"""
+    text = system_message.lower()
+    if "classify the intent" in text or "classify their intent" in text:
+        return "intent"
+    if "booking request" in text and "extract" in text:
+        return "booking_extraction"
+    if "cancellation request" in text and "extract" in text:
+        return "cancellation_extraction"
+    if "dates of holidays" in text:
+        return "holiday_date"
+    if "clarify which time" in text:
+        return "clarification"
+    if "raw time expression" in text:
+        return "raw_time"
+    if "available reservation slots" in text:
+        return "available_slots_response"
+    if "cancellation" in text and "friendly response" in text:
+        return "cancellation_response"
+    if "friendly response" in text:
+        return "booking_response"
+    return "generic"
+
+def prompt_field(system_message, label):
+    """Value of a "- Label: value" or "Label: value" line in a prompt"""
+    match = re.search(rf"{re.escape(label)}:\s*(.*)", system_message)
+    return match.group(1).strip() if match else ""
+
+def extraction_answer(user_input, intent):
+    """Extraction JSON shaped like the LLM's: festivals are named, not resolved"""
+    details = local_parser.extract_details(user_input, intent)
+    answer = {
+        "date": details["date"],
+        "time": details["time"],
+        "festival_referenced": details["festival_referenced"]
+    }
+    if answer["festival_referenced"]:
+        answer["date"] = None
+    if intent == "cancellation":
+        answer["is_recent_reference"] = details["is_recent_reference"]
+    return json.dumps(answer)
+
+def clarification_answer(system_message, user_input):
+    """Pick the option the user's reply mentions, defaulting to the first one"""
+    options = [option.strip() for option in prompt_field(system_message, "The possible options were").split(",") if option.strip()]
+    if not options:
+        return "unknown"
+    numbers = re.findall(r"\d{1,2}", user_input or "")
+    for option in options:
+        hour = option.split(":")[0]
+        if any(int(number) in (int(hour), int(hour) - 12) for number in numbers):
+            return option
+    if re.search(r"\b(second|later|evening|pm)\b", user_input or "", re.IGNORECASE) and len(options) > 1:
+        return options[1]
+    return options[0]
+
+def holiday_answer(user_input):
+    """Date of a well-known holiday for the year in the question"""
+    year_match = re.search(r"\b(\d{4})\b", user_input or "")
+    year = int(year_match.group(1)) if year_match else local_parser.date_parser.current_year
+    name = local_parser.find_festival(user_input)
+    if not name:
+        return "unknown"
+    festivals = local_parser.date_parser.indian_festivals.get(year, {})
+    if name in festivals:
+        return festivals[name]
+    fixed = local_parser.date_parser.fixed_holidays.get(name)
+    return f"{year}{fixed[4:]}" if fixed else "unknown"
+
+def rule_based_answer(messages):
+    """Answer a chat completion request the way the real model usually would"""
+    system_message = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user_input = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    kind = prompt_kind(system_message)
+
+    if kind == "intent":
+        return json.dumps({"intent": local_parser.classify_intent(user_input)})
+    if kind == "booking_extraction":
+        return extraction_answer(user_input, "booking")
+    if kind == "cancellation_extraction":
+        return extraction_answer(user_input, "cancellation")
+    if kind == "holiday_date":
+        return holiday_answer(user_input)
+    if kind == "clarification":
+        return clarification_answer(system_message, user_input)
+    if kind == "raw_time":
+        match = TIME_EXPRESSION.search(user_input or "")
+        return match.group(1) if match else "unknown"
+    if kind == "available_slots_response":
+        times = prompt_field(system_message, "Available times")
+        if not times:
+            return "Sorry, Paradise Grill is fully booked that day. Would you like to try another date?"
+        return f"Good news! We have tables at {times} on {prompt_field(system_message, 'Date')}. Which would you like?"
+    if kind in ("booking_response", "cancellation_response"):
+        status = prompt_field(system_message, "Status")
+        if kind == "booking_response":
+            if status == "success":
+                return "Wonderful! Your table at Paradise Grill is booked. We look forward to welcoming you."
+            return "We're sorry, we couldn't complete that booking. Would another time work for you?"
+        if status == "success":
+            return "Your Paradise Grill reservation has been cancelled. We hope to see you another time."
+        return "We couldn't cancel that reservation. Please check the date and time and try again."
+    return "This is a response from the local Groq stand-in."
+
+def usage_for(messages, content):
+    """Token usage in the shape the API reports it"""
+    prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in messages)
+    completion_tokens = estimate_tokens(content)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """Handles chat completion requests; the server carries the StubConfig"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_error(self, status, message, error_type, headers=None):
+        self._send_json(status, {"error": {"message": message, "type": error_type}}, headers)
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("/openai/v1/models", "/v1/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+        else:
+            self._send_error(404, f"Unknown path {self.path}", "not_found")
+
+    def do_POST(self):
+        if self.path.rstrip("/") not in ("/openai/v1/chat/completions", "/v1/chat/completions"):
+            self._send_error(404, f"Unknown path {self.path}", "not_found")
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request_data = json.loads(self.rfile.read(length) or b"{}")
+            messages = request_data["messages"]
+        except (ValueError, KeyError):
+            self._send_error(400, "Request body must be JSON with a messages list", "invalid_request_error")
+            return
+
+        config = self.server.config
+        model = request_data.get("model", "stub")
+        time.sleep(config.sample_latency(model))
+
+        fault = config.sample_fault()
+        if fault == "rate_limit":
+            self._send_error(429, "Rate limit reached (injected)", "rate_limit_exceeded", {"Retry-After": "1"})
+            return
+        if fault == "error":
+            self._send_error(503, "Service unavailable (injected)", "server_error")
+            return
+        if fault == "timeout":
+            # Hold the connection open past any sensible client timeout
+            time.sleep(config.timeout_seconds)
+            self._send_error(504, "Gateway timeout (injected)", "server_error")
+            return
+
+        content = rule_based_answer(messages)
+        if fault == "malformed":
+            content = content[: len(content) // 2] + " <<garbled>>"
+
+        if request_data.get("stream"):
+            self._stream(model, messages, content)
+            return
+
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage_for(messages, content)
+        })
+
+    def _stream(self, model, messages, content):
+        """Send the answer as server-sent events, one word per chunk"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        delay = self.server.config.token_delay_ms / 1000.0
+
+        def send(chunk):
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        words = re.findall(r"\S+\s*", content)
+        for i, word in enumerate(words):
+            send({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]
+            })
+            if delay and i < len(words) - 1:
+                time.sleep(delay)
+
+        send({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "x_groq": {"usage": usage_for(messages, content)}
+        })
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+def create_server(config=None, host="127.0.0.1", port=8090):
+    """Create the stand-in server; port 0 picks a free port"""
+    server = ThreadingHTTPServer((host, port), StubRequestHandler)
+    server.daemon_threads = True
+    server.config = config or StubConfig()
+    return server
+
+def start_in_thread(config=None, host="127.0.0.1", port=0):
+    """Start the stand-in server in a daemon thread and return (server, base_url)"""
+    server = create_server(config, host, port)
+    thread = threading.Thread(target=server.serve_forever, name="groq-stub", daemon=True)
+    thread.start()
+    base_url = f"http://{server.server_address[0]}:{server.server_address[1]}/openai/v1"
+    logger.info(f"Groq stand-in listening on {base_url}")
+    return server, base_url
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Groq-compatible server for offline load and latency testing")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8090, help="Port to listen on (default: 8090)")
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="fixed", help="Latency distribution (default: fixed)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean (median for lognormal) latency in ms")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Spread: half-width for uniform, stddev for normal/lognormal")
+    parser.add_argument("--token-delay-ms", type=float, default=0.0, help="Delay between streamed chunks in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of requests that hang before answering")
+    parser.add_argument("--timeout-seconds", type=float, default=30.0, help="How long hanging requests hang (default: 30)")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of answers that are garbled")
+    parser.add_argument("--model-latency", action="append", default=[], metavar="MODEL=MS",
+                        help="Mean latency for one model, overriding --latency-ms (repeatable)")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible runs")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    stub_config = StubConfig(
+        latency=args.latency, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        token_delay_ms=args.token_delay_ms, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds, malformed_rate=args.malformed_rate,
+        model_latency_ms={model: float(ms) for model, ms in (item.split("=", 1) for item in args.model_latency)},
+        seed=args.seed
+    )
+    stub_server = create_server(stub_config, args.host, args.port)
+    print(f"Groq stand-in listening on http://{args.host}:{args.port}/openai/v1 (Ctrl+C to stop)")
+    try:
+        stub_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub_server.server_close()
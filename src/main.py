@@ -1,5 +1,6 @@
 from flask import Flask
 from app.routes import register_routes  # Local import without src prefix
+from utils.holiday_resolver import start_background_prefetch
 import os
 
 # Create data directory if it doesn't exist
@@ -19,5 +20,9 @@ app = Flask(__name__,
 # Register all routes
 register_routes(app)
 
+# Warm the holiday cache for this year and next without delaying startup
+start_background_prefetch()
+
 if __name__ == '__main__':
+    # Development server with the reloader; serve.py runs the app in production
     app.run(debug=True, port=5000)
\ No newline at end of file
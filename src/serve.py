@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Production entry point: serves the app with gunicorn or waitress instead of the
+Flask development server
+
+Configured through the environment:
+  WEB_SERVER            gunicorn, waitress or auto (default: gunicorn where it is
+                        installed and the OS supports it, otherwise waitress)
+  HOST, PORT            address to listen on (default: 0.0.0.0:5000)
+  WEB_WORKERS           worker processes, gunicorn only (default: one per CPU)
+  WEB_THREADS           threads per worker (default: 8); 1 gives gunicorn's sync workers
+  WEB_PRELOAD           1 to import the app and build the shared indexes once, before
+                        workers are forked (default: 1)
+  WEB_TIMEOUT           seconds a request may run before its worker is restarted (default: 60)
+  WEB_GRACEFUL_TIMEOUT  seconds in-flight requests get to finish on SIGTERM (default: 30)
+  WEB_KEEPALIVE         seconds an idle keep-alive connection stays open (default: 5)
+  WEB_MAX_REQUESTS      restart a worker after this many requests, 0 for never (default: 0)
+  WEB_ACCESS_LOG        1 to log every request, gunicorn only (default: 0)
+
+Processes or threads: booking and session writes hold lock files next to
+the data (utils/file_lock.py), so any number of processes can share them.
+Each process does have its own Groq rate limiter, circuit breaker and
+single-flight table. Extra processes let the CPU-bound work (pandas,
+parsing) use more cores; threads serve requests waiting on the LLM.
+
+Run from src/: python serve.py
+"""
+
+import os
+import sys
+import signal
+import logging
+import multiprocessing
+
+# Finish pending bookings schema migrations before serving (and before forking), and
+# warm the holiday cache synchronously below rather than on a thread that forking would drop
+os.environ.setdefault('SCHEMA_MIGRATION', 'startup')
+os.environ.setdefault('HOLIDAY_PREFETCH', '0')
+
+logger = logging.getLogger(__name__)
+
+WEB_SERVER = os.environ.get('WEB_SERVER', 'auto')
+HOST = os.environ.get('HOST', '0.0.0.0')
+PORT = int(os.environ.get('PORT', '5000'))
+WEB_WORKERS = int(os.environ.get('WEB_WORKERS', str(multiprocessing.cpu_count())))
+WEB_THREADS = int(os.environ.get('WEB_THREADS', '8'))
+WEB_PRELOAD = os.environ.get('WEB_PRELOAD', '1') != '0'
+WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', '60'))
+WEB_GRACEFUL_TIMEOUT = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', '30'))
+WEB_KEEPALIVE = int(os.environ.get('WEB_KEEPALIVE', '5'))
+WEB_MAX_REQUESTS = int(os.environ.get('WEB_MAX_REQUESTS', '0'))
+WEB_ACCESS_LOG = os.environ.get('WEB_ACCESS_LOG', '0') != '0'
+
+def load_app():
+    """Import the app and build the indexes every request relies on"""
+    from main import app
+    from utils.holiday_resolver import holiday_resolver
+
+    # Forked workers share these pages copy-on-write instead of each building its own
+    holiday_resolver.prefetch(wait=True)
+    holiday_resolver.matcher
+    holiday_resolver.fuzzy_index
+    logger.info("Application loaded and indexes built")
+    return app
+
+def choose_server():
+    if WEB_SERVER != 'auto':
+        return WEB_SERVER
+    if os.name != 'nt':
+        try:
+            import gunicorn  # noqa: F401
+            return 'gunicorn'
+        except ImportError:
+            pass
+    return 'waitress'
+
+def serve_gunicorn():
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        sys.exit("gunicorn is not installed: pip install gunicorn")
+    from utils.concurrency import task_runner
+
+    def post_fork(server, worker):
+        # Threads don't survive fork; let the worker start its own pipeline pool
+        task_runner._executor = None
+
+    def worker_exit(server, worker):
+        task_runner.shutdown(wait=False)
+
+    class GunicornApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app()
+
+    options = {
+        'bind': f"{HOST}:{PORT}",
+        'workers': WEB_WORKERS,
+        'threads': WEB_THREADS,
+        'worker_class': 'gthread' if WEB_THREADS > 1 else 'sync',
+        'preload_app': WEB_PRELOAD,
+        'timeout': WEB_TIMEOUT,
+        'graceful_timeout': WEB_GRACEFUL_TIMEOUT,
+        'keepalive': WEB_KEEPALIVE,
+        'max_requests': WEB_MAX_REQUESTS,
+        'max_requests_jitter': WEB_MAX_REQUESTS // 10,
+        'accesslog': '-' if WEB_ACCESS_LOG else None,
+        'post_fork': post_fork,
+        'worker_exit': worker_exit
+    }
+    print(f"Serving with gunicorn on {HOST}:{PORT}: {WEB_WORKERS} workers x {WEB_THREADS} threads")
+    GunicornApplication(options).run()
+
+def serve_waitress():
+    try:
+        from waitress import create_server
+    except ImportError:
+        sys.exit("waitress is not installed: pip install waitress")
+    from utils.concurrency import task_runner
+
+    if WEB_WORKERS > 1:
+        logger.warning(f"waitress runs a single process; WEB_WORKERS={WEB_WORKERS} is ignored")
+    app = load_app()
+    server = create_server(app, host=HOST, port=PORT, threads=WEB_THREADS, channel_timeout=WEB_TIMEOUT)
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+    signal.signal(signal.SIGTERM, stop)
+    if hasattr(signal, 'SIGBREAK'):  # Ctrl+Break and service stop on Windows
+        signal.signal(signal.SIGBREAK, stop)
+
+    print(f"Serving with waitress on {HOST}:{PORT}: {WEB_THREADS} threads")
+    try:
+        server.run()
+    except (KeyboardInterrupt, SystemExit):
+        logger.info(f"Shutting down; waiting up to {WEB_GRACEFUL_TIMEOUT}s for requests in flight")
+    finally:
+        server.task_dispatcher.shutdown(cancel_pending=False, timeout=WEB_GRACEFUL_TIMEOUT)
+        server.close()
+        task_runner.shutdown(wait=False)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    server_name = choose_server()
+    if server_name == 'gunicorn':
+        serve_gunicorn()
+    elif server_name == 'waitress':
+        serve_waitress()
+    else:
+        sys.exit(f"Unknown WEB_SERVER {server_name!r}; use gunicorn, waitress or auto")
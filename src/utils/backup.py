@@ -0,0 +1,209 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+BACKUP_DIR = os.environ.get('BACKUP_DIR', os.path.join(DATA_DIR, 'backups'))
+# Snapshots kept after a backup; the newest is always kept
+BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', 10))
+# Snapshots older than this many days are removed too (0 keeps them regardless of age)
+BACKUP_MAX_AGE_DAYS = int(os.environ.get('BACKUP_MAX_AGE_DAYS', 0))
+
+# What a full backup covers, by name inside the snapshot
+DEFAULT_SOURCES = {
+    'bookings.csv': os.path.join(DATA_DIR, 'bookings.csv'),
+    'sessions': os.path.join(DATA_DIR, 'sessions'),
+    'cache': os.path.join(DATA_DIR, 'cache')
+}
+
+MANIFEST_FILE = 'manifest.json'
+# Snapshots are built under this suffix and renamed once complete
+PARTIAL_SUFFIX = '.partial'
+SNAPSHOT_FORMAT = '%Y%m%d_%H%M%S'
+# Linux ioctl that makes dest share src's blocks (btrfs, XFS, bcachefs, ...)
+FICLONE = 0x40049409
+CHUNK_SIZE = 1024 * 1024
+
+def file_sha256(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _reflink(src, dest):
+    """Copy-on-write clone of src; False where the filesystem or OS can't do it"""
+    if fcntl is None:
+        return False
+    try:
+        with open(src, 'rb') as src_file, open(dest, 'wb') as dest_file:
+            fcntl.ioctl(dest_file.fileno(), FICLONE, src_file.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dest):
+            os.remove(dest)
+        return False
+
+def _stream_copy(src, dest):
+    """Copy src in chunks, hashing on the way; returns the SHA-256"""
+    digest = hashlib.sha256()
+    with open(src, 'rb') as src_file, open(dest, 'wb') as dest_file:
+        for block in iter(lambda: src_file.read(CHUNK_SIZE), b''):
+            digest.update(block)
+            dest_file.write(block)
+    return digest.hexdigest()
+
+def _source_files(sources):
+    """(name inside the snapshot, source path) for every file under the sources"""
+    for name, path in sources.items():
+        if os.path.isfile(path):
+            yield name, path
+        elif os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for file_name in sorted(files):
+                    # Skip half-written temp files from atomic saves, and lock files
+                    if file_name.endswith(('.tmp', '.lock')):
+                        continue
+                    file_path = os.path.join(root, file_name)
+                    rel_path = os.path.relpath(file_path, path).replace(os.sep, '/')
+                    yield f"{name}/{rel_path}", file_path
+        else:
+            logger.warning(f"Backup source not found: {path}")
+
+def list_snapshots(backup_dir=BACKUP_DIR):
+    """Complete snapshot directories, oldest first"""
+    if not os.path.isdir(backup_dir):
+        return []
+    return sorted(
+        os.path.join(backup_dir, name) for name in os.listdir(backup_dir)
+        # A .partial directory is a backup that never finished, even with a manifest in it
+        if not name.endswith(PARTIAL_SUFFIX) and os.path.isfile(os.path.join(backup_dir, name, MANIFEST_FILE))
+    )
+
+def load_manifest(snapshot):
+    with open(os.path.join(snapshot, MANIFEST_FILE), 'r') as f:
+        return json.load(f)
+
+def remove_partial_snapshots(backup_dir=BACKUP_DIR):
+    """Remove what crashed backups left behind; returns the directories removed"""
+    removed = []
+    for name in os.listdir(backup_dir):
+        path = os.path.join(backup_dir, name)
+        if name.endswith(PARTIAL_SUFFIX) and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+            logger.warning(f"Removed unfinished backup {path}")
+            removed.append(path)
+    return removed
+
+def create_snapshot(sources=None, backup_dir=BACKUP_DIR, keep=BACKUP_KEEP, max_age_days=BACKUP_MAX_AGE_DAYS):
+    """Back up the sources into a new snapshot directory and rotate old ones.
+
+    A file whose size and modification time match the previous snapshot is
+    hard-linked to that copy, so an unchanged file costs no space. Changed
+    files are reflinked where the filesystem supports it and streamed
+    otherwise. The manifest records each file's SHA-256 and how it was
+    copied. The snapshot is built under a temporary name and only then
+    renamed, so a crashed backup is never mistaken for a complete one.
+    Returns the snapshot path.
+    """
+    sources = sources or DEFAULT_SOURCES
+    os.makedirs(backup_dir, exist_ok=True)
+    remove_partial_snapshots(backup_dir)
+
+    previous = list_snapshots(backup_dir)
+    previous_snapshot = previous[-1] if previous else None
+    previous_files = load_manifest(previous_snapshot)['files'] if previous_snapshot else {}
+
+    name = datetime.now().strftime(SNAPSHOT_FORMAT)
+    snapshot = os.path.join(backup_dir, name)
+    suffix = 1
+    while os.path.exists(snapshot):
+        snapshot = os.path.join(backup_dir, f"{name}_{suffix}")
+        suffix += 1
+    partial = f"{snapshot}{PARTIAL_SUFFIX}"
+    os.makedirs(partial)
+
+    files = {}
+    methods = {}
+    try:
+        for rel_path, src in _source_files(sources):
+            dest = os.path.join(partial, *rel_path.split('/'))
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            stat = os.stat(src)
+            entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+            method = None
+            old = previous_files.get(rel_path)
+            if old and old['size'] == entry['size'] and old['mtime_ns'] == entry['mtime_ns']:
+                try:
+                    os.link(os.path.join(previous_snapshot, *rel_path.split('/')), dest)
+                    entry['sha256'] = old['sha256']
+                    method = 'hardlink'
+                except OSError:
+                    pass
+            if method is None and _reflink(src, dest):
+                entry['sha256'] = file_sha256(dest)
+                method = 'reflink'
+            if method is None:
+                entry['sha256'] = _stream_copy(src, dest)
+                method = 'copy'
+
+            entry['method'] = method
+            files[rel_path] = entry
+            methods[method] = methods.get(method, 0) + 1
+
+        manifest = {
+            'created': datetime.now().isoformat(),
+            'sources': sources,
+            'files': files
+        }
+        with open(os.path.join(partial, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(partial, snapshot)
+    except Exception:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+
+    logger.info(f"Backed up {len(files)} files to {snapshot} ({methods})")
+    prune_snapshots(backup_dir, keep, max_age_days)
+    return snapshot
+
+def prune_snapshots(backup_dir=BACKUP_DIR, keep=BACKUP_KEEP, max_age_days=BACKUP_MAX_AGE_DAYS):
+    """Remove snapshots beyond the newest `keep` and any older than max_age_days; returns those removed"""
+    snapshots = list_snapshots(backup_dir)
+    keep = max(keep, 1)
+    expired = snapshots[:-keep]
+    if max_age_days:
+        cutoff = datetime.now() - timedelta(days=max_age_days)
+        for snapshot in snapshots[-keep:-1]:
+            if datetime.fromisoformat(load_manifest(snapshot)['created']) < cutoff:
+                expired.append(snapshot)
+
+    for snapshot in expired:
+        # Hard-linked files live on in newer snapshots; only this directory's links go
+        shutil.rmtree(snapshot, ignore_errors=True)
+        logger.info(f"Removed old backup {snapshot}")
+    return expired
+
+def verify_snapshot(snapshot):
+    """Files in a snapshot whose checksum no longer matches the manifest (empty if intact)"""
+    problems = []
+    for rel_path, entry in load_manifest(snapshot)['files'].items():
+        path = os.path.join(snapshot, *rel_path.split('/'))
+        if not os.path.isfile(path):
+            problems.append(f"{rel_path}: missing")
+        elif file_sha256(path) != entry['sha256']:
+            problems.append(f"{rel_path}: checksum mismatch")
+    return problems
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Calendarific holidays API, for testing the cache warmer offline.
+
+Serves GET /api/v2/holidays?api_key=...&country=IN&year=2026 in Calendarific's
+response format. Holidays come from the bundled dataset, moved to the requested
+year, with the same latency and failure injection as the Groq stand-in. Point
+the resolver at it with CALENDARIFIC_BASE_URL=http://127.0.0.1:8091/api/v2
+(any CALENDARIFIC_API_KEY will do).
+
+Run from src/: python -m utils.calendarific_stub --latency-ms 200 --error-rate 0.1
+"""
+
+import json
+import time
+import logging
+import argparse
+import threading
+from datetime import date
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm.stub_server import LATENCY_DISTRIBUTIONS, StubConfig
+from utils.holiday_dataset import DATASET_FILE, load_dataset
+
+logger = logging.getLogger(__name__)
+
+# Served for countries the bundled dataset has nothing for
+DEFAULT_HOLIDAYS = [
+    ("New Year's Day", 1, 1),
+    ("Valentine's Day", 2, 14),
+    ("Halloween", 10, 31),
+    ("Christmas Eve", 12, 24),
+    ("Christmas Day", 12, 25),
+    ("New Year's Eve", 12, 31)
+]
+
+def holidays_by_country(path=DATASET_FILE):
+    """(name, month, day) per country from the bundled dataset"""
+    dataset = load_dataset(path)
+    countries = {}
+    if dataset:
+        for country, name, iso_date in dataset.entries():
+            day = date.fromisoformat(iso_date)
+            countries.setdefault(country, {})[name] = (day.month, day.day)
+        dataset.close()
+    return {country: [(name.title(), month, day) for name, (month, day) in sorted(holidays.items())]
+            for country, holidays in countries.items()}
+
+def holidays_response(holidays, year):
+    """Calendarific's JSON body for a list of (name, month, day) in the given year"""
+    entries = []
+    for name, month, day in holidays:
+        # Feb 29 only exists in leap years
+        if month == 2 and day == 29 and not (year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)):
+            day = 28
+        entries.append({"name": name, "date": {"iso": date(year, month, day).isoformat()}})
+    return {"meta": {"code": 200}, "response": {"holidays": entries}}
+
+class CalendarificRequestHandler(BaseHTTPRequestHandler):
+    """Handles holiday requests; the server carries the StubConfig and holiday table"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_error(self, status, message, headers=None):
+        self._send_json(status, {"meta": {"code": status, "error_type": "stub", "error_detail": message}}, headers)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") not in ("/api/v2/holidays", "/v2/holidays"):
+            self._send_error(404, f"Unknown path {url.path}")
+            return
+
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        if not params.get("api_key"):
+            self._send_error(401, "Missing api_key")
+            return
+        try:
+            year = int(params["year"])
+            country = params["country"].upper()
+        except (KeyError, ValueError):
+            self._send_error(400, "country and year are required")
+            return
+
+        config = self.server.config
+        time.sleep(config.sample_latency())
+
+        fault = config.sample_fault()
+        if fault == "rate_limit":
+            self._send_error(429, "Too many requests (injected)", {"Retry-After": "1"})
+            return
+        if fault == "error":
+            self._send_error(503, "Service unavailable (injected)")
+            return
+        if fault == "timeout":
+            # Hold the connection open past any sensible client timeout
+            time.sleep(config.timeout_seconds)
+            self._send_error(504, "Gateway timeout (injected)")
+            return
+
+        holidays = self.server.holidays.get(country, DEFAULT_HOLIDAYS)
+        self._send_json(200, holidays_response(holidays, year))
+
+def create_server(config=None, host="127.0.0.1", port=8091, dataset_path=DATASET_FILE):
+    """Create the stand-in server; port 0 picks a free port"""
+    server = ThreadingHTTPServer((host, port), CalendarificRequestHandler)
+    server.daemon_threads = True
+    server.config = config or StubConfig()
+    server.holidays = holidays_by_country(dataset_path)
+    return server
+
+def start_in_thread(config=None, host="127.0.0.1", port=0, dataset_path=DATASET_FILE):
+    """Start the stand-in server in a daemon thread and return (server, base_url)"""
+    server = create_server(config, host, port, dataset_path)
+    thread = threading.Thread(target=server.serve_forever, name="calendarific-stub", daemon=True)
+    thread.start()
+    base_url = f"http://{server.server_address[0]}:{server.server_address[1]}/api/v2"
+    logger.info(f"Calendarific stand-in listening on {base_url}")
+    return server, base_url
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Calendarific-compatible server for offline testing")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8091, help="Port to listen on (default: 8091)")
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="fixed", help="Latency distribution (default: fixed)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean (median for lognormal) latency in ms")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Spread: half-width for uniform, stddev for normal/lognormal")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of requests that hang before answering")
+    parser.add_argument("--timeout-seconds", type=float, default=30.0, help="How long hanging requests hang (default: 30)")
+    parser.add_argument("--dataset", type=str, default=DATASET_FILE, help=f"Holiday dataset to serve (default: {DATASET_FILE})")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible runs")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    stub_config = StubConfig(
+        latency=args.latency, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds, seed=args.seed
+    )
+    stub_server = create_server(stub_config, args.host, args.port, args.dataset)
+    print(f"Calendarific stand-in listening on http://{args.host}:{args.port}/api/v2 (Ctrl+C to stop)")
+    try:
+        stub_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub_server.server_close()
@@ -0,0 +1,76 @@
+import os
+import time
+import logging
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on steps running at the same time across all requests
+PIPELINE_MAX_WORKERS = int(os.environ.get("PIPELINE_MAX_WORKERS", "8"))
+
+# Set PIPELINE_PARALLEL=0 to run every step inline (useful for latency comparisons)
+PIPELINE_PARALLEL = os.environ.get("PIPELINE_PARALLEL", "1") != "0"
+
+
+class TaskRunner:
+    """Bounded thread pool used to overlap independent steps of a request"""
+
+    def __init__(self, max_workers=PIPELINE_MAX_WORKERS, enabled=PIPELINE_PARALLEL):
+        self.max_workers = max_workers
+        self.enabled = enabled
+        self._executor = None
+
+    def _get_executor(self):
+        """Create the executor on first use so importing the module stays cheap"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="pipeline")
+        return self._executor
+
+    def submit(self, fn, *args, **kwargs):
+        """Run fn in the pool and return a Future (runs inline when parallelism is disabled)"""
+        if not self.enabled:
+            future = Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self._get_executor().submit(fn, *args, **kwargs)
+
+    def completed(self, value):
+        """Return a Future that already holds value"""
+        future = Future()
+        future.set_result(value)
+        return future
+
+    def run_all(self, *calls):
+        """Run (fn, *args) tuples concurrently and return their results in order"""
+        futures = [self.submit(call[0], *call[1:]) for call in calls]
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait=True):
+        """Stop the pool; a later submit() will create a fresh one"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+def timed(label):
+    """Decorator that logs how long the wrapped call took"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                logger.info(f"{label} took {elapsed_ms:.1f} ms")
+        return wrapper
+    return decorator
+
+
+# Shared runner for the request pipeline
+task_runner = TaskRunner()
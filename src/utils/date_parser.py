@@ -1,8 +1,293 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import re
 import logging
+import threading
+
+from utils.holiday_matcher import HolidayMatcher
 
 logger = logging.getLogger(__name__)
 
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12
+}
+MONTH_NAMES = r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sept?(?:ember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+
+# Every pattern is compiled once at import. A bare number is never a time,
+# so "table for 4" stays a party size; a time needs am/pm, a colon, or noon/midnight.
+TIME_PATTERN = re.compile(r"""
+    (?<![\d:.])(?P<hour>1[0-2]|0?[1-9])(?:[:.](?P<minute>[0-5]\d))?\s*(?P<meridiem>[ap])\.?\s?m\b\.?
+  | (?<![\d:.])(?P<hour24>[01]?\d|2[0-3]):(?P<minute24>[0-5]\d)(?![\d:])
+  | \b(?P<noon>noon|midday)\b
+  | \b(?P<midnight>midnight)\b
+""", re.IGNORECASE | re.VERBOSE)
+
+HOUR_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12
+}
+MINUTE_WORDS = {
+    "five": 5, "ten": 10, "fifteen": 15, "twenty": 20, "twenty five": 25, "twenty-five": 25,
+    "thirty": 30, "forty five": 45, "forty-five": 45
+}
+SPOKEN_HOUR = rf"(?:1[0-2]|0?[1-9]|{'|'.join(HOUR_WORDS)})"
+
+# Spoken times: "half past 9", "quarter to 6", "20 past 7", "half 9", "7 o'clock",
+# "at seven thirty". Without am/pm or a part of the day they stay ambiguous.
+# "at 12 noon" and "at 5 past 7" are left to the noon and past/to forms, and
+# "by 2 people" is a party size.
+SPOKEN_TIME_PATTERN = re.compile(rf"""
+    (?:
+        \b(?:(?P<fraction>half|quarter)|(?P<minutes>\d{{1,2}}|twenty[\s-]five|twenty|ten|five))(?:\s+minutes)?
+            \s+(?P<relation>past|after|to|till|before)\s+(?P<hour>{SPOKEN_HOUR})
+      | \bhalf\s+(?P<half_hour>{SPOKEN_HOUR})
+      | \b(?P<oclock_hour>{SPOKEN_HOUR})\s*o'?\s?clock
+      | \b(?:at|around|by)\s+(?P<at_hour>{SPOKEN_HOUR})(?:\s+(?P<at_minute>fifteen|thirty|forty[\s-]five))?
+            (?!\s*(?:noon|midday|midnight)\b|\s+(?:minutes\s+)?(?:past|after|to|till|before)\b
+               |\s+(?:people|persons?|guests?|pax|adults?|of\s+us)\b)
+    )
+    (?:\s*(?P<meridiem>[ap])\.?\s?m\b\.?|\s+(?:in\s+the\s+)?(?P<period>morning|afternoon|evening|night|tonight))?
+    (?![\w:]|\.\d)
+""", re.IGNORECASE | re.VERBOSE)
+
+def _spoken_number(value, words):
+    value = value.lower()
+    return int(value) if value.isdigit() else words[value]
+
+def find_time_expression(text):
+    """First time expression in the text, as a dict, or None.
+
+    An unambiguous time ("7pm", "noon") is preferred over an earlier
+    ambiguous one ("at 9"). The dict holds the matched "expression", "hour" (0-23, or 1-12 when the
+    text doesn't say morning or evening), "minute" and "ambiguous".
+    """
+    text = text or ""
+    clock = TIME_PATTERN.search(text)
+    spoken = SPOKEN_TIME_PATTERN.search(text)
+    found = _spoken_time(spoken) if spoken else None
+    if not clock:
+        return found
+    # A clock time is never ambiguous, so it beats an ambiguous spoken one wherever it is
+    if found and not found["ambiguous"] and spoken.start() <= clock.start():
+        return found
+    return _clock_time(clock)
+
+def _clock_time(clock):
+    if clock.group("noon"):
+        hour, minute = 12, 0
+    elif clock.group("midnight"):
+        hour, minute = 0, 0
+    elif clock.group("hour24"):
+        hour, minute = int(clock.group("hour24")), int(clock.group("minute24"))
+    else:
+        hour = int(clock.group("hour")) % 12 + (12 if clock.group("meridiem").lower() == "p" else 0)
+        minute = int(clock.group("minute") or 0)
+    return {"expression": clock.group(0).strip(), "hour": hour, "minute": minute, "ambiguous": False}
+
+def _spoken_time(match):
+    if match.group("relation"):
+        hour = _spoken_number(match.group("hour"), HOUR_WORDS)
+        if match.group("fraction"):
+            minute = 30 if match.group("fraction").lower() == "half" else 15
+        else:
+            minute = _spoken_number(match.group("minutes").replace("-", " "), MINUTE_WORDS)
+        if minute >= 60:
+            return None
+        if match.group("relation").lower() in ("to", "till", "before"):
+            # "quarter to 6" is 5:45, and "ten to 1" is 12:50
+            hour, minute = (hour - 2) % 12 + 1, (60 - minute) % 60
+    elif match.group("half_hour"):
+        hour, minute = _spoken_number(match.group("half_hour"), HOUR_WORDS), 30
+    elif match.group("oclock_hour"):
+        hour, minute = _spoken_number(match.group("oclock_hour"), HOUR_WORDS), 0
+    else:
+        hour = _spoken_number(match.group("at_hour"), HOUR_WORDS)
+        minute = _spoken_number(match.group("at_minute").replace("-", " "), MINUTE_WORDS) if match.group("at_minute") else 0
+
+    expression = match.group(0).strip()
+    for prefix in ("at ", "around ", "by "):
+        if expression.lower().startswith(prefix):
+            expression = expression[len(prefix):]
+            break
+
+    if match.group("meridiem"):
+        pm = match.group("meridiem").lower() == "p"
+    elif match.group("period"):
+        pm = match.group("period").lower() != "morning"
+    else:
+        return {"expression": expression, "hour": hour, "minute": minute, "ambiguous": True}
+    return {"expression": expression, "hour": hour % 12 + (12 if pm else 0), "minute": minute, "ambiguous": False}
+
+def match_time(text):
+    """First unambiguous time in the text as HH:MM (24-hour), or None"""
+    found = find_time_expression(text)
+    if not found or found["ambiguous"]:
+        return None
+    return f"{found['hour']:02d}:{found['minute']:02d}"
+
+def mentions_time(text):
+    """Whether the text mentions a time at all, even an ambiguous one"""
+    return find_time_expression(text) is not None
+
+# Ways of picking one of the offered times without saying it
+ORDINAL_PATTERN = re.compile(
+    r"\b(?:(?P<ordinal>first|1st|second|2nd|third|3rd|former|latter|last)|option\s+(?P<option>\d)|(?P<relative>earlier|later))\b",
+    re.IGNORECASE
+)
+ORDINALS = {"first": 0, "1st": 0, "former": 0, "second": 1, "2nd": 1, "third": 2, "3rd": 2, "latter": -1, "last": -1}
+# A clarification answer that is only an hour ("7", "seven")
+BARE_HOUR_PATTERN = re.compile(rf"\s*(?:at\s+)?(?P<hour>{SPOKEN_HOUR})\s*[.!]?\s*", re.IGNORECASE)
+PERIOD_PATTERN = re.compile(
+    r"\b(?:(?P<am>a\.?m\.?|morning)|(?P<pm>p\.?m\.?|afternoon|evening|night|tonight|dinner))(?!\w)",
+    re.IGNORECASE
+)
+
+def _clock(value):
+    """(hour, minute) of an offered time written as HH:MM or "7 PM", or None"""
+    match = re.fullmatch(r"\s*(\d{1,2}):(\d{2})\s*", value or "")
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    found = find_time_expression(value)
+    if found and not found["ambiguous"]:
+        return found["hour"], found["minute"]
+    return None
+
+def match_clarification(text, possibilities):
+    """Which of the offered times a clarification answer picks, as HH:MM, or None.
+
+    Understands a full time ("7 PM", "half past 7 in the evening"), an hour
+    that matches one option ("7", "half past seven"), an ordinal ("the first
+    one", "option 2", "the later one") and a part of the day ("evening").
+    """
+    options = [clock for clock in (_clock(value) for value in possibilities or []) if clock]
+    found = find_time_expression(text)
+    if found and not found["ambiguous"]:
+        return f"{found['hour']:02d}:{found['minute']:02d}"
+    if not options:
+        return None
+
+    bare_hour = BARE_HOUR_PATTERN.fullmatch(text or "")
+    if not found and bare_hour:
+        found = {"hour": _spoken_number(bare_hour.group("hour"), HOUR_WORDS), "minute": 0}
+    
+    chosen = None
+    if found:
+        matching = [option for option in options if option[0] % 12 == found["hour"] % 12 and option[1] == found["minute"]]
+        if len(matching) == 1:
+            chosen = matching[0]
+    if chosen is None:
+        ordinal = ORDINAL_PATTERN.search(text or "")
+        if ordinal and ordinal.group("ordinal"):
+            index = ORDINALS[ordinal.group("ordinal").lower()]
+            if index < len(options):
+                chosen = options[index]
+        elif ordinal and ordinal.group("option"):
+            index = int(ordinal.group("option")) - 1
+            if 0 <= index < len(options):
+                chosen = options[index]
+        elif ordinal:
+            chosen = min(options) if ordinal.group("relative").lower() == "earlier" else max(options)
+    if chosen is None:
+        period = PERIOD_PATTERN.search(text or "")
+        if period:
+            matching = [option for option in options if (option[0] >= 12) == bool(period.group("pm"))]
+            if len(matching) == 1:
+                chosen = matching[0]
+    if chosen is None:
+        return None
+    return f"{chosen[0]:02d}:{chosen[1]:02d}"
+
+DATE_PATTERN = re.compile(rf"""
+    \b(?P<iso_year>\d{{4}})-(?P<iso_month>\d{{1,2}})-(?P<iso_day>\d{{1,2}})\b
+  | \b(?P<day>\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<month>{MONTH_NAMES})\b(?:,?\s+(?P<year>\d{{4}}))?
+  | \b(?P<month_first>{MONTH_NAMES})\s+(?P<day_after_month>\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s+(?P<year_after>\d{{4}}))?
+  | (?<![\d/])(?P<numeric_day>\d{{1,2}})/(?P<numeric_month>\d{{1,2}})(?:/(?P<numeric_year>\d{{2}}|\d{{4}}))?(?![\d/])
+""", re.IGNORECASE | re.VERBOSE)
+
+RELATIVE_PATTERN = re.compile(rf"""
+    \b(?P<day_after>day\s+after\s+tomorrow)\b
+  | \b(?P<tomorrow>tomorrow|tmrw)\b
+  | \b(?P<today>today|tonight)\b
+  | \bin\s+(?P<count>\d{{1,3}}|an?|one|two|three)\s+(?P<unit>days?|weeks?)\b
+  | \b(?:(?P<modifier>next|this|coming)\s+)?(?P<weekday>{"|".join(WEEKDAYS)})\b
+""", re.IGNORECASE | re.VERBOSE)
+
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3}
+
+def reference_day(value=None):
+    """The day relative dates count from: a date, datetime or ISO string (a session's
+    reference_date), or today when it is missing or unreadable"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if value:
+        try:
+            return datetime.fromisoformat(str(value)).date()
+        except ValueError:
+            logger.warning(f"Ignoring unreadable reference date {value!r}")
+    return date.today()
+
+def session_day(session_context=None):
+    """Reference day of a conversation, from the reference_date stored when the session was created"""
+    return reference_day((session_context or {}).get('reference_date'))
+
+def _build_date(year, month, day, today):
+    """date for the parts, rolling a year-less date that already passed into next year"""
+    try:
+        if year is not None:
+            year = int(year)
+            return date(year + 2000 if year < 100 else year, int(month), int(day))
+        candidate = date(today.year, int(month), int(day))
+        return candidate if candidate >= today else date(today.year + 1, int(month), int(day))
+    except ValueError:
+        return None
+
+def match_date(text, today=None):
+    """First explicit or relative date in the text as YYYY-MM-DD, or None.
+
+    Holidays are not handled here; DateParser.parse_date_reference checks them first.
+    """
+    if not text:
+        return None
+    today = today or date.today()
+
+    match = DATE_PATTERN.search(text)
+    if match:
+        if match.group("iso_year"):
+            found = _build_date(match.group("iso_year"), match.group("iso_month"), match.group("iso_day"), today)
+        elif match.group("month"):
+            found = _build_date(match.group("year"), MONTHS[match.group("month")[:3].lower()], match.group("day"), today)
+        elif match.group("month_first"):
+            found = _build_date(match.group("year_after"), MONTHS[match.group("month_first")[:3].lower()],
+                                match.group("day_after_month"), today)
+        else:
+            # Day first, as written in India
+            found = _build_date(match.group("numeric_year"), match.group("numeric_month"), match.group("numeric_day"), today)
+        if found:
+            return found.isoformat()
+
+    match = RELATIVE_PATTERN.search(text)
+    if not match:
+        return None
+    if match.group("day_after"):
+        days_ahead = 2
+    elif match.group("tomorrow"):
+        days_ahead = 1
+    elif match.group("today"):
+        days_ahead = 0
+    elif match.group("count"):
+        count = match.group("count").lower()
+        days_ahead = int(count) if count.isdigit() else NUMBER_WORDS[count]
+        if match.group("unit").lower().startswith("week"):
+            days_ahead *= 7
+    else:
+        # Same rule as date_utils.weekday_to_date: today's weekday means next week
+        days_ahead = (WEEKDAYS.index(match.group("weekday").lower()) - today.weekday()) % 7 or 7
+    return (today + timedelta(days=days_ahead)).isoformat()
+
 class DateParser:
     """Utility class for parsing dates from natural language"""
     
@@ -43,80 +328,86 @@ class DateParser:
             },
             2026: {
                 "diwali": "2026-11-08",
-                "holi": "2026-03-03",
-                "navratri": "2026-10-12"
+                "holi": "2026-03-04",
+                "navratri": "2026-10-11"
+            },
+            2027: {
+                "diwali": "2027-10-29",
+                "holi": "2027-03-22",
+                "navratri": "2027-09-30"
             }
         }
         
-    def parse_date_reference(self, text):
-        """Parse date references from text"""
+        # One compiled matcher over every name above
+        self.holiday_matcher = HolidayMatcher(
+            list(self.fixed_holidays) + [name for festivals in self.indian_festivals.values() for name in festivals]
+        )
+        
+    def parse_date_reference(self, text, reference_date=None):
+        """Parse date references from text, counting relative dates from reference_date (default today)"""
         if not text:
             return None
             
         text = text.lower()
+        today = reference_day(reference_date)
         
-        # Check for Indian festivals first with exact dates
-        for festival in ["diwali", "holi", "navratri"]:
-            if festival in text:
-                # Get the correct year's date
-                year = self.current_year
-                # Check if the festival exists for the current year in our database
-                if year in self.indian_festivals and festival in self.indian_festivals[year]:
-                    festival_date = self.indian_festivals[year][festival]
-                    logger.info(f"Found Indian festival: {festival} -> {festival_date}")
-                    return festival_date
-        
-        # Check direct holiday references
-        for holiday, date in self.fixed_holidays.items():
-            if holiday in text:
-                logger.info(f"Found holiday reference: {holiday} -> {date}")
-                return date
-        
-        # Handle relative dates
-        if "tomorrow" in text:
-            tomorrow = datetime.now() + timedelta(days=1)
-            return tomorrow.strftime("%Y-%m-%d")
-        
-        if "today" in text:
-            return datetime.now().strftime("%Y-%m-%d")
-        
-        if "next" in text:
-            # Handle "next Monday", "next Tuesday", etc.
-            for i, day in enumerate(["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]):
-                if day in text:
-                    # Calculate days until next occurrence
-                    current_weekday = datetime.now().weekday()
-                    target_weekday = i
-                    days_ahead = target_weekday - current_weekday
-                    if days_ahead <= 0:  # Target day already happened this week
-                        days_ahead += 7
-                    next_date = datetime.now() + timedelta(days=days_ahead)
-                    return next_date.strftime("%Y-%m-%d")
+        holiday = self.holiday_matcher.find(text)
+        if holiday:
+            # Indian festivals move with the lunar calendar, so only the reference year's date is used
+            festival_date = self.indian_festivals.get(today.year, {}).get(holiday)
+            if festival_date:
+                logger.info(f"Found Indian festival: {holiday} -> {festival_date}")
+                return festival_date
+            
+            # Check direct holiday references
+            if holiday in self.fixed_holidays:
+                holiday_date = f"{today.year}{self.fixed_holidays[holiday][4:]}"
+                logger.info(f"Found holiday reference: {holiday} -> {holiday_date}")
+                return holiday_date
         
-        return None
+        # Explicit dates ("25th December", "25/12") and relative ones ("tomorrow", "next friday")
+        return match_date(text, today)
     
     def extract_time(self, text):
-        """Extract time from text"""
+        """Extract time from text as HH:MM (24-hour)"""
+        return match_time(text)
+
+class RelativeDateResolver:
+    """Memoizes parse_date_reference per (phrase, reference day).
+    
+    "tomorrow" only means something relative to a day, so the reference day is
+    part of the key and a repeated phrase in a session costs one dict lookup.
+    The memo is emptied when the calendar day changes, which also drops
+    answers that depended on today's year.
+    """
+    
+    def __init__(self, parser, max_entries=4096):
+        self.parser = parser
+        self.max_entries = max_entries
+        self._memo = {}
+        self._memo_day = None
+        self._lock = threading.Lock()
+    
+    def resolve(self, text, reference_date=None):
+        """YYYY-MM-DD for the date mentioned in text, or None"""
         if not text:
             return None
-            
-        text = text.lower()
+        today = date.today()
+        key = (" ".join(text.lower().split()), reference_day(reference_date) if reference_date else today)
+        with self._lock:
+            if self._memo_day != today:
+                self._memo.clear()
+                self._memo_day = today
+            if key in self._memo:
+                return self._memo[key]
         
-        # Look for patterns like "9PM", "9 PM", etc.
-        hours = list(range(1, 13))
-        for hour in hours:
-            # Check various formats
-            patterns = [
-                f"{hour}pm", f"{hour} pm", f"{hour}p.m.", f"{hour} p.m.",
-                f"{hour}am", f"{hour} am", f"{hour}a.m.", f"{hour} a.m."
-            ]
-            
-            for pattern in patterns:
-                if pattern in text:
-                    # Convert to 24-hour format
-                    if "p" in pattern:
-                        return f"{(hour % 12) + 12:02d}:00"
-                    else:
-                        return f"{hour % 12:02d}:00"
-        
-        return None
+        resolved = self.parser.parse_date_reference(key[0], key[1])
+        with self._lock:
+            if len(self._memo) >= self.max_entries:
+                self._memo.clear()
+            self._memo[key] = resolved
+        return resolved
+
+# Shared parser and resolver; every caller should use these instead of building their own
+date_parser = DateParser()
+date_resolver = RelativeDateResolver(date_parser)
@@ -1,10 +1,12 @@
 import logging
-from datetime import datetime, timedelta
+import functools
+import pandas as pd
+from datetime import date, datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
-def date_to_weekday(date_string):
-    """Convert date string to weekday name"""
+@functools.lru_cache(maxsize=4096)
+def _date_to_weekday(date_string):
     try:
         date_obj = datetime.strptime(str(date_string), "%Y-%m-%d")
         return date_obj.strftime("%A")  # Full weekday name
@@ -12,17 +14,26 @@ def date_to_weekday(date_string):
         logger.error(f"Error converting date to weekday: {e}")
         return None
 
+def date_to_weekday(date_string):
+    """Convert date string to weekday name (memoized; the answer never changes)"""
+    return _date_to_weekday(str(date_string))
+
 def weekday_to_date(day_name, reference_date=None):
     """Convert weekday name to next date with that weekday"""
     if reference_date is None:
-        reference_date = datetime.now()
-        
+        reference_date = date.today()
+    elif isinstance(reference_date, datetime):
+        reference_date = reference_date.date()
+    # The reference day is part of the key, so yesterday's answers are never reused
+    return _weekday_to_date(str(day_name).lower(), reference_date)
+
+@functools.lru_cache(maxsize=1024)
+def _weekday_to_date(target_day, reference_date):
     day_mapping = {
         'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
         'friday': 4, 'saturday': 5, 'sunday': 6
     }
     
-    target_day = day_name.lower()
     if target_day not in day_mapping:
         return None
         
@@ -34,6 +45,23 @@ def weekday_to_date(day_name, reference_date=None):
     target_date = reference_date + timedelta(days=days_to_add)
     return target_date.strftime("%Y-%m-%d")
 
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+def dates_to_weekdays(dates):
+    """Column-wise date_to_weekday: weekday names for a Series or array of YYYY-MM-DD
+    strings, NaN where a value is missing or not a date"""
+    dates = pd.Series(dates, copy=False)
+    parsed = pd.to_datetime(dates, format="%Y-%m-%d", errors="coerce")
+    return parsed.dt.weekday.map(dict(enumerate(WEEKDAY_NAMES))).astype(object)
+
+def weekdays_to_dates(day_names, reference_date=None):
+    """Column-wise weekday_to_date: the next date for each weekday name in a Series or
+    array (case-insensitive), NaN where a value is not a weekday"""
+    day_names = pd.Series(day_names, copy=False)
+    # Only seven possible answers, so work them out once and map the column onto them
+    next_dates = {name.lower(): weekday_to_date(name, reference_date) for name in WEEKDAY_NAMES}
+    return day_names.astype("string").str.strip().str.lower().map(next_dates).astype(object)
+
 def is_valid_date_format(date_str):
     """Check if a string is a valid date format (YYYY-MM-DD)"""
     try:
@@ -1,17 +1,120 @@
 import os
 import sys
+import time
 import pandas as pd
+from contextlib import nullcontext
 from datetime import datetime, timedelta
 
 # Fix the import to use relative import
-from .date_utils import date_to_weekday, weekday_to_date
+from .date_utils import dates_to_weekdays, weekdays_to_dates
+from . import backup, integrity
+from .file_lock import bookings_lock
 
-def fix_bookings_file(bookings_file=None):
+# Rows held in memory at a time; peak memory stays flat however large the file is
+CHUNK_ROWS = int(os.environ.get('MAINTENANCE_CHUNK_ROWS', 100000))
+# Minimum seconds between progress lines
+PROGRESS_INTERVAL = float(os.environ.get('MAINTENANCE_PROGRESS_INTERVAL', 2.0))
+
+def default_bookings_file():
+    curr_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.normpath(os.path.join(curr_dir, '..', 'data', 'bookings.csv'))
+
+class ProgressReporter:
+    """Prints how far through a file a job is, at most once per interval"""
+    
+    def __init__(self, label, total_bytes, interval=PROGRESS_INTERVAL):
+        self.label = label
+        self.total_bytes = max(total_bytes, 1)
+        self.interval = interval
+        self.started = time.monotonic()
+        self.last_report = self.started
+    
+    def update(self, rows, updated, position):
+        now = time.monotonic()
+        if now - self.last_report < self.interval:
+            return
+        self.last_report = now
+        percent = min(100.0, 100.0 * position / self.total_bytes)
+        print(f"{self.label}: {percent:5.1f}% - {rows} rows read, {updated} updated ({now - self.started:.0f}s)")
+    
+    def done(self, rows, updated):
+        print(f"{self.label}: {rows} rows read, {updated} updated in {time.monotonic() - self.started:.1f}s")
+
+class FileChangedError(Exception):
+    """The file was written by someone else while it was being rewritten"""
+    pass
+
+def rewrite_in_chunks(bookings_file, transform, label, chunk_rows=None, columns=None, swap_lock=None,
+                      expected_stat=None):
+    """Stream the CSV through transform(chunk) -> rows updated, writing to a temp file.
+    
+    The temp file replaces the original only if some row was updated or one of
+    `columns` had to be added, so an interrupted or pointless run leaves the
+    bookings untouched. Values are read and written as strings so untouched
+    rows keep their exact text. With a swap_lock (the lock writers hold while
+    saving), the swap is skipped with FileChangedError if the file was saved
+    in the meantime, rather than losing that write. expected_stat is the
+    (st_size, st_mtime_ns) the file must still have, for transforms planned
+    from an earlier read of it. Returns the rows updated.
+    """
+    chunk_rows = chunk_rows or CHUNK_ROWS
+    temp_file = f"{bookings_file}.tmp"
+    before = os.stat(bookings_file)
+    if expected_stat and (before.st_size, before.st_mtime_ns) != tuple(expected_stat):
+        raise FileChangedError(f"{bookings_file} changed before {label}")
+    progress = ProgressReporter(label, before.st_size)
+    rows = updated = 0
+    added = False
+    
+    try:
+        with open(bookings_file, 'rb') as src, open(temp_file, 'w', newline='') as dest:
+            for chunk in pd.read_csv(src, dtype=str, chunksize=chunk_rows):
+                for column in columns or []:
+                    if column not in chunk.columns:
+                        chunk[column] = None
+                        added = True
+                header = rows == 0
+                rows += len(chunk)
+                updated += transform(chunk)
+                chunk.to_csv(dest, index=False, header=header)
+                progress.update(rows, updated, src.tell())
+            dest.flush()
+            os.fsync(dest.fileno())
+        
+        progress.done(rows, updated)
+        if updated or added:
+            if swap_lock is None and expected_stat is None:
+                os.replace(temp_file, bookings_file)
+            else:
+                with swap_lock or nullcontext():
+                    after = os.stat(bookings_file)
+                    if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+                        raise FileChangedError(f"{bookings_file} changed during {label}")
+                    os.replace(temp_file, bookings_file)
+        return updated
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+def fill_missing_days(chunk):
+    """Fill 'day' from 'date' where it's missing; returns the rows updated"""
+    missing = chunk['day'].isna() & chunk['date'].notna()
+    weekdays = dates_to_weekdays(chunk.loc[missing, 'date']).dropna()
+    chunk.loc[weekdays.index, 'day'] = weekdays
+    return len(weekdays)
+
+def fill_missing_dates(chunk, reference_date=None):
+    """Fill 'date' with the next date for 'day' where it's missing; returns the rows updated"""
+    missing = chunk['day'].notna() & chunk['date'].isna()
+    next_dates = weekdays_to_dates(chunk.loc[missing, 'day'], reference_date).dropna()
+    chunk['date'] = chunk['date'].astype(object)
+    chunk.loc[next_dates.index, 'date'] = next_dates
+    return len(next_dates)
+
+def fix_bookings_file(bookings_file=None, chunk_rows=None):
     """Fix the bookings.csv file by adding missing weekday values"""
     if not bookings_file:
-        # Default path to bookings file
-        curr_dir = os.path.dirname(os.path.abspath(__file__))
-        bookings_file = os.path.join(curr_dir, '..', 'data', 'bookings.csv')
+        bookings_file = default_bookings_file()
     
     # Create backup
     backup_file = create_backup(bookings_file)
@@ -19,37 +122,28 @@ def fix_bookings_file(bookings_file=None):
         print(f"Created backup: {backup_file}")
     
     try:
-        # Read the CSV file
-        df = pd.read_csv(bookings_file)
-        
-        # Check if 'day' column exists
-        if 'day' not in df.columns:
+        # Only the header is needed to decide whether there's anything to do
+        columns = pd.read_csv(bookings_file, nrows=0).columns
+        if 'day' not in columns:
             print("The 'day' column does not exist in the bookings file.")
             return
+        if 'date' not in columns:
+            print("The bookings file has no 'date' column to fill days from.")
+            return
         
-        # Fill missing 'day' values based on 'date'
-        if 'date' in df.columns:
-            # For each row with missing 'day' but having 'date'
-            for i, row in df.iterrows():
-                if pd.isna(row['day']) and not pd.isna(row['date']):
-                    weekday = date_to_weekday(row['date'])
-                    if weekday:
-                        df.at[i, 'day'] = weekday
-                        print(f"Updated row {i}: date={row['date']} -> day={weekday}")
-        
-        # Save the updated CSV file
-        df.to_csv(bookings_file, index=False)
-        print(f"Updated bookings file saved to {bookings_file}")
+        updated = rewrite_in_chunks(bookings_file, fill_missing_days, "fix", chunk_rows)
+        if updated:
+            print(f"Updated bookings file saved to {bookings_file}")
+        else:
+            print("No rows needed a weekday; bookings file left unchanged.")
         
     except Exception as e:
         print(f"Error fixing bookings file: {e}")
         
-def migrate_database(bookings_file=None):
+def migrate_database(bookings_file=None, chunk_rows=None):
     """Migrate the database from day-based to date-based schema"""
     if not bookings_file:
-        # Default path to bookings file
-        curr_dir = os.path.dirname(os.path.abspath(__file__))
-        bookings_file = os.path.join(curr_dir, '..', 'data', 'bookings.csv')
+        bookings_file = default_bookings_file()
     
     # Create backup
     backup_file = create_backup(bookings_file)
@@ -57,76 +151,150 @@ def migrate_database(bookings_file=None):
         print(f"Created backup: {backup_file}")
     
     try:
-        # Read the CSV file
-        df = pd.read_csv(bookings_file)
-        
-        # Check if we need to migrate
-        if 'date' in df.columns:
-            # Check if there are any rows with day but no date
-            day_no_date = df[(~df['day'].isna()) & (df['date'].isna())]
-            if day_no_date.empty:
-                print("No migration needed: all rows already have dates.")
-                return
-            
-        # Make sure 'day' column exists
-        if 'day' not in df.columns:
-            df['day'] = None
-            
-        # Make sure 'date' column exists
-        if 'date' not in df.columns:
-            df['date'] = None
-            
-        # Today's date for reference
+        # Every chunk counts from the same day, even if the run crosses midnight
         today = datetime.now().date()
-        
-        # For each row with day but no date
-        for i, row in df.iterrows():
-            if not pd.isna(row['day']) and pd.isna(row['date']):
-                # Convert day to next date
-                next_date = weekday_to_date(row['day'])
-                if next_date:
-                    df.at[i, 'date'] = next_date
-                    print(f"Updated row {i}: day={row['day']} -> date={next_date}")
-        
-        # Save the updated CSV file
-        df.to_csv(bookings_file, index=False)
-        print(f"Migration complete. Updated file saved to {bookings_file}")
+        updated = rewrite_in_chunks(
+            bookings_file, lambda chunk: fill_missing_dates(chunk, today), "migrate", chunk_rows,
+            columns=['day', 'date']
+        )
+        if updated:
+            print(f"Migration complete. Updated file saved to {bookings_file}")
+        else:
+            print("No migration needed: all rows already have dates.")
         
     except Exception as e:
         print(f"Error migrating database: {e}")
 
-def create_backup(file_path):
-    """Create a backup of the given file with timestamp"""
-    if not os.path.exists(file_path):
+def check_integrity(bookings_file=None, repair='none', workers=None, limit=20):
+    """Report duplicate IDs, double-booked slots, bad dates and day/date mismatches,
+    then apply a repair policy. Returns the number of violations found.
+    
+    Rows are shown by line number in the file. Repairs address rows by position,
+    so they are abandoned if the file changed after the check; the swap holds
+    the bookings lock so no worker saves in between.
+    """
+    if not bookings_file:
+        bookings_file = default_bookings_file()
+    
+    report = integrity.check_bookings(bookings_file, workers)
+    
+    def lines(rows, shown=10):
+        # 1-based line numbers, counting the header
+        text = ', '.join(str(row + 2) for row in rows[:shown])
+        return f"lines {text}" + (f" and {len(rows) - shown} more" if len(rows) > shown else "")
+    
+    def show(title, items):
+        print(f"{title}: {len(items)}")
+        for item in items[:limit]:
+            print(f"    {item}")
+        if len(items) > limit:
+            print(f"    ... {len(items) - limit} more")
+    
+    print(f"Checked {report['rows']} bookings in {report['seconds']:.1f}s")
+    show("Duplicate booking IDs", [f"id {value}: {lines(rows)}"
+                                   for value, rows in report['duplicate_ids'].items()])
+    show("Double-booked slots", [f"{slot_date} {slot_time}: {lines(rows)}"
+                                 for (slot_date, slot_time), rows in report['double_booked'].items()])
+    show("Rows without a booking ID", [f"line {row + 2}" for row in report['missing_ids']])
+    show("Invalid dates", [f"line {row + 2}" for row in report['invalid_dates']])
+    show("Day/date mismatches", [f"line {row + 2}: day={day} but date is a {expected}"
+                                 for row, day, expected in report['day_mismatches']])
+    
+    violations = integrity.violation_count(report)
+    if repair == 'none' or not violations:
+        return violations
+    
+    new_ids, new_days, drop = integrity.repair_plan(report, repair)
+    if not (new_ids or new_days or drop):
+        print(f"Nothing for the '{repair}' policy to repair.")
+        return violations
+    
+    backup_file = create_backup(bookings_file)
+    if backup_file:
+        print(f"Created backup: {backup_file}")
+    try:
+        rewrite_in_chunks(bookings_file, integrity.apply_repairs(new_ids, new_days, drop), "repair",
+                          columns=['day'] if new_days else None, swap_lock=bookings_lock(bookings_file),
+                          expected_stat=report['file_stat'])
+    except FileChangedError:
+        print("Bookings changed since the check, so the repair would hit the wrong rows; nothing was changed. Run it again.")
+        return violations
+    print(f"Repaired: {len(new_ids)} IDs renumbered, {len(new_days)} days corrected, {len(drop)} double bookings dropped")
+    return violations
+
+def create_backup(file_path=None, keep=None, backup_dir=None):
+    """Snapshot a bookings file byte for byte, returning the snapshot directory.
+    
+    The default bookings file is backed up together with the sessions and the
+    holiday cache into BACKUP_DIR; any other file gets its own snapshots in
+    <file>.backups, unless backup_dir says otherwise. Old snapshots are rotated out per the retention settings.
+    """
+    if file_path and not os.path.exists(file_path):
         print(f"File not found: {file_path}")
         return None
-        
-    backup_file = f"{file_path}.bak.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    keep = keep or backup.BACKUP_KEEP
     
     try:
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-            df.to_csv(backup_file, index=False)
-        else:
-            with open(file_path, 'rb') as src, open(backup_file, 'wb') as dest:
-                dest.write(src.read())
-        return backup_file
+        if not file_path or os.path.abspath(file_path) == os.path.abspath(default_bookings_file()):
+            return backup.create_snapshot(backup_dir=backup_dir or backup.BACKUP_DIR, keep=keep)
+        return backup.create_snapshot({os.path.basename(file_path): file_path},
+                                      backup_dir=backup_dir or f"{file_path}.backups", keep=keep)
     except Exception as e:
         print(f"Error creating backup: {e}")
         return None
 
+def verify_backups(backup_dir=None):
+    """Check every snapshot against its manifest; returns True if all are intact"""
+    snapshots = backup.list_snapshots(backup_dir or backup.BACKUP_DIR)
+    if not snapshots:
+        print("No backups found.")
+        return True
+    intact = True
+    for snapshot in snapshots:
+        problems = backup.verify_snapshot(snapshot)
+        print(f"{os.path.basename(snapshot)}: {'ok' if not problems else f'{len(problems)} problems'}")
+        for problem in problems:
+            print(f"    {problem}")
+        intact = intact and not problems
+    return intact
+
 if __name__ == "__main__":
     # Command-line interface for maintenance operations
     import argparse
     
     parser = argparse.ArgumentParser(description='Database maintenance utilities')
-    parser.add_argument('--action', choices=['fix', 'migrate'], required=True,
+    parser.add_argument('--action', choices=['fix', 'migrate', 'upgrade-schema', 'check', 'backup', 'verify-backups'], required=True,
                         help='Maintenance action to perform')
     parser.add_argument('--file', help='Path to bookings file (optional)')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help=f'Rows processed at a time (default: {CHUNK_ROWS})')
+    parser.add_argument('--repair', choices=integrity.REPAIR_POLICIES, default='none',
+                        help='With check: what to repair (default: none, report only)')
+    parser.add_argument('--workers', type=int, help='With check: worker processes (default: one per CPU)')
+    parser.add_argument('--keep', type=int, default=backup.BACKUP_KEEP,
+                        help=f'Backups to keep when rotating (default: {backup.BACKUP_KEEP})')
+    parser.add_argument('--backup-dir', help=f'Where backups are kept (default: {backup.BACKUP_DIR})')
     
     args = parser.parse_args()
     
     if args.action == 'fix':
-        fix_bookings_file(args.file)
+        fix_bookings_file(args.file, args.chunk_rows)
     elif args.action == 'migrate':
-        migrate_database(args.file)
+        migrate_database(args.file, args.chunk_rows)
+    elif args.action == 'upgrade-schema':
+        from .schema import CURRENT_VERSION, migrate
+        bookings_file = args.file or default_bookings_file()
+        version = migrate(bookings_file)
+        print(f"{bookings_file} is at schema v{version} (current: v{CURRENT_VERSION})")
+        sys.exit(0 if version == CURRENT_VERSION else 1)
+    elif args.action == 'check':
+        violations = check_integrity(args.file, args.repair, args.workers)
+        sys.exit(1 if violations and args.repair == 'none' else 0)
+    elif args.action == 'backup':
+        snapshot = create_backup(args.file, args.keep, args.backup_dir)
+        if snapshot:
+            print(f"Created backup: {snapshot}")
+        sys.exit(0 if snapshot else 1)
+    elif args.action == 'verify-backups':
+        backup_dir = args.backup_dir or (f"{args.file}.backups" if args.file else None)
+        sys.exit(0 if verify_backups(backup_dir) else 1)
@@ -0,0 +1,49 @@
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock on a lock file (created if missing), held across processes.
+
+    flock where it exists, msvcrt.locking on Windows. Every call opens the
+    file afresh, so threads of one process exclude each other too. Not
+    reentrant: a thread must not take the same lock twice.
+    """
+    with open(path, 'a') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after 10 seconds
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+# Threads of this process queue here rather than each holding a lock file open
+_bookings_thread_lock = threading.Lock()
+
+@contextmanager
+def bookings_lock(bookings_file):
+    """Held by every read-modify-write of the bookings and by rewrites swapping the file in.
+
+    Covers the threads of this process and every worker process serving the
+    same file, through <bookings_file>.lock.
+    """
+    with _bookings_thread_lock, file_lock(f"{bookings_file}.lock"):
+        yield
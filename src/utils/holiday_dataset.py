@@ -0,0 +1,184 @@
+import os
+import mmap
+import time
+import struct
+import bisect
+import logging
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+# Bundled dataset, regenerated from the holiday cache by update_holidays --build-dataset
+DATASET_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'holidays.bin')
+
+MAGIC = b"HOLI"
+FORMAT_VERSION = 1
+
+# magic, format version, dataset version (unix time it was built), record count, name blob size
+HEADER = struct.Struct("<4sHIII")
+# name offset, name length, country code, date ordinal
+RECORD = struct.Struct("<IH2sI")
+DATE_INDEX = struct.Struct("<I")
+
+class _NameKeys:
+    """Sequence view of (name, country, ordinal) for every record, for bisect"""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __len__(self):
+        return self.dataset.count
+
+    def __getitem__(self, i):
+        return self.dataset._record(i)
+
+class _DateKeys:
+    """Sequence view of record ordinals in date order, for bisect"""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __len__(self):
+        return self.dataset.count
+
+    def __getitem__(self, i):
+        return self.dataset._record(self.dataset._date_order(i))[2]
+
+class HolidayDataset:
+    """Read-only holiday table memory-mapped from a compact binary file.
+
+    Fixed-size records sorted by (name, country, date) come first, then a
+    date-ordered index of record numbers, then the UTF-8 names. Lookups by
+    name or by date are binary searches over the mapped file, so nothing is
+    parsed up front and the pages are shared between worker processes.
+    """
+
+    def __init__(self, path=DATASET_FILE):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, format_version, self.version, self.count, names_size = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            self._buffer.close()
+            raise ValueError(f"{path} is not a holiday dataset (format {FORMAT_VERSION})")
+
+        self._records_start = HEADER.size
+        self._dates_start = self._records_start + self.count * RECORD.size
+        self._names_start = self._dates_start + self.count * DATE_INDEX.size
+        self._name_keys = _NameKeys(self)
+        self._date_keys = _DateKeys(self)
+        self._years = None
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._buffer.close()
+
+    def _record(self, i):
+        offset, length, country, ordinal = RECORD.unpack_from(self._buffer, self._records_start + i * RECORD.size)
+        start = self._names_start + offset
+        return self._buffer[start:start + length].decode('utf-8'), country.decode('ascii'), ordinal
+
+    def _date_order(self, i):
+        return DATE_INDEX.unpack_from(self._buffer, self._dates_start + i * DATE_INDEX.size)[0]
+
+    def get_date(self, name, year, country_code="IN"):
+        """ISO date of a holiday in the given year, or None"""
+        country_code = country_code.upper()
+        start = (name.lower(), country_code, date(year, 1, 1).toordinal())
+        i = bisect.bisect_left(self._name_keys, start)
+        if i < self.count:
+            found_name, found_country, ordinal = self._record(i)
+            if (found_name, found_country) == start[:2] and ordinal < date(year + 1, 1, 1).toordinal():
+                return date.fromordinal(ordinal).isoformat()
+        return None
+
+    def holidays_on(self, iso_date, country_code=None):
+        """Names of the holidays falling on an ISO date"""
+        ordinal = date.fromisoformat(iso_date).toordinal()
+        i = bisect.bisect_left(self._date_keys, ordinal)
+        names = []
+        while i < self.count:
+            name, country, found = self._record(self._date_order(i))
+            if found != ordinal:
+                break
+            if country_code is None or country == country_code.upper():
+                names.append(name)
+            i += 1
+        return names
+
+    def years(self, country_code="IN"):
+        """Years the dataset has any holidays for in a country"""
+        country_code = country_code.upper()
+        if self._years is None:
+            years = {}
+            for i in range(self.count):
+                _, country, ordinal = self._record(i)
+                years.setdefault(country, set()).add(date.fromordinal(ordinal).year)
+            self._years = years
+        return self._years.get(country_code, set())
+
+    def names(self):
+        """Every distinct holiday name in the dataset"""
+        return {self._record(i)[0] for i in range(self.count)}
+
+    def entries(self):
+        """Every record as (country, name, ISO date)"""
+        for i in range(self.count):
+            name, country, ordinal = self._record(i)
+            yield country, name, date.fromordinal(ordinal).isoformat()
+
+def entries_from_cache(*caches):
+    """(country, name, ISO date) rows from resolver caches keyed on (country, year)"""
+    entries = set()
+    for cache in caches:
+        for (country, year_str), holidays in cache.items():
+            for name, iso_date in holidays.items():
+                # Calendarific dates can carry a time, e.g. "2025-03-30T00:00:00+05:30"
+                if name and iso_date:
+                    entries.add((country.upper(), name.lower(), iso_date[:10]))
+    return entries
+
+def write_dataset(entries, path=DATASET_FILE, version=None):
+    """Write (country, name, ISO date) rows as a dataset file; returns the number of records"""
+    records = sorted((name, country, date.fromisoformat(iso_date).toordinal()) for country, name, iso_date in entries)
+    if version is None:
+        version = int(time.time())
+
+    names = bytearray()
+    name_offsets = {}
+    packed = bytearray()
+    for name, country, ordinal in records:
+        if name not in name_offsets:
+            name_offsets[name] = len(names)
+            names += name.encode('utf-8')
+        packed += RECORD.pack(name_offsets[name], len(name.encode('utf-8')), country.encode('ascii'), ordinal)
+
+    date_order = sorted(range(len(records)), key=lambda i: records[i][2])
+    dates = b"".join(DATE_INDEX.pack(i) for i in date_order)
+
+    # Write to a temp file and swap it in so a running process never maps a partial file
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, version, len(records), len(names)))
+        f.write(packed)
+        f.write(dates)
+        f.write(names)
+    os.replace(temp_file, path)
+    logger.info(f"Wrote {len(records)} holidays to {path} (version {version})")
+    return len(records)
+
+def load_dataset(path=DATASET_FILE):
+    """Map the bundled dataset, or None if it is missing or unreadable"""
+    if not os.path.exists(path):
+        logger.warning(f"Holiday dataset not found at {path}")
+        return None
+    try:
+        dataset = HolidayDataset(path)
+        logger.info(f"Mapped holiday dataset {path} with {len(dataset)} holidays (version {dataset.version})")
+        return dataset
+    except Exception as e:
+        logger.error(f"Error loading holiday dataset {path}: {str(e)}")
+        return None
@@ -0,0 +1,125 @@
+import re
+import logging
+from collections import Counter
+from difflib import SequenceMatcher
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text):
+    """Lowercase, straighten apostrophes and collapse whitespace so names match however they're typed"""
+    return " ".join((text or "").lower().replace("’", "'").split())
+
+def _build_trie(names):
+    trie = {}
+    for name in names:
+        node = trie
+        for char in name:
+            node = node.setdefault(char, {})
+        node[""] = True
+    return trie
+
+def _trie_pattern(node):
+    """Regex for a trie node; shared prefixes are written once and longer names are tried first"""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char != ""]
+    if not branches:
+        return ""
+    group = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        return f"(?:{group})?"
+    return group
+
+class HolidayMatcher:
+    """Finds holiday and festival names in free text in a single pass.
+
+    The names are loaded into a trie, which is compiled into one regular
+    expression, so matching runs inside the regex engine instead of looping
+    over every name with `in`. Matches must start and end on word boundaries
+    ("holi" doesn't match "holiday"), and the longest name wins
+    ("christmas eve" over "christmas").
+    """
+
+    def __init__(self, names):
+        self.names = sorted({normalize_text(name) for name in names if name and name.strip()})
+        if self.names:
+            pattern = _trie_pattern(_build_trie(self.names))
+            self._regex = re.compile(rf"(?<!\w)({pattern})(?!\w)")
+        else:
+            self._regex = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def find_all(self, text):
+        """All non-overlapping holiday names in the text, left to right"""
+        if self._regex is None or not text:
+            return []
+        return self._regex.findall(normalize_text(text))
+
+    def find(self, text):
+        """The longest holiday name mentioned in the text, or None"""
+        matches = self.find_all(text)
+        if not matches:
+            return None
+        return max(matches, key=len)
+
+def _trigrams(text):
+    """Character trigrams with word-start padding, so prefixes weigh a little more"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# Share of trigrams a name must have in common with the query to be scored at all
+CANDIDATE_OVERLAP = 0.3
+
+class FuzzyNameIndex:
+    """Ranks known holiday names by similarity to a possibly misspelt one.
+
+    Every name is split into character trigrams and kept in an inverted
+    index, so a search only scores names sharing a good part of their
+    trigrams with the query. The score is difflib's ratio of matching characters to the
+    length of both names, so a short query isn't a close match for a long
+    name just because it is part of it: "deewali" scores 0.77 against
+    "diwali", "birthday" 0.50 against "birthday of rabindranath".
+    Names listing alternatives ("diwali/deepavali") are indexed under each.
+    """
+
+    def __init__(self, names):
+        self.names = sorted({normalize_text(name) for name in names if name and name.strip()})
+        self._variants = []
+        self._postings = {}
+        for canonical in self.names:
+            for variant in {canonical} | {part.strip() for part in canonical.split("/") if part.strip()}:
+                grams = _trigrams(variant)
+                self._variants.append((canonical, variant, len(grams)))
+                for gram in grams:
+                    self._postings.setdefault(gram, []).append(len(self._variants) - 1)
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, query, limit=5, threshold=0.7):
+        """Up to limit (name, score) pairs scoring at least threshold, best first"""
+        query = normalize_text(query)
+        if not query:
+            return []
+        grams = _trigrams(query)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+
+        # The query is seq2, which SequenceMatcher preprocesses once for all candidates
+        matcher = SequenceMatcher()
+        matcher.set_seq2(query)
+        best = {}
+        for index, count in shared.items():
+            canonical, variant, size = self._variants[index]
+            # Names sharing only a trigram or two (" da", "day") are never close; skip them cheaply
+            if 2.0 * count / (len(grams) + size) < CANDIDATE_OVERLAP:
+                continue
+            matcher.set_seq1(variant)
+            if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                continue
+            score = matcher.ratio()
+            if score >= threshold and score > best.get(canonical, 0):
+                best[canonical] = score
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
@@ -3,10 +3,12 @@ import logging
 import json
 from datetime import datetime
 import os
+import time
+import threading
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+from utils.holiday_matcher import FuzzyNameIndex, HolidayMatcher
+from utils.holiday_dataset import DATASET_FILE, load_dataset
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -14,65 +16,216 @@ logger = logging.getLogger(__name__)
 
 # Cache directory for holiday data
 CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache')
-os.makedirs(CACHE_DIR, exist_ok=True)
+
+# Cached (country, year) entries older than this are refreshed in the background;
+# the stale entry keeps being served until the refresh lands
+CACHE_TTL_SECONDS = float(os.environ.get("HOLIDAY_CACHE_TTL_DAYS", "30")) * 86400
+
+# After a failed fetch, or a festival the LLM couldn't date, don't ask again for this long
+NEGATIVE_CACHE_TTL_SECONDS = float(os.environ.get("HOLIDAY_NEGATIVE_TTL_MINUTES", "15")) * 60
+
+# Minimum similarity for a misspelt festival name to count as a known one
+FUZZY_MATCH_THRESHOLD = float(os.environ.get("HOLIDAY_FUZZY_THRESHOLD", "0.7"))
+# How far the best fuzzy match must lead one on a different date; "teachers day"
+# is as close to "fathers' day" as to "mothers' day", so it matches neither
+FUZZY_MATCH_MARGIN = float(os.environ.get("HOLIDAY_FUZZY_MARGIN", "0.1"))
+
+# Set HOLIDAY_PREFETCH=0 to skip fetching the current and next year at startup
+HOLIDAY_PREFETCH = os.environ.get("HOLIDAY_PREFETCH", "1") != "0"
+
+# Other ways people refer to holidays in the cache
+COMMON_ALIASES = {
+    "independence day of india": "independence day",
+    "indian independence day": "independence day",
+    "indian republic day": "republic day",
+    "deepavali": "diwali",
+    "navratri": "first day of sharad navratri",
+    "eid": "ramzan id",
+    "eid ul-fitr": "ramzan id",
+    "eid al-fitr": "ramzan id",
+    "eid al-adha": "bakrid",
+    "bakri eid": "bakrid",
+    "coffee day": "international coffee day",
+    "new year": "new year's day"
+}
+
+def cache_key(country_code, year):
+    """Key of one cache entry: holidays differ per country, so the year alone isn't enough"""
+    return (country_code.upper(), str(year))
 
 class HolidayResolver:
     def __init__(self):
+        # Load environment variables
+        load_dotenv()
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        
+        # (country, year) -> {holiday name: ISO date}, plus when each entry was fetched
         self.holiday_cache = {}
-        self.cache_file = os.path.join(CACHE_DIR, 'holiday_cache.json')
+        self.fetched_at = {}
+        # (country, year) -> {festival name: ISO date} for dates the LLM resolved
+        self.resolved_dates = {}
+        self.entry_dir = os.path.join(CACHE_DIR, 'holidays')
+        os.makedirs(self.entry_dir, exist_ok=True)
+        # Single year-keyed file used before entries were split per country
+        self.legacy_cache_file = os.path.join(CACHE_DIR, 'holiday_cache.json')
         self.legacy_helper = None  # Add this to fix the AttributeError
         
+        # Compiled name matcher and fuzzy index, rebuilt whenever cache_version moves on
+        self.cache_version = 0
+        self._matcher = None
+        self._matcher_version = -1
+        self._fuzzy_index = None
+        self._fuzzy_index_version = -1
+        self._matcher_lock = threading.Lock()
+        
+        # Entries being fetched in the background, so each is only requested once
+        self._prefetching = set()
+        self._prefetch_lock = threading.Lock()
+        
+        # Negative cache: when a fetch for an entry last failed, and festivals nobody could date
+        self.failed_at = {}
+        self.festival_misses = {}
+        
+        # One lock per entry so concurrent misses share a single fetch
+        self._key_locks = {}
+        self._key_locks_lock = threading.Lock()
+        
         # Get Calendarific API key from environment
         self.api_key = os.environ.get("CALENDARIFIC_API_KEY")
         if not self.api_key:
             logger.warning("Calendarific API key not found. Holiday resolution may be limited.")
         
-        # Base URL for Calendarific API
-        self.base_url = "https://calendarific.com/api/v2"
+        # Base URL for Calendarific API (point it at utils.calendarific_stub to work offline)
+        self.base_url = os.environ.get("CALENDARIFIC_BASE_URL", "https://calendarific.com/api/v2")
         
         # Default to Indian holidays
         self.country_code = "IN"
         
         self.load_cache()
         
+        # Bundled offline dataset, used when nothing was fetched for a year
+        self.dataset = load_dataset(os.environ.get("HOLIDAY_DATASET", DATASET_FILE))
+        # (entry, festival) pairs already reported as missing from both the cache and the dataset
+        self._uncovered_warned = set()
+        
     def load_cache(self):
-        """Load holiday cache from file"""
+        """Load every cached (country, year) entry from the cache directory"""
+        self._migrate_legacy_cache()
+        for filename in sorted(os.listdir(self.entry_dir)):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.entry_dir, filename), 'r') as f:
+                    entry = json.load(f)
+                key = cache_key(entry['country'], entry['year'])
+                # An entry with only LLM-resolved dates was never fetched
+                if entry.get('fetched_at'):
+                    self.holiday_cache[key] = entry.get('holidays', {})
+                    self.fetched_at[key] = entry['fetched_at']
+                if entry.get('resolved'):
+                    self.resolved_dates[key] = entry['resolved']
+            except Exception as e:
+                logger.error(f"Error loading holiday cache entry {filename}: {str(e)}")
+        self.cache_version += 1
+        logger.info(f"Loaded holiday cache with {len(self.holiday_cache)} country/year entries")
+    
+    def _entry_file(self, key):
+        country, year_str = key
+        return os.path.join(self.entry_dir, f"{country}-{year_str}.json")
+    
+    def save_entry(self, key):
+        """Save one (country, year) entry to its own file"""
+        entry_file = self._entry_file(key)
+        temp_file = f"{entry_file}.{threading.get_ident()}.tmp"
+        entry = {
+            "country": key[0],
+            "year": key[1],
+            "fetched_at": self.fetched_at.get(key, 0),
+            "holidays": self.holiday_cache.get(key, {}),
+            "resolved": self.resolved_dates.get(key, {})
+        }
         try:
-            if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r') as f:
-                    self.holiday_cache = json.load(f)
-                logger.info(f"Loaded holiday cache with {len(self.holiday_cache.keys())} years")
+            # Write to a temp file and swap it in so readers never see a partial entry
+            with open(temp_file, 'w') as f:
+                json.dump(entry, f)
+            os.replace(temp_file, entry_file)
+            logger.info(f"Saved holiday cache entry to {entry_file}")
         except Exception as e:
-            logger.error(f"Error loading holiday cache: {str(e)}")
-            self.holiday_cache = {}
+            logger.error(f"Error saving holiday cache entry {entry_file}: {str(e)}")
     
-    def save_cache(self):
-        """Save holiday cache to file"""
+    def _migrate_legacy_cache(self):
+        """Split the old year-keyed holiday_cache.json into per-entry files"""
+        if not os.path.exists(self.legacy_cache_file):
+            return
         try:
-            with open(self.cache_file, 'w') as f:
-                json.dump(self.holiday_cache, f)
-            logger.info(f"Saved holiday cache to {self.cache_file}")
+            with open(self.legacy_cache_file, 'r') as f:
+                legacy_cache = json.load(f)
+            fetched_at = os.path.getmtime(self.legacy_cache_file)
+            # Everything in the old file was fetched for the default country
+            for year_str, holidays in legacy_cache.items():
+                key = cache_key(self.country_code, year_str)
+                if os.path.exists(self._entry_file(key)):
+                    continue
+                self.holiday_cache[key] = holidays
+                self.fetched_at[key] = fetched_at
+                self.save_entry(key)
+            os.replace(self.legacy_cache_file, f"{self.legacy_cache_file}.migrated")
+            logger.info(f"Migrated {len(legacy_cache)} years from {self.legacy_cache_file}")
         except Exception as e:
-            logger.error(f"Error saving holiday cache: {str(e)}")
-            
+            logger.error(f"Error migrating legacy holiday cache: {str(e)}")
+    
+    def is_stale(self, key):
+        """Whether a cached entry is older than the TTL"""
+        return time.time() - self.fetched_at.get(key, 0) > CACHE_TTL_SECONDS
+    
+    def recently_failed(self, key):
+        """Whether the last fetch for an entry failed within the negative TTL"""
+        return time.time() - self.failed_at.get(key, 0) < NEGATIVE_CACHE_TTL_SECONDS
+    
+    def _key_lock(self, key):
+        with self._key_locks_lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+    
     def get_holidays(self, year, country_code=None):
         """Get holidays for a specific year and country using Calendarific API"""
         if not country_code:
             country_code = self.country_code
             
         year_str = str(year)
+        key = cache_key(country_code, year)
         
-        # Check if we have cached data for this year
-        if year_str in self.holiday_cache:
-            logger.info(f"Using cached holiday data for {year_str}")
-            return self.holiday_cache[year_str]
+        # Check if we have fresh cached data for this country and year
+        if key in self.holiday_cache and not self.is_stale(key):
+            logger.info(f"Using cached holiday data for {country_code} {year_str}")
+            return self.holiday_cache[key]
         
-        # If no API key, return empty dict
+        # If no API key, serve whatever we have, even if stale
         if not self.api_key:
             logger.error("Calendarific API key not available")
-            return {}
+            return self.holiday_cache.get(key, {})
+        
+        with self._key_lock(key):
+            # Another caller may have fetched it while we waited for the lock
+            if key in self.holiday_cache and not self.is_stale(key):
+                return self.holiday_cache[key]
+            if self.recently_failed(key):
+                logger.info(f"Not fetching holidays for {country_code} {year_str}; the last attempt failed")
+                return self.holiday_cache.get(key, {})
+            
+            holidays = self.fetch_holidays(year, country_code)
+            if holidays is None:
+                self.failed_at[key] = time.time()
+                return self.holiday_cache.get(key, {})
+            self.failed_at.pop(key, None)
+            return holidays
+    
+    def fetch_holidays(self, year, country_code=None, save=True):
+        """Fetch one (country, year) entry from Calendarific into the cache; None if the fetch failed.
         
-        # Fetch from Calendarific API
+        With save=False the entry is only kept in memory, for callers that write many at once.
+        """
+        key = cache_key(country_code or self.country_code, year)
+        country_code, year_str = key
         try:
             url = f"{self.base_url}/holidays"
             params = {
@@ -93,7 +246,7 @@ class HolidayResolver:
             if data.get("meta", {}).get("code") != 200:
                 error_message = data.get("meta", {}).get("error_message", "Unknown error")
                 logger.error(f"Calendarific API error: {error_message}")
-                return {}
+                return None
                 
             holidays = data.get("response", {}).get("holidays", [])
             
@@ -133,16 +286,19 @@ class HolidayResolver:
                     formatted_holidays["gandhi jayanti"] = iso_date
             
             # Cache the result
-            self.holiday_cache[year_str] = formatted_holidays
-            self.save_cache()
+            self.holiday_cache[key] = formatted_holidays
+            self.fetched_at[key] = time.time()
+            self.cache_version += 1
+            if save:
+                self.save_entry(key)
             
             return formatted_holidays
             
         except Exception as e:
-            logger.error(f"Error fetching holidays for {year}: {str(e)}")
-            return {}
+            logger.error(f"Error fetching holidays for {country_code} {year_str}: {str(e)}")
+            return None
             
-    def get_festival_date(self, festival_name, year=None):
+    def get_festival_date(self, festival_name, year=None, country_code=None):
         """Get the date for a specific festival in YYYY-MM-DD format"""
         if not year:
             year = datetime.now().year
@@ -151,7 +307,7 @@ class HolidayResolver:
         festival_name = festival_name.lower()
         
         # First try to get it from our cached data
-        result = self._get_festival_date_internal(festival_name, year)
+        result = self._get_festival_date_internal(festival_name, year, country_code)
         
         if result is None:
             # No need for legacy_helper check since we now handle it properly
@@ -159,39 +315,212 @@ class HolidayResolver:
             
         return result
         
-    def _get_festival_date_internal(self, festival_name, year=None):
+    def _get_festival_date_internal(self, festival_name, year=None, country_code=None):
         """Internal method for getting festival date from our own cache"""
         if not year:
             year = datetime.now().year
+        if not country_code:
+            country_code = self.country_code
             
-        year_str = str(year)
+        key = cache_key(country_code, year)
         festival_name = festival_name.lower()
         
-        # If we don't have data for this year yet, get it
-        if year_str not in self.holiday_cache:
-            self.get_holidays(year)
+        # Never fetch inside a request: refresh missing or stale entries in the background
+        # and answer from what we have now
+        if key not in self.holiday_cache or self.is_stale(key):
+            self.prefetch([year], country_code)
         
-        # Check if festival is in our cache for this year
-        if year_str in self.holiday_cache:
-            holidays = self.holiday_cache[year_str]
-            
-            # Direct match
-            if festival_name in holidays:
-                return holidays[festival_name]
-            
-            # Try common aliases
-            common_aliases = {
-                "independence day of india": "independence day",
-                "indian independence day": "independence day",
-                "indian republic day": "republic day",
-                "deepavali": "diwali",
-                "coffee day": "international coffee day"
-            }
-            
-            if festival_name in common_aliases and common_aliases[festival_name] in holidays:
-                return holidays[common_aliases[festival_name]]
-                
+        result = self._lookup(key, festival_name) or self._fuzzy_lookup(key, festival_name)
+        if not result:
+            self._warn_uncovered(key, festival_name)
+        return result
+    
+    def _fuzzy_lookup(self, key, festival_name):
+        """Date of the closest known name to a misspelt one like "deewali", or None.
+
+        Gives up when a name on another date is nearly as close, so the caller
+        asks the LLM rather than guessing.
+        """
+        best = None
+        for name, score in self.fuzzy_index.search(festival_name, threshold=FUZZY_MATCH_THRESHOLD - FUZZY_MATCH_MARGIN):
+            result = self._lookup(key, name)
+            if not result:
+                continue
+            if best is None:
+                if score < FUZZY_MATCH_THRESHOLD:
+                    return None
+                best = (name, score, result)
+            elif result != best[2] and score > best[1] - FUZZY_MATCH_MARGIN:
+                logger.info(f"Festival '{festival_name}' is as close to '{name}' ({score:.2f}) "
+                            f"as to '{best[0]}' ({best[1]:.2f}); not guessing")
+                return None
+        if best:
+            logger.info(f"Matched festival '{festival_name}' to '{best[0]}' (similarity {best[1]:.2f})")
+            return best[2]
+        return None
+    
+    def _warn_uncovered(self, key, festival_name):
+        """Log once per festival and entry that nothing was fetched for and the bundled dataset lacks"""
+        country_code, year_str = key
+        if key in self.holiday_cache or (key, festival_name) in self._uncovered_warned:
+            return
+        self._uncovered_warned.add((key, festival_name))
+        covered = sorted(self.dataset.years(country_code)) if self.dataset else []
+        logger.warning(f"No date for '{festival_name}' in {country_code} {year_str}: nothing fetched yet and "
+                       f"the bundled dataset (years {', '.join(map(str, covered)) or 'none'}) doesn't have it; "
+                       f"falling back to the LLM. Add it with update_holidays --build-dataset")
+    
+    def _lookup(self, key, festival_name):
+        """Date of an exactly named festival for one (country, year) entry, or None"""
+        country_code, year_str = key
+        
+        # Check if festival is in our cache for this country and year
+        holidays = self.holiday_cache.get(key, {})
+        
+        # Direct match
+        if festival_name in holidays:
+            return holidays[festival_name]
+        
+        # Try common aliases
+        if festival_name in COMMON_ALIASES and COMMON_ALIASES[festival_name] in holidays:
+            return holidays[COMMON_ALIASES[festival_name]]
+        
+        # Bundled dataset, so offline deployments still resolve known holidays
+        if self.dataset:
+            for name in (festival_name, COMMON_ALIASES.get(festival_name)):
+                bundled_date = self.dataset.get_date(name, int(year_str), country_code) if name else None
+                if bundled_date:
+                    return bundled_date
+        
+        # Dates the LLM resolved before
+        return self.resolved_dates.get(key, {}).get(festival_name)
+    
+    def remember_festival_date(self, festival_name, date, year=None, country_code=None):
+        """Keep a date resolved outside Calendarific; a None date records a miss for the negative TTL"""
+        key = cache_key(country_code or self.country_code, year or datetime.now().year)
+        festival_name = festival_name.lower()
+        if not date:
+            self.festival_misses[(key, festival_name)] = time.time()
+            return
+        self.festival_misses.pop((key, festival_name), None)
+        self.resolved_dates.setdefault(key, {})[festival_name] = date
+        self.cache_version += 1
+        self.save_entry(key)
+    
+    def recent_miss(self, festival_name, year=None, country_code=None):
+        """Whether this festival couldn't be dated within the negative TTL"""
+        key = cache_key(country_code or self.country_code, year or datetime.now().year)
+        missed_at = self.festival_misses.get((key, festival_name.lower()), 0)
+        return time.time() - missed_at < NEGATIVE_CACHE_TTL_SECONDS
+    
+    def prefetch(self, years=None, country_code=None, wait=False):
+        """Fetch years that are missing or stale (default: current and next) on a background thread"""
+        if not country_code:
+            country_code = self.country_code
+        if years is None:
+            current_year = datetime.now().year
+            years = [current_year, current_year + 1]
+        
+        # Without a key there is nothing to fetch, so don't start threads for every miss
+        if not self.api_key:
+            return None
+        
+        with self._prefetch_lock:
+            missing = [cache_key(country_code, year) for year in years]
+            missing = [key for key in missing
+                       if (key not in self.holiday_cache or self.is_stale(key))
+                       and key not in self._prefetching and not self.recently_failed(key)]
+            self._prefetching.update(missing)
+        if not missing:
+            return None
+        
+        def fetch():
+            try:
+                for country, year_str in missing:
+                    self.get_holidays(int(year_str), country)
+            finally:
+                with self._prefetch_lock:
+                    self._prefetching.difference_update(missing)
+        
+        thread = threading.Thread(target=fetch, name="holiday-prefetch", daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+        return thread
+    
+    @property
+    def matcher(self):
+        """Matcher over every holiday name and alias in the cache, rebuilt when the cache changes"""
+        with self._matcher_lock:
+            if self._matcher is None or self._matcher_version != self.cache_version:
+                version = self.cache_version
+                self._matcher = HolidayMatcher(self._known_names())
+                self._matcher_version = version
+                logger.info(f"Built holiday matcher with {len(self._matcher)} names")
+            return self._matcher
+    
+    def _known_names(self):
+        names = set(COMMON_ALIASES)
+        for holidays in list(self.holiday_cache.values()) + list(self.resolved_dates.values()):
+            names.update(holidays)
+        if self.dataset:
+            names.update(self.dataset.names())
+        return names
+    
+    @property
+    def fuzzy_index(self):
+        """Trigram index over the same names as the matcher, rebuilt when the cache changes"""
+        with self._matcher_lock:
+            if self._fuzzy_index is None or self._fuzzy_index_version != self.cache_version:
+                version = self.cache_version
+                self._fuzzy_index = FuzzyNameIndex(self._known_names())
+                self._fuzzy_index_version = version
+                logger.info(f"Built fuzzy holiday index with {len(self._fuzzy_index)} names")
+            return self._fuzzy_index
+    
+    def find_festival(self, text):
+        """Name of the holiday or festival mentioned in the text, or None"""
+        return self.matcher.find(text)
+
+class LazyHolidayResolver:
+    """Stands in for the HolidayResolver singleton and creates it on first use.
+    
+    Importing this module stays cheap: the .env file, the cache directory and
+    the cache file are only touched when a caller first needs the resolver.
+    """
+    
+    def __init__(self):
+        self._resolver = None
+        self._lock = threading.Lock()
+    
+    def _get_resolver(self):
+        if self._resolver is None:
+            with self._lock:
+                if self._resolver is None:
+                    self._resolver = HolidayResolver()
+        return self._resolver
+    
+    @property
+    def initialized(self):
+        return self._resolver is not None
+    
+    def __getattr__(self, name):
+        return getattr(self._get_resolver(), name)
+    
+    def __setattr__(self, name, value):
+        if name in ("_resolver", "_lock"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._get_resolver(), name, value)
+
+def start_background_prefetch(years=None):
+    """Create the resolver and fetch the current and next year off the request path"""
+    if not HOLIDAY_PREFETCH:
         return None
+    thread = threading.Thread(target=lambda: holiday_resolver.prefetch(years, wait=True),
+                              name="holiday-startup", daemon=True)
+    thread.start()
+    return thread
 
 # Create a singleton instance
-holiday_resolver = HolidayResolver()
+holiday_resolver = LazyHolidayResolver()
@@ -0,0 +1,172 @@
+import io
+import os
+import time
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from .date_utils import dates_to_weekdays
+
+logger = logging.getLogger(__name__)
+
+# Bytes of CSV each worker parses at a time
+CHUNK_BYTES = int(os.environ.get('INTEGRITY_CHUNK_BYTES', 32 * 1024 * 1024))
+
+REPAIR_POLICIES = ['none', 'renumber', 'fix-days', 'drop-double-bookings', 'all']
+
+def line_aligned_ranges(path, chunk_bytes=CHUNK_BYTES):
+    """(start, end) byte ranges covering the data rows, each starting on a line boundary"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        start = f.tell()
+        ranges = []
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def _scan_range(path, start, end, columns):
+    """Check one byte range; row positions in the result are relative to the range.
+
+    Runs in a worker process, so it returns compact arrays rather than the
+    parsed frame: booking ids, a 64-bit hash per (date, time) slot with the
+    slot each hash stands for, and the rows whose day disagrees with their date.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    wanted = [column for column in ('booking_id', 'date', 'time', 'day') if column in columns]
+    df = pd.read_csv(io.BytesIO(data), header=None, names=columns, usecols=wanted, dtype=str)
+
+    ids = pd.to_numeric(df['booking_id'], errors='coerce').to_numpy('float64')
+
+    has_slot = df['date'].notna() & df['time'].notna()
+    slots = df.loc[has_slot, ['date', 'time']]
+    hashes = pd.util.hash_pandas_object(slots, index=False)
+    # Bookings cover few distinct slots, so the names behind the hashes are cheap to send back
+    distinct = hashes.drop_duplicates()
+    slot_names = dict(zip(distinct.to_numpy(), slots.loc[distinct.index].itertuples(index=False, name=None)))
+
+    weekdays = dates_to_weekdays(df['date'])
+    invalid_dates = df.index[df['date'].notna() & weekdays.isna()].to_numpy()
+    mismatched = []
+    if 'day' in df.columns:
+        wrong = weekdays.notna() & (df['day'].isna() | (df['day'].str.strip().str.lower() != weekdays.str.lower()))
+        mismatched = list(zip(df.index[wrong], df.loc[wrong, 'day'], weekdays[wrong]))
+
+    return {
+        'rows': len(df),
+        'ids': ids,
+        'slot_rows': df.index[has_slot].to_numpy(),
+        'slot_hashes': hashes.to_numpy(),
+        'slot_names': slot_names,
+        'invalid_dates': invalid_dates,
+        'day_mismatches': mismatched
+    }
+
+def _groups(values, rows):
+    """{value: [rows]} for every value that occurs more than once"""
+    series = pd.Series(values, index=rows)
+    repeated = series[series.duplicated(keep=False)]
+    return {value: group.index.tolist() for value, group in repeated.groupby(repeated, sort=False)}
+
+def check_bookings(bookings_file, workers=None, chunk_bytes=CHUNK_BYTES):
+    """Scan a bookings file in parallel byte ranges and report every invariant violation.
+
+    Rows are referenced by their 0-based data row (line number minus 2), the
+    same position pandas gives them when the file is read, so repairs can
+    address them. Assumes no quoted field spans lines, which holds for
+    bookings written by this app.
+    """
+    started = time.monotonic()
+    # Repairs address rows by position, so they need to know the file is still this one
+    stat = os.stat(bookings_file)
+    columns = list(pd.read_csv(bookings_file, nrows=0).columns)
+    missing = {'booking_id', 'date', 'time'} - set(columns)
+    if missing:
+        raise ValueError(f"{bookings_file} has no {', '.join(sorted(missing))} column")
+
+    ranges = line_aligned_ranges(bookings_file, chunk_bytes)
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(ranges) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_scan_range, [bookings_file] * len(ranges),
+                                    *zip(*ranges), [columns] * len(ranges)))
+    else:
+        results = [_scan_range(bookings_file, start, end, columns) for start, end in ranges]
+
+    # Shift each range's row positions by the rows before it
+    ids, id_rows, slot_hashes, slot_rows, slot_names = [], [], [], [], {}
+    report = {'rows': 0, 'missing_ids': [], 'invalid_dates': [], 'day_mismatches': [],
+              'file_stat': (stat.st_size, stat.st_mtime_ns)}
+    for result in results:
+        offset = report['rows']
+        ids.append(result['ids'])
+        id_rows.append(pd.RangeIndex(offset, offset + result['rows']).to_numpy())
+        slot_hashes.append(result['slot_hashes'])
+        slot_rows.append(result['slot_rows'] + offset)
+        slot_names.update(result['slot_names'])
+        report['invalid_dates'].extend(int(row) + offset for row in result['invalid_dates'])
+        report['day_mismatches'].extend((int(row) + offset, day, expected) for row, day, expected in result['day_mismatches'])
+        report['rows'] += result['rows']
+
+    ids = np.concatenate(ids or [np.empty(0)])
+    id_rows = np.concatenate(id_rows or [np.empty(0, dtype='int64')])
+    present = ~np.isnan(ids)
+    report['missing_ids'] = id_rows[~present].tolist()
+    report['duplicate_ids'] = {int(value): rows for value, rows in _groups(ids[present], id_rows[present]).items()}
+    report['double_booked'] = {slot_names[value]: rows for value, rows in _groups(
+        np.concatenate(slot_hashes or [np.empty(0, dtype='uint64')]),
+        np.concatenate(slot_rows or [np.empty(0, dtype='int64')])).items()}
+    report['max_id'] = int(ids[present].max()) if present.any() else 0
+    report['seconds'] = time.monotonic() - started
+    logger.info(f"Checked {report['rows']} bookings in {len(ranges)} ranges with {workers} workers in {report['seconds']:.1f}s")
+    return report
+
+def violation_count(report):
+    return (len(report['missing_ids']) + len(report['invalid_dates']) + len(report['day_mismatches'])
+            + sum(len(rows) - 1 for rows in report['duplicate_ids'].values())
+            + sum(len(rows) - 1 for rows in report['double_booked'].values()))
+
+def repair_plan(report, policy):
+    """What a repair policy changes: (row -> new booking id, row -> weekday, rows to drop)"""
+    new_ids, new_days, drop = {}, {}, set()
+    if policy in ('drop-double-bookings', 'all'):
+        # The first booking of a slot stands; later ones were accepted by the racy check
+        for rows in report['double_booked'].values():
+            drop.update(rows[1:])
+    if policy in ('renumber', 'all'):
+        next_id = report['max_id'] + 1
+        for rows in report['duplicate_ids'].values():
+            for row in rows[1:]:
+                if row not in drop:
+                    new_ids[row] = next_id
+                    next_id += 1
+        for row in report['missing_ids']:
+            if row not in drop:
+                new_ids[row] = next_id
+                next_id += 1
+    if policy in ('fix-days', 'all'):
+        new_days = {row: expected for row, day, expected in report['day_mismatches'] if row not in drop}
+    return new_ids, new_days, drop
+
+def apply_repairs(new_ids, new_days, drop):
+    """rewrite_in_chunks transform applying a repair plan by row position"""
+    new_ids = pd.Series(new_ids, dtype=object).astype(str)
+    new_days = pd.Series(new_days, dtype=object)
+    drop = pd.Index(sorted(drop), dtype='int64')
+    
+    def transform(chunk):
+        id_rows = new_ids.index.intersection(chunk.index)
+        chunk.loc[id_rows, 'booking_id'] = new_ids[id_rows]
+        day_rows = new_days.index.intersection(chunk.index)
+        chunk.loc[day_rows, 'day'] = new_days[day_rows]
+        drop_rows = drop.intersection(chunk.index)
+        chunk.drop(index=drop_rows, inplace=True)
+        return len(id_rows) + len(day_rows) + len(drop_rows)
+    return transform
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import logging
+import threading
+import pandas as pd
+from datetime import datetime
+
+from .file_lock import bookings_lock, file_lock
+from .db_maintenance import FileChangedError, fill_missing_dates, fill_missing_days, rewrite_in_chunks
+
+logger = logging.getLogger(__name__)
+
+# background: migrate in a thread while requests are served (default)
+# startup: migrate before the database is used; off: leave old files alone
+SCHEMA_MIGRATION = os.environ.get('SCHEMA_MIGRATION', 'background')
+# Attempts at a migration that keeps losing the race with booking writes
+MIGRATION_ATTEMPTS = 5
+
+# Registered migrations as (version, description, columns, transform), in version order
+MIGRATIONS = []
+
+def migration(version, description, columns=None):
+    """Register transform(chunk) -> rows updated as the step up to `version`.
+
+    The same transform upgrades the file in chunks and upgrades frames in
+    memory while the file migration is pending, so it must only fill what
+    is missing: running it twice has to be harmless.
+    """
+    def register(transform):
+        MIGRATIONS.append((version, description, columns or [], transform))
+        MIGRATIONS.sort(key=lambda step: step[0])
+        return transform
+    return register
+
+@migration(2, "Add a date column, filled with the next date for each weekday", columns=['day', 'date'])
+def add_date_column(chunk):
+    return fill_missing_dates(chunk)
+
+@migration(3, "Fill missing weekday names from the date", columns=['day', 'date'])
+def fill_weekdays(chunk):
+    return fill_missing_days(chunk)
+
+CURRENT_VERSION = MIGRATIONS[-1][0]
+
+def schema_file(bookings_file):
+    """Sidecar holding the schema version, e.g. bookings.schema.json next to bookings.csv"""
+    return f"{os.path.splitext(bookings_file)[0]}.schema.json"
+
+def read_version(bookings_file):
+    """Schema version of a bookings file.
+
+    Files from before versioning have no sidecar; for those the header is
+    read once: without a 'date' column the file is version 1, otherwise 2.
+    """
+    try:
+        with open(schema_file(bookings_file), 'r') as f:
+            return json.load(f)['version']
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.error(f"Error reading schema version for {bookings_file}: {str(e)}")
+
+    if not os.path.exists(bookings_file) or os.path.getsize(bookings_file) == 0:
+        return CURRENT_VERSION
+    columns = pd.read_csv(bookings_file, nrows=0).columns
+    return 2 if 'date' in columns else 1
+
+def write_version(bookings_file, version, description=None):
+    """Record the schema version, keeping a history of the migrations applied"""
+    path = schema_file(bookings_file)
+    history = []
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                history = json.load(f).get('history', [])
+        except Exception:
+            pass
+    if description:
+        history.append({'version': version, 'description': description, 'applied': datetime.now().isoformat()})
+
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w') as f:
+        json.dump({'version': version, 'history': history}, f, indent=2)
+    os.replace(temp_file, path)
+
+def migration_lock(bookings_file):
+    """Exclusive lock on <sidecar>.lock, so only one process at a time migrates a file"""
+    return file_lock(f"{schema_file(bookings_file)}.lock")
+
+def pending_migrations(version):
+    return [step for step in MIGRATIONS if step[0] > version]
+
+def upgrade_frame(df, version):
+    """Apply the pending migrations to a loaded frame, without touching the file"""
+    for _, _, columns, transform in pending_migrations(version):
+        for column in columns:
+            if column not in df.columns:
+                df[column] = None
+        transform(df)
+    return df
+
+def migrate(bookings_file, on_version=None):
+    """Run the pending migrations on the file one at a time; returns the final version.
+
+    Each step rewrites the file in chunks and swaps it in atomically, so
+    readers see either the old file or the new one. If a booking is saved
+    while a step runs, the swap is abandoned and the step starts over.
+    Other processes wait on the migration lock and then find the file
+    already upgraded. on_version(version) is called after each step.
+    """
+    version = read_version(bookings_file)
+    if not pending_migrations(version):
+        return version
+    with migration_lock(bookings_file):
+        # Another worker may have migrated the file while this one waited
+        latest = read_version(bookings_file)
+        if latest != version and on_version:
+            on_version(latest)
+        version = latest
+        for step_version, description, columns, transform in pending_migrations(version):
+            started = time.monotonic()
+            for attempt in range(1, MIGRATION_ATTEMPTS + 1):
+                try:
+                    updated = rewrite_in_chunks(bookings_file, transform, f"schema v{step_version}",
+                                                columns=columns, swap_lock=bookings_lock(bookings_file))
+                    break
+                except FileChangedError:
+                    logger.info(f"Bookings changed during migration to v{step_version}, retrying (attempt {attempt})")
+            else:
+                logger.error(f"Gave up migrating {bookings_file} to v{step_version} after {MIGRATION_ATTEMPTS} attempts")
+                return version
+
+            write_version(bookings_file, step_version, description)
+            version = step_version
+            logger.info(f"Migrated {bookings_file} to schema v{version} ({description}): "
+                        f"{updated} rows updated in {time.monotonic() - started:.1f}s")
+            if on_version:
+                on_version(version)
+    return version
+
+def start_migration(bookings_file, on_version=None, mode=None):
+    """Bring the file up to CURRENT_VERSION as configured by SCHEMA_MIGRATION.
+
+    Returns the migration thread in background mode, otherwise None.
+    """
+    mode = mode or SCHEMA_MIGRATION
+    if mode == 'off':
+        return None
+    if mode == 'startup':
+        migrate(bookings_file, on_version)
+        return None
+
+    def run():
+        try:
+            migrate(bookings_file, on_version)
+        except Exception as e:
+            logger.error(f"Schema migration of {bookings_file} failed: {str(e)}")
+    thread = threading.Thread(target=run, name="schema-migration", daemon=True)
+    thread.start()
+    return thread
@@ -1,45 +1,144 @@
 #!/usr/bin/env python3
 """
-Utility to update the holiday cache for the current and next year
+Utility to warm the holiday cache for the current and next year (or any
+countries and years), and to regenerate the bundled holiday dataset from the cache
+
+Run from src/: python -m utils.update_holidays --countries IN US --years 2026 2027
+Offline: python -m utils.update_holidays --stub --error-rate 0.3
 """
 
 import os
 import sys
+import time
+import random
 import argparse
+import tempfile
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Fix the import to use relative import
-from .holiday_resolver import holiday_resolver
+from . import holiday_resolver as resolver_module
+from .holiday_resolver import cache_key, holiday_resolver
+from .holiday_dataset import DATASET_FILE, HolidayDataset, entries_from_cache, write_dataset
+
+def fetch_with_retry(country_code, year, retries=3, backoff=1.0):
+    """Fetch one (country, year) without saving it, retrying with exponential backoff.
+    
+    Returns (holidays or None, attempts).
+    """
+    for attempt in range(retries + 1):
+        holidays = holiday_resolver.fetch_holidays(year, country_code, save=False)
+        if holidays is not None:
+            return holidays, attempt + 1
+        if attempt < retries:
+            # Jittered so parallel workers don't retry in lockstep
+            delay = backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+            print(f"{country_code} {year}: attempt {attempt + 1} failed, retrying in {delay:.1f}s")
+            time.sleep(delay)
+    return None, retries + 1
 
-def update_holiday_cache(years=None, country_code="IN"):
-    """Update the holiday cache for the specified years"""
+def update_holiday_cache(years=None, countries=("IN",), max_workers=4, retries=3, backoff=1.0, force=False):
+    """Warm the holiday cache for every (country, year) pair, fetching in parallel"""
     if years is None:
         # Default to current year and next year
         current_year = datetime.now().year
         years = [current_year, current_year + 1]
     
-    print(f"Updating holiday cache for years: {years}")
+    pairs = [(country.upper(), year) for country in countries for year in years]
+    if not force:
+        pairs = [(country, year) for country, year in pairs
+                 if cache_key(country, year) not in holiday_resolver.holiday_cache
+                 or holiday_resolver.is_stale(cache_key(country, year))]
+    print(f"Warming holiday cache for {len(pairs)} country/year pairs with {max_workers} workers")
     
-    for year in years:
-        print(f"Fetching holidays for {year}...")
-        holidays = holiday_resolver.get_holidays(year, country_code)
-        print(f"Found {len(holidays)} holiday entries for {year}")
-        
-        # Print some example holidays
-        print("\nExample holidays:")
-        count = 0
-        for name, date in holidays.items():
-            print(f"- {name}: {date}")
-            count += 1
-            if count >= 5:
-                break
+    start = time.perf_counter()
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="holiday-warm") as executor:
+        futures = {}
+        for country, year in pairs:
+            futures[executor.submit(timed_fetch, country, year, retries, backoff)] = (country, year)
+        for future in as_completed(futures):
+            country, year = futures[future]
+            results[(country, year)] = future.result()
+    fetch_seconds = time.perf_counter() - start
     
-    print("\nHoliday cache update complete!")
+    # Write everything once, after all fetches are done
+    fetched = [cache_key(country, year) for (country, year), (holidays, _, _) in results.items() if holidays is not None]
+    for key in fetched:
+        holiday_resolver.save_entry(key)
+    
+    print(f"\n{'country':<8} {'year':<6} {'holidays':>8} {'attempts':>8} {'seconds':>8}")
+    for (country, year), (holidays, attempts, seconds) in sorted(results.items()):
+        count = len(holidays) if holidays is not None else "failed"
+        print(f"{country:<8} {year:<6} {count:>8} {attempts:>8} {seconds:>8.2f}")
+    
+    failed = len(results) - len(fetched)
+    print(f"\nFetched {len(fetched)} of {len(results)} in {fetch_seconds:.2f}s, "
+          f"saved in {time.perf_counter() - start - fetch_seconds:.2f}s ({failed} failed)")
+    return failed == 0
+
+def timed_fetch(country_code, year, retries, backoff):
+    """fetch_with_retry plus its wall time; returns (holidays or None, attempts, seconds)"""
+    start = time.perf_counter()
+    holidays, attempts = fetch_with_retry(country_code, year, retries, backoff)
+    return holidays, attempts, time.perf_counter() - start
+
+def build_dataset(path=DATASET_FILE):
+    """Regenerate the bundled dataset from the holiday cache, keeping years the cache no longer has"""
+    entries = {}
+    if os.path.exists(path):
+        dataset = HolidayDataset(path)
+        for country, name, iso_date in dataset.entries():
+            entries[(country, name, iso_date[:4])] = iso_date
+        dataset.close()
+    
+    # Cached and LLM-resolved dates replace the bundled ones for the same holiday and year
+    for country, name, iso_date in entries_from_cache(holiday_resolver.resolved_dates, holiday_resolver.holiday_cache):
+        entries[(country, name, iso_date[:4])] = iso_date
+    
+    count = write_dataset([(country, name, iso_date) for (country, name, _), iso_date in entries.items()], path)
+    print(f"Wrote {count} holidays to {path}")
+    return count
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Update the holiday cache for Paradise Grill booking system")
     parser.add_argument("--years", type=int, nargs="+", help="Years to update (defaults to current and next year)")
-    parser.add_argument("--country", type=str, default="IN", help="Country code (default: IN)")
+    parser.add_argument("--countries", "--country", type=str, nargs="+", default=["IN"], help="Country codes (default: IN)")
+    parser.add_argument("--workers", type=int, default=4, help="Fetches running at the same time (default: 4)")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per country/year (default: 3)")
+    parser.add_argument("--backoff", type=float, default=1.0, help="First retry delay in seconds, doubled each time (default: 1)")
+    parser.add_argument("--force", action="store_true", help="Fetch even when the cached entry is still fresh")
+    parser.add_argument("--cache-dir", type=str, help="Cache directory to warm (default: data/cache, or a temp dir with --stub)")
+    parser.add_argument("--stub", action="store_true", help="Fetch from a local Calendarific stand-in instead of the API")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Stand-in latency per request in ms (default: 200)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stand-in requests that fail")
+    parser.add_argument("--build-dataset", action="store_true", help="Regenerate the bundled holiday dataset from the cache")
+    parser.add_argument("--skip-fetch", action="store_true", help="Don't fetch from Calendarific, only use what is cached")
+    parser.add_argument("--dataset", type=str, help=f"Dataset path (default: {DATASET_FILE}, or one in the temp dir with --stub)")
     
     args = parser.parse_args()
-    update_holiday_cache(args.years, args.country)
+    # The resolver is created on first use, so this has to come before anything touches it
+    if args.stub and not args.cache_dir:
+        # Keep stand-in data out of the real cache
+        args.cache_dir = tempfile.mkdtemp(prefix="holiday-cache-")
+    if args.cache_dir:
+        resolver_module.CACHE_DIR = args.cache_dir
+        print(f"Using cache directory {args.cache_dir}")
+    if not args.dataset:
+        # The stand-in moves one year's dates to every year, which is wrong for lunar
+        # festivals, so stub runs never write the bundled dataset unless asked to
+        args.dataset = os.path.join(args.cache_dir, 'holidays.bin') if args.stub else DATASET_FILE
+    
+    if args.stub:
+        from .calendarific_stub import StubConfig, start_in_thread
+        stub_server, holiday_resolver.base_url = start_in_thread(
+            StubConfig(latency="lognormal", latency_ms=args.latency_ms, error_rate=args.error_rate))
+        holiday_resolver.api_key = holiday_resolver.api_key or "stub"
+    
+    succeeded = True
+    if not args.skip_fetch:
+        succeeded = update_holiday_cache(args.years, args.countries, args.workers, args.retries,
+                                         args.backoff, args.force)
+    if args.build_dataset:
+        build_dataset(args.dataset)
+    sys.exit(0 if succeeded else 1)